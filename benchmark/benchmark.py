@@ -0,0 +1,253 @@
+"""
+Benchmark of the OCR pipeline over the example documents and generated scans.
+
+Runs locally without Docker or network access. Reports pages per second, per-stage latency
+percentiles and peak memory, and compares them with a baseline file:
+
+    python benchmark/benchmark.py --synthetic-pages 4 --baseline benchmark/baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from PIL import Image, ImageDraw, ImageFont
+from tqdm import tqdm
+
+sys.path.insert(0, str(Path(__file__).parent.parent.joinpath("src").resolve()))
+
+from metrics import DocumentMetrics, get_peak_rss_mb  # noqa: E402
+from ocr_options import OcrOptions  # noqa: E402
+from tesseract import OcrSession, process_document  # noqa: E402
+
+EXAMPLE_DIR: Path = Path(__file__).parent.parent.joinpath("example").resolve()
+STAGES: list[str] = ["render_seconds", "ocr_seconds", "merge_seconds"]
+PERCENTILES: list[int] = [50, 90, 99]
+WORDS: list[str] = (
+    "the climate change report describes rising temperatures sea levels and extreme weather events "
+    "across regions with data collected from stations satellites and ocean buoys over several decades"
+).split()
+
+
+def generate_synthetic_scan(path: str, pages: int, dpi: int, seed: int = 0) -> None:
+    """
+    Create a PDF of scanned letter-size pages with printed-like text.
+
+    Args:
+        path (str): Path to the created PDF file.
+        pages (int): Number of pages.
+        dpi (int): Resolution of the scanned images.
+        seed (int): Seed of the generated text, the same seed gives the same document.
+    """
+    generator: random.Random = random.Random(seed)
+    width: int = round(8.5 * dpi)
+    height: int = round(11 * dpi)
+    # 11 pt text with 1 inch margins
+    font: Any = ImageFont.load_default(size=round(11 * dpi / 72))
+    line_height: int = round(16 * dpi / 72)
+
+    images: list[Image.Image] = []
+    for _ in range(pages):
+        image: Image.Image = Image.new("L", (width, height), 255)
+        draw: ImageDraw.ImageDraw = ImageDraw.Draw(image)
+        for y in range(dpi, height - dpi, line_height):
+            line: str = " ".join(generator.choice(WORDS) for _ in range(12))
+            draw.text((dpi, y), line.capitalize() + ".", fill=0, font=font)
+        images.append(image)
+
+    images[0].save(path, "PDF", save_all=True, append_images=images[1:], resolution=dpi)
+
+
+def get_percentiles(values: list[float]) -> dict[str, float]:
+    """
+    Compute latency percentiles with linear interpolation.
+
+    Args:
+        values (list[float]): Measured values.
+
+    Returns:
+        Percentiles named "p50", "p90", "p99" and the maximum.
+    """
+    if not values:
+        return {}
+
+    ordered: list[float] = sorted(values)
+    result: dict[str, float] = {}
+    for percentile in PERCENTILES:
+        position: float = (len(ordered) - 1) * percentile / 100
+        lower: int = int(position)
+        upper: int = min(lower + 1, len(ordered) - 1)
+        result[f"p{percentile}"] = ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+    result["max"] = ordered[-1]
+    return result
+
+
+def run_benchmark(documents: list[str], options: OcrOptions, repeat: int, name: str, key: str) -> dict[str, Any]:
+    """
+    OCR all documents with one session and summarize measurements.
+
+    Args:
+        documents (list[str]): Paths to the PDF files.
+        options (OcrOptions): Settings of the OCR run.
+        repeat (int): Number of measured runs over all documents.
+        name (str): PDFix license name.
+        key (str): PDFix license key.
+
+    Returns:
+        Benchmark results.
+    """
+    measured: list[DocumentMetrics] = []
+
+    session: OcrSession = OcrSession(name, key, options)
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            output_path: str = os.path.join(output_dir, "output.pdf")
+
+            # Not measured; starts OCR workers and loads language models
+            with tqdm(disable=True) as progress_bar:
+                process_document(session, progress_bar, documents[0], output_path, options)
+
+            for _ in range(repeat):
+                for document in documents:
+                    with tqdm(disable=True) as progress_bar:
+                        measured.append(process_document(session, progress_bar, document, output_path, options))
+    except Exception:
+        raise
+    finally:
+        session.close()
+
+    pages: int = sum(len(metrics.pages) for metrics in measured)
+    seconds: float = sum(metrics.total_seconds for metrics in measured)
+    summary: dict[str, Any] = {
+        "pages": pages,
+        "seconds": seconds,
+        "pages_per_second": pages / seconds if seconds > 0 else 0.0,
+        # Workers are stopped by now and only the largest one is reported, peaks of documents include all of them
+        "peak_rss_mb": max([get_peak_rss_mb()] + [metrics.peak_rss_mb for metrics in measured]),
+    }
+    for stage in STAGES:
+        summary[stage] = get_percentiles([getattr(page, stage) for metrics in measured for page in metrics.pages])
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "engine": session.engine.name,
+            "workers": session.workers,
+        },
+        "documents": [
+            {
+                "document": Path(metrics.input_path).name,
+                "pages": len(metrics.pages),
+                "seconds": metrics.total_seconds,
+            }
+            for metrics in measured
+        ],
+        "summary": summary,
+    }
+
+
+def compare_with_baseline(summary: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """
+    Print current and baseline values side by side and find regressions.
+
+    Args:
+        summary (dict[str, Any]): Summary of the current run.
+        baseline (dict[str, Any]): Summary of the baseline run.
+        tolerance (float): Allowed relative slowdown, e.g. 0.1 for 10 %.
+
+    Returns:
+        Names of the regressed values.
+    """
+    # (name, current, baseline, whether higher is better)
+    rows: list[tuple[str, float, float, bool]] = [
+        ("pages_per_second", summary["pages_per_second"], baseline.get("pages_per_second", 0.0), True),
+        ("peak_rss_mb", summary["peak_rss_mb"], baseline.get("peak_rss_mb", 0.0), False),
+    ]
+    for stage in STAGES:
+        for percentile in ["p50", "p90"]:
+            rows.append(
+                (
+                    f"{stage}.{percentile}",
+                    summary[stage].get(percentile, 0.0),
+                    baseline.get(stage, {}).get(percentile, 0.0),
+                    False,
+                )
+            )
+
+    regressions: list[str] = []
+    print(f"{'value':<24}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, current, previous, higher_is_better in rows:
+        if previous <= 0:
+            print(f"{name:<24}{'-':>12}{current:>12.3f}{'-':>10}")
+            continue
+        change: float = (current - previous) / previous
+        worse: bool = change < -tolerance if higher_is_better else change > tolerance
+        print(f"{name:<24}{previous:>12.3f}{current:>12.3f}{change:>+10.1%}{'  REGRESSION' if worse else ''}")
+        if worse:
+            regressions.append(name)
+
+    return regressions
+
+
+def main() -> None:  # noqa: D103
+    parser = argparse.ArgumentParser(description="Benchmark OCR over example documents and generated scans")
+    parser.add_argument("--no-examples", action="store_true", help="Do not include example/*.pdf")
+    parser.add_argument("--synthetic-pages", type=int, default=0, help="Number of pages of a generated scan")
+    parser.add_argument("--synthetic-dpi", type=int, default=300, help="Resolution of the generated scan")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of measured runs over all documents")
+    parser.add_argument("--jobs", "-j", type=int, default=0, help="Number of parallel OCR workers")
+    parser.add_argument("--engine", type=str, default="auto", help="OCR engine")
+    parser.add_argument("--lang", type=str, default="eng", help="Language identifier")
+    parser.add_argument("--output", "-o", type=str, default="", help="JSON file to write results to")
+    parser.add_argument("--baseline", type=str, default="", help="JSON results of a previous run to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results to the baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative slowdown. Default 0.1")
+    parser.add_argument("--name", type=str, default="", help="PDFix license name")
+    parser.add_argument("--key", type=str, default="", help="PDFix license key")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        documents: list[str] = [] if args.no_examples else sorted(str(path) for path in EXAMPLE_DIR.glob("*.pdf"))
+        if args.synthetic_pages > 0:
+            synthetic_path: str = os.path.join(temp_dir, f"synthetic_{args.synthetic_dpi}dpi.pdf")
+            generate_synthetic_scan(synthetic_path, args.synthetic_pages, args.synthetic_dpi)
+            documents.append(synthetic_path)
+        if not documents:
+            parser.error("No documents to benchmark")
+
+        options: OcrOptions = OcrOptions(lang=args.lang, jobs=args.jobs, engine=args.engine)
+        start: float = time.perf_counter()
+        results: dict[str, Any] = run_benchmark(documents, options, args.repeat, args.name, args.key)
+        print(f"Benchmark finished in {time.perf_counter() - start:.1f} s")
+
+    summary: dict[str, Any] = results["summary"]
+    print(json.dumps(summary, indent=2))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline: dict[str, Any] = json.load(file)
+        regressions: list[str] = compare_with_baseline(summary, baseline["summary"], args.tolerance)
+        if regressions:
+            print(f"Performance regressed: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark of the start of the command line tool.
+
+Runs subcommands that do no OCR in fresh interpreters, reports their median wall time and fails
+if they load PDFix SDK, Tesseract or requests, or got slower than a baseline file:
+
+    python benchmark/startup.py --baseline benchmark/startup_baseline.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+MAIN_PATH: Path = Path(__file__).parent.parent.joinpath("src", "main.py").resolve()
+# Arguments of main.py that must start without the OCR stack
+COMMANDS: dict[str, list[str]] = {
+    "help": ["--help"],
+    "ocr_help": ["ocr", "--help"],
+    "config": ["config"],
+}
+HEAVY_MODULES: list[str] = ["pdfixsdk", "pytesseract", "tesserocr", "tqdm", "requests", "PIL"]
+# Runs main.py as a script and prints the heavy modules it imported
+PROBE: str = (
+    "import os, runpy, sys\n"
+    "sys.argv = sys.argv[1:]\n"
+    "sys.path.insert(0, os.path.dirname(sys.argv[0]))\n"
+    "try:\n"
+    "    runpy.run_path(sys.argv[0], run_name='__main__')\n"
+    "except SystemExit:\n"
+    "    pass\n"
+    "print('\\n'.join(name for name in {modules} if name in sys.modules), file=sys.stderr)\n"
+)
+
+
+def get_heavy_modules(arguments: list[str]) -> list[str]:
+    """
+    Find heavy modules imported by the command.
+
+    Args:
+        arguments (list[str]): Arguments of main.py.
+
+    Returns:
+        Names of the heavy modules that were imported.
+    """
+    process: subprocess.CompletedProcess = subprocess.run(
+        [sys.executable, "-c", PROBE.format(modules=HEAVY_MODULES), str(MAIN_PATH), *arguments],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"main.py {' '.join(arguments)} failed:\n{process.stderr}")
+    return [line for line in process.stderr.splitlines() if line in HEAVY_MODULES]
+
+
+def measure_command(arguments: list[str], repeat: int) -> float:
+    """
+    Measure median wall time of the command in a new interpreter.
+
+    Args:
+        arguments (list[str]): Arguments of main.py.
+        repeat (int): Number of measured runs.
+
+    Returns:
+        Median time in seconds.
+    """
+    # Unmeasured run fills the file system cache and writes bytecode
+    subprocess.run([sys.executable, str(MAIN_PATH), *arguments], capture_output=True, check=True)
+    durations: list[float] = []
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        subprocess.run([sys.executable, str(MAIN_PATH), *arguments], capture_output=True, check=True)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def main() -> None:  # noqa: D103
+    parser = argparse.ArgumentParser(description="Benchmark start of the command line tool")
+    parser.add_argument("--repeat", type=int, default=10, help="Number of measured runs of each command")
+    parser.add_argument("--output", "-o", type=str, default="", help="JSON file to write results to")
+    parser.add_argument("--baseline", type=str, default="", help="JSON results of a previous run to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results to the baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown. Default 0.2")
+    args = parser.parse_args()
+
+    failures: list[str] = []
+    results: dict[str, Any] = {}
+    for name, arguments in COMMANDS.items():
+        heavy_modules: list[str] = get_heavy_modules(arguments)
+        if heavy_modules:
+            failures.append(f"{name} imports {', '.join(heavy_modules)}")
+        results[name] = measure_command(arguments, args.repeat)
+
+    baseline: dict[str, Any] = {}
+    if args.baseline and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    print(f"{'command':<24}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, current in results.items():
+        previous: float = baseline.get(name, 0.0)
+        if previous <= 0:
+            print(f"{name:<24}{'-':>12}{current:>12.3f}{'-':>10}")
+            continue
+        change: float = (current - previous) / previous
+        worse: bool = change > args.tolerance
+        print(f"{name:<24}{previous:>12.3f}{current:>12.3f}{change:>+10.1%}{'  REGRESSION' if worse else ''}")
+        if worse:
+            failures.append(f"{name} is {change:.0%} slower")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if failures:
+        print(f"Startup regressed: {'; '.join(failures)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
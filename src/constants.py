@@ -8,3 +8,52 @@ PERCENT_XOBJECT: float = 0.1
 PROGRESS_FIRST_STEP: int = 50  # Initialize (open document, read page count, etc.)
 PROGRESS_SECOND_STEP: int = 900  # Run OCR (+ rendering + xobject)
 PROGRESS_THIRD_STEP: int = 50  # Saving document
+ENGINE_AUTO: str = "auto"
+ENGINE_PYTESSERACT: str = "pytesseract"
+ENGINE_TESSEROCR: str = "tesserocr"
+ENGINES: list[str] = [ENGINE_AUTO, ENGINE_TESSEROCR, ENGINE_PYTESSERACT]
+MODE_FORCE: str = "force"
+MODE_REDO: str = "redo"
+MODE_SKIP_TEXT: str = "skip-text"
+MODES: list[str] = [MODE_FORCE, MODE_SKIP_TEXT, MODE_REDO]
+DEFAULT_ZOOM: float = 2.0  # Used when page has no image to take resolution from
+MIN_ZOOM: float = 1.0  # 72 DPI
+MAX_ZOOM: float = 600 / 72  # 600 DPI
+DEFAULT_MAX_PIXELS: int = 25_000_000  # ~100 MB ARGB bitmap
+RENDER_BINARY: str = "binary"
+RENDER_COLOR: str = "color"
+RENDER_GRAY: str = "gray"
+RENDER_MODES: list[str] = [RENDER_GRAY, RENDER_BINARY, RENDER_COLOR]
+DEFAULT_HOST: str = "0.0.0.0"
+DEFAULT_PORT: int = 8080
+DEFAULT_QUEUE_SIZE: int = 16  # Jobs waiting for processing, further submissions are rejected
+DEFAULT_MAX_UPLOAD_SIZE: int = 512  # MB of a submitted document, larger submissions are rejected
+DEFAULT_JOB_TTL: int = 3600  # Seconds a finished job and its files are kept
+DEFAULT_CACHE_SIZE: int = 1024  # MB of cached OCR results
+MIN_FLUSH_PAGES: int = 10  # Pages merged before the document may be flushed again to release memory
+MIN_FLUSH_GROWTH: int = 64  # MB merged pages add to memory left after a flush before flushing again
+LANG_AUTO: str = "auto"
+LANG_DETECT_DPI: float = 150  # Lower resolutions make orientation and script detection unreliable
+LANG_DETECT_PAGES: int = 3  # Sample pages spread over the document
+MIN_SCRIPT_CONFIDENCE: float = 2.0
+ORIENTATION_DPI: float = 150  # Resolution of the downscaled page for orientation and skew detection
+MIN_ORIENTATION_CONFIDENCE: float = 10.0  # Pages detected with lower confidence are not rotated
+SKEW_DPI: float = 75  # Enough to find the direction of text lines
+MAX_SKEW_ANGLE: float = 5.0  # Larger skew is not detected, degrees
+SKEW_COARSE_STEP: float = 0.5
+SKEW_FINE_STEP: float = 0.1
+REGIONS_PAGE: str = "page"
+REGIONS_IMAGES: str = "images"
+REGIONS: list[str] = [REGIONS_PAGE, REGIONS_IMAGES]
+SAVE_FULL: str = "full"
+SAVE_INCREMENTAL: str = "incremental"
+SAVE_MODES: list[str] = [SAVE_FULL, SAVE_INCREMENTAL]
+MAX_OBJECT_DEPTH: int = 32  # Nesting of PDF objects compared when sharing fonts of text layers
+REGION_MARGIN: float = 4.0  # Points added around images, images closer than twice this are merged
+MIN_REGION_SIZE: float = 8.0  # Points, smaller images like lines and dots are not recognized
+# Part of a tile shared with its neighbour, so that words cut by one tile are whole in the other
+TILE_OVERLAP_RATIO: float = 0.1
+TILE_MIN_OVERLAP: float = 144.0  # Points, wider than words of body text
+UPDATE_CHECK_DISABLE_ENV: str = "OCR_TESSERACT_NO_UPDATE_CHECK"  # Set to 1 to never check for updates
+UPDATE_CHECK_TIMEOUT: float = 3.0  # Seconds for connecting to and reading from Docker Hub
+USER_CACHE_DIR: str = "pdfix-ocr-tesseract"  # Under $XDG_CACHE_HOME or ~/.cache, update check and languages
@@ -1,8 +1,16 @@
-from pdfixsdk import Pdfix
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # Imported only for annotations, so that argument errors do not load PDFix SDK
+    from pdfixsdk import Pdfix
 
 EC_ARG_GENERAL = 10
 EC_ARG_INPUT_MISSING = 11
 EC_ARG_INPUT_PDF_OUTPUT_PDF = 12
+EC_ARG_ENGINE_UNAVAILABLE = 13
+EC_ARG_INVALID_BATCH = 14
+EC_ARG_INVALID_PAGES = 15
+EC_ARG_INVALID_SHARD = 16
 
 EC_PDFIX_INITIALIZE = 20
 EC_PDFIX_ACTIVATION_FAILED = 21
@@ -12,9 +20,17 @@ EC_PDFIX_FAILED_TO_OPEN = 24
 EC_PDFIX_FAILED_TO_SAVE = 25
 EC_PDFIX_FAILED_TO_OCR = 26
 
+EC_TESSERACT_FAILED_TO_OCR = 30
+
+EC_BATCH_FAILED = 40
+
 MESSAGE_ARG_GENERAL = "Failed to parse arguments. Please check the usage and try again."
 MESSAGE_ARG_INPUT_MISSING = "Input file does not exists."
 MESSAGE_ARG_INPUT_PDF_OUTPUT_PDF = "Input and output file must be PDF documents."
+MESSAGE_ARG_ENGINE_UNAVAILABLE = "Requested OCR engine is not available."
+MESSAGE_ARG_INVALID_BATCH = "Invalid batch input."
+MESSAGE_ARG_INVALID_PAGES = "Invalid page range."
+MESSAGE_ARG_INVALID_SHARD = "Invalid shard."
 
 MESSAGE_PDFIX_INITIALIZE = "Failed to initialize PDFix SDK."
 MESSAGE_PDFIX_ACTIVATION_FAILED = "Failed to activate PDFix SDK acount."
@@ -24,6 +40,10 @@ MESSAGE_PDFIX_FAILED_TO_OPEN = "Failed to open PDF document."
 MESSAGE_PDFIX_FAILED_TO_SAVE = "Failed to save PDF document."
 MESSAGE_PDFIX_FAILED_TO_OCR = "Failed to OCR document."
 
+MESSAGE_TESSERACT_FAILED_TO_OCR = "Tesseract failed to OCR page."
+
+MESSAGE_BATCH_FAILED = "Failed to OCR some documents of the batch."
+
 
 class ExpectedException(BaseException):
     def __init__(self, error_code: int) -> None:
@@ -50,6 +70,26 @@ class ArgumentInputPdfOutputPdfException(ArgumentException):
         super().__init__(MESSAGE_ARG_INPUT_PDF_OUTPUT_PDF, EC_ARG_INPUT_PDF_OUTPUT_PDF)
 
 
+class ArgumentEngineUnavailableException(ArgumentException):
+    def __init__(self, engine: str = "") -> None:
+        super().__init__(f"{MESSAGE_ARG_ENGINE_UNAVAILABLE} {engine}", EC_ARG_ENGINE_UNAVAILABLE)
+
+
+class ArgumentInvalidBatchException(ArgumentException):
+    def __init__(self, message: str = "") -> None:
+        super().__init__(f"{MESSAGE_ARG_INVALID_BATCH} {message}", EC_ARG_INVALID_BATCH)
+
+
+class ArgumentInvalidPagesException(ArgumentException):
+    def __init__(self, pages: str) -> None:
+        super().__init__(f"{MESSAGE_ARG_INVALID_PAGES} {pages}", EC_ARG_INVALID_PAGES)
+
+
+class ArgumentInvalidShardException(ArgumentException):
+    def __init__(self, message: str = "") -> None:
+        super().__init__(f"{MESSAGE_ARG_INVALID_SHARD} {message}", EC_ARG_INVALID_SHARD)
+
+
 class PdfixInitializeException(ExpectedException):
     def __init__(self) -> None:
         super().__init__(EC_PDFIX_INITIALIZE)
@@ -57,7 +97,7 @@ class PdfixInitializeException(ExpectedException):
 
 
 class PdfixException(ExpectedException):
-    def __init__(self, pdfix: Pdfix, error_code: int, message: str = "") -> None:
+    def __init__(self, pdfix: "Pdfix", error_code: int, message: str = "") -> None:
         super().__init__(error_code)
         pdfix_error_code: int = pdfix.GetErrorType()
         pdfix_error: str = str(pdfix.GetError())
@@ -69,30 +109,53 @@ class PdfixException(ExpectedException):
 
 
 class PdfixActivationException(PdfixException):
-    def __init__(self, pdfix: Pdfix) -> None:
+    def __init__(self, pdfix: "Pdfix") -> None:
         super().__init__(pdfix, EC_PDFIX_ACTIVATION_FAILED, MESSAGE_PDFIX_ACTIVATION_FAILED)
 
 
 class PdfixAuthorizationException(PdfixException):
-    def __init__(self, pdfix: Pdfix) -> None:
+    def __init__(self, pdfix: "Pdfix") -> None:
         super().__init__(pdfix, EC_PDFIX_AUTHORIZATION_FAILED, MESSAGE_PDFIX_AUTHORIZATION_FAILED)
 
 
 class PdfixFailedToRenderException(PdfixException):
-    def __init__(self, pdfix: Pdfix, message: str = "") -> None:
+    def __init__(self, pdfix: "Pdfix", message: str = "") -> None:
         super().__init__(pdfix, EC_PDFIX_FAILED_TO_RENDER, f"{MESSAGE_PDFIX_FAILED_TO_RENDER} {message}")
 
 
 class PdfixFailedToOpenException(PdfixException):
-    def __init__(self, pdfix: Pdfix, pdf_path: str = "") -> None:
+    def __init__(self, pdfix: "Pdfix", pdf_path: str = "") -> None:
         super().__init__(pdfix, EC_PDFIX_FAILED_TO_OPEN, f"{MESSAGE_PDFIX_FAILED_TO_OPEN} {pdf_path}")
 
 
 class PdfixFailedToSaveException(PdfixException):
-    def __init__(self, pdfix: Pdfix, message: str = "") -> None:
+    def __init__(self, pdfix: "Pdfix", message: str = "") -> None:
         super().__init__(pdfix, EC_PDFIX_FAILED_TO_SAVE, f"{MESSAGE_PDFIX_FAILED_TO_SAVE} {message}")
 
 
 class PdfixFailedToOcrException(PdfixException):
-    def __init__(self, pdfix: Pdfix, message: str = "") -> None:
+    def __init__(self, pdfix: "Pdfix", message: str = "") -> None:
         super().__init__(pdfix, EC_PDFIX_FAILED_TO_OCR, f"{MESSAGE_PDFIX_FAILED_TO_OCR} {message}")
+
+
+class TesseractFailedToOcrException(ExpectedException):
+    def __init__(self, message: str = "") -> None:
+        super().__init__(EC_TESSERACT_FAILED_TO_OCR)
+        self._add_note(f"{MESSAGE_TESSERACT_FAILED_TO_OCR} {message}")
+
+
+class BatchFailedException(ExpectedException):
+    def __init__(self, failed: int, total: int) -> None:
+        super().__init__(EC_BATCH_FAILED)
+        self._add_note(f"{MESSAGE_BATCH_FAILED} {failed} of {total} failed.")
+
+
+class OcrError(Exception):
+    """
+    Failure reported by the Python API. Carries the exit code the ocr subcommand would return.
+    """
+
+    def __init__(self, error_code: int, message: str) -> None:
+        super().__init__(message)
+        self.error_code: int = error_code
+        self.message: str = message
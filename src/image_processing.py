@@ -0,0 +1,153 @@
+from PIL import Image
+
+from constants import MAX_SKEW_ANGLE, RENDER_BINARY, RENDER_GRAY, SKEW_COARSE_STEP, SKEW_FINE_STEP
+
+
+def convert_page_image(image: Image.Image, render_mode: str) -> Image.Image:
+    """
+    Convert rendered RGB page image to the pixel format used for OCR.
+
+    Args:
+        image (Image.Image): Rendered page image in RGB.
+        render_mode (str): "color" keeps RGB, "gray" converts to 8-bit grayscale,
+            "binary" converts to black and white using Otsu threshold.
+
+    Returns:
+        Converted image with the same resolution info.
+    """
+    if render_mode not in (RENDER_GRAY, RENDER_BINARY):
+        return image
+
+    converted: Image.Image = image.convert("L")
+    if render_mode == RENDER_BINARY:
+        threshold: int = get_otsu_threshold(converted.histogram())
+        converted = converted.point(lambda value: 255 if value > threshold else 0, "1")
+
+    converted.info = dict(image.info)
+    return converted
+
+
+def get_otsu_threshold(histogram: list[int]) -> int:
+    """
+    Find threshold separating foreground and background with the Otsu method.
+
+    Args:
+        histogram (list[int]): Histogram of 8-bit grayscale image (256 values).
+
+    Returns:
+        Threshold value, pixels above it are background.
+    """
+    total: int = sum(histogram)
+    if total == 0:
+        return 127
+
+    sum_total: float = sum(value * count for value, count in enumerate(histogram))
+    sum_background: float = 0.0
+    weight_background: int = 0
+    best_threshold: int = 127
+    best_variance: float = -1.0
+
+    for value in range(256):
+        weight_background += histogram[value]
+        if weight_background == 0:
+            continue
+        weight_foreground: int = total - weight_background
+        if weight_foreground == 0:
+            break
+
+        sum_background += value * histogram[value]
+        mean_background: float = sum_background / weight_background
+        mean_foreground: float = (sum_total - sum_background) / weight_foreground
+
+        # Between-class variance
+        variance: float = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_variance = variance
+            best_threshold = value
+
+    return best_threshold
+
+
+def downscale_page_image(image: Image.Image, dpi: float) -> Image.Image:
+    """
+    Reduce page image to about the given resolution for fast analysis.
+
+    Args:
+        image (Image.Image): Page image with resolution info.
+        dpi (float): Target resolution.
+
+    Returns:
+        Grayscale or color image, the same image if it is not larger than the target resolution.
+    """
+    image_dpi: float = image.info.get("dpi", (dpi, dpi))[0]
+    factor: int = int(image_dpi // dpi)
+    if image.mode == "1":
+        image = image.convert("L")
+    if factor <= 1:
+        return image
+
+    reduced: Image.Image = image.reduce(factor)
+    reduced.info["dpi"] = (image_dpi / factor, image_dpi / factor)
+    return reduced
+
+
+def detect_skew_angle(image: Image.Image) -> float:
+    """
+    Detect small skew of text lines. The page is rotated by candidate angles and the angle giving
+    the sharpest horizontal projection profile wins, first in coarse and then in fine steps.
+
+    Args:
+        image (Image.Image): Upright page image, downscaled for speed.
+
+    Returns:
+        Clockwise rotation in degrees that makes text lines horizontal.
+    """
+    gray: Image.Image = image.convert("L")
+    threshold: int = get_otsu_threshold(gray.histogram())
+    # Ink is white on black, so corners filled by rotation add nothing to the profile
+    ink: Image.Image = gray.point(lambda value: 255 if value <= threshold else 0)
+
+    def get_profile_score(angle: float) -> float:
+        rotated: Image.Image = ink.rotate(angle, resample=Image.Resampling.BILINEAR)
+        # Average ink of every row
+        profile: list[float] = list(rotated.resize((1, rotated.height), Image.Resampling.BOX).getdata())
+        return sum((current - previous) ** 2 for previous, current in zip(profile, profile[1:]))
+
+    coarse_count: int = round(MAX_SKEW_ANGLE / SKEW_COARSE_STEP)
+    best_angle: float = max(
+        (step * SKEW_COARSE_STEP for step in range(-coarse_count, coarse_count + 1)), key=get_profile_score
+    )
+    fine_count: int = round(SKEW_COARSE_STEP / SKEW_FINE_STEP)
+    best_angle = max(
+        (best_angle + step * SKEW_FINE_STEP for step in range(-fine_count, fine_count + 1)), key=get_profile_score
+    )
+
+    # Counter-clockwise rotation of the image straightens the lines
+    return -round(best_angle, 2) + 0.0
+
+
+def rotate_page_image(image: Image.Image, angle: float) -> Image.Image:
+    """
+    Rotate page image clockwise, growing it to fit and filling new corners with white.
+
+    Args:
+        image (Image.Image): Page image.
+        angle (float): Clockwise rotation in degrees.
+
+    Returns:
+        Rotated image with the same resolution info.
+    """
+    rotated: Image.Image
+    match angle % 360:
+        case 90:
+            rotated = image.transpose(Image.Transpose.ROTATE_270)
+        case 180:
+            rotated = image.transpose(Image.Transpose.ROTATE_180)
+        case 270:
+            rotated = image.transpose(Image.Transpose.ROTATE_90)
+        case _:
+            resample: Image.Resampling = Image.Resampling.NEAREST if image.mode == "1" else Image.Resampling.BILINEAR
+            rotated = image.rotate(-angle, resample=resample, expand=True, fillcolor="white")
+
+    rotated.info = dict(image.info)
+    return rotated
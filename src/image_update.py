@@ -5,9 +5,15 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any, Optional
 
-import requests
-
-from constants import CONFIG_FILE, DOCKER_IMAGE, DOCKER_NAMESPACE, DOCKER_REPOSITORY
+from constants import (
+    CONFIG_FILE,
+    DOCKER_IMAGE,
+    DOCKER_NAMESPACE,
+    DOCKER_REPOSITORY,
+    UPDATE_CHECK_DISABLE_ENV,
+    UPDATE_CHECK_TIMEOUT,
+)
+from user_cache import get_user_cache_path
 
 
 class DockerImageContainerUpdateChecker:
@@ -16,25 +22,25 @@ class DockerImageContainerUpdateChecker:
     """
 
     # Constants
-    LAST_CHECK_FILE = ".local_data.json"
+    LAST_CHECK_FILE = "update_check.json"
 
     def check_for_image_updates(self) -> None:
         """
-        Checks once a day if a new Docker image version is available.
+        Checks once a day if a new Docker image version is available. The latest version found is
+        cached, so later runs of the day do not connect to Docker Hub.
         If a new version is found, it prints a message with the update command.
         """
         try:
-            if not self._last_check_today():
-                current_version: str = self._get_current_version()
-                latest_version: Optional[str] = self._get_latest_docker_version()
-
-                if latest_version and latest_version != current_version:
-                    print(
-                        f"🚀 A new Docker image version ({latest_version}) is available! "
-                        f"Update with: `docker pull {DOCKER_IMAGE}:{latest_version}`"
-                    )
+            latest_version: Optional[str] = self._get_cached_version()
+            if latest_version is None:
+                latest_version = self._get_latest_docker_version()
+                self._update_last_check(latest_version)
 
-                self._update_last_check()
+            if latest_version and latest_version != self._get_current_version():
+                print(
+                    f"🚀 A new Docker image version ({latest_version}) is available! "
+                    f"Update with: `docker pull {DOCKER_IMAGE}:{latest_version}`"
+                )
         except Exception:
             # do not propagate any exceptions up
             pass
@@ -69,8 +75,11 @@ class DockerImageContainerUpdateChecker:
             f"repositories/{DOCKER_REPOSITORY}/"
             f"tags?page_size=50&ordering=last_updated"
         )
+        # Loaded only when the check runs, it is one of the slowest imports
+        import requests
+
         try:
-            response: requests.Response = requests.get(url)
+            response: requests.Response = requests.get(url, timeout=UPDATE_CHECK_TIMEOUT)
             response.raise_for_status()
             data: Any = response.json()
             if isinstance(data, dict) and "results" in data:
@@ -85,29 +94,55 @@ class DockerImageContainerUpdateChecker:
             print(f"Error checking for updates: {e}", file=sys.stderr)
         return None
 
-    def _last_check_today(self) -> bool:
+    def _get_last_check_path(self) -> Path:
         """
-        Check if the last update check was today by reading last_check.json.
+        Path of the file with the result of the last check in the cache directory of the user.
 
         Returns:
-            True if the last check was today, False otherwise.
+            Path to the last check file.
+        """
+        return get_user_cache_path(self.LAST_CHECK_FILE)
+
+    def _get_cached_version(self) -> Optional[str]:
         """
-        if os.path.exists(self.LAST_CHECK_FILE):
-            try:
-                with open(self.LAST_CHECK_FILE, "r", encoding="utf-8") as f:
-                    data: Any = json.load(f)
-                    last_date: str = data.get("last_check", "")
-                    return last_date == datetime.now().strftime("%Y-%m-%d")
-            except (json.JSONDecodeError, FileNotFoundError) as e:
-                print(f"Error reading {self.LAST_CHECK_FILE}: {e}", file=sys.stderr)
-        return False
-
-    def _update_last_check(self) -> None:
+        Read the latest version found by a check done today.
+
+        Returns:
+            The latest version, empty if today's check failed, or None if there was no check today.
+        """
+        try:
+            with open(self._get_last_check_path(), "r", encoding="utf-8") as f:
+                data: Any = json.load(f)
+            if data.get("last_check", "") == datetime.now().strftime("%Y-%m-%d"):
+                return str(data.get("latest_version", ""))
+        except (OSError, ValueError, AttributeError):
+            pass
+        return None
+
+    def _update_last_check(self, latest_version: Optional[str]) -> None:
         """
-        Store today's date in last_check.json.
+        Store today's date and the latest version found.
+
+        Args:
+            latest_version (Optional[str]): The latest version, or None if the check failed.
         """
+        path: Path = self._get_last_check_path()
         try:
-            with open(self.LAST_CHECK_FILE, "w", encoding="utf-8") as f:
-                json.dump({"last_check": datetime.now().strftime("%Y-%m-%d")}, f)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"last_check": datetime.now().strftime("%Y-%m-%d"), "latest_version": latest_version or ""}, f
+                )
         except Exception as e:
-            print(f"Error writing {self.LAST_CHECK_FILE}: {e}", file=sys.stderr)
+            print(f"Error writing {path}: {e}", file=sys.stderr)
+
+
+def is_update_check_disabled() -> bool:
+    """
+    Check whether update checks are disabled by the environment, e.g. on machines without internet access.
+
+    Returns:
+        True if the environment variable is set to a value other than "0" or "false".
+    """
+    value: str = os.environ.get(UPDATE_CHECK_DISABLE_ENV, "").strip().lower()
+    return value not in ("", "0", "false", "no")
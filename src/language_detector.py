@@ -0,0 +1,127 @@
+import re
+import unicodedata
+from collections import Counter
+from typing import Optional
+
+# Tesseract script name reported by orientation and script detection to the language used for it.
+# Latin script is shared by many languages, which are told apart by their common words.
+script_to_tesseract: dict[str, str] = {
+    "Arabic": "ara",
+    "Armenian": "hye",
+    "Bengali": "ben",
+    "Cyrillic": "rus",
+    "Devanagari": "hin",
+    "Ethiopic": "amh",
+    "Georgian": "kat",
+    "Greek": "ell",
+    "Gujarati": "guj",
+    "Gurmukhi": "pan",
+    "Han": "chi_sim",
+    "Hangul": "kor",
+    "Hebrew": "heb",
+    "Hiragana": "jpn",
+    "Japanese": "jpn",
+    "Kannada": "kan",
+    "Katakana": "jpn",
+    "Khmer": "khm",
+    "Korean": "kor",
+    "Lao": "lao",
+    "Malayalam": "mal",
+    "Myanmar": "mya",
+    "Oriya": "ori",
+    "Sinhala": "sin",
+    "Tamil": "tam",
+    "Telugu": "tel",
+    "Thai": "tha",
+    "Tibetan": "bod",
+}
+
+SCRIPT_LATIN: str = "Latin"
+
+# Frequent short words of Latin script languages. Words are compared without diacritics, which
+# the first pass with the English model may not recognize
+latin_common_words: dict[str, set[str]] = {
+    "eng": {"the", "and", "of", "to", "in", "is", "that", "for", "with", "was", "on", "are", "this", "by", "from"},
+    "deu": {"der", "die", "und", "das", "ist", "nicht", "mit", "den", "von", "zu", "ein", "eine", "sich", "auf", "für"},
+    "fra": {"le", "la", "les", "et", "des", "est", "une", "dans", "pour", "qui", "du", "pas", "sur", "par", "à"},
+    "spa": {"el", "los", "las", "que", "en", "del", "por", "con", "una", "para", "es", "se", "como", "al", "más"},
+    "ita": {"il", "di", "che", "per", "non", "una", "sono", "della", "con", "gli", "del", "nel", "anche", "è"},
+    "por": {"os", "as", "que", "em", "um", "uma", "para", "com", "do", "da", "dos", "ao", "não", "foi", "é"},
+    "nld": {"de", "het", "een", "en", "van", "dat", "niet", "op", "te", "met", "voor", "zijn", "ook", "aan"},
+    "pol": {"na", "się", "nie", "do", "jest", "to", "że", "jak", "po", "od", "przez", "oraz", "dla", "już"},
+    "ces": {"se", "na", "je", "že", "to", "do", "jako", "pro", "tak", "ale", "jsou", "byl", "podle", "já"},
+    "swe": {"och", "att", "det", "som", "en", "av", "med", "har", "den", "till", "inte", "för", "är", "på"},
+}
+
+# Words of a language needed to consider it present in the text
+MIN_COMMON_WORDS: int = 5
+# Score relative to the best language needed for another language to be added
+SECONDARY_LANGUAGE_RATIO: float = 0.5
+
+
+def detect_latin_languages(text: str, available_languages: list[str]) -> list[str]:
+    """
+    Tell Latin script languages apart by counting their common words in the text.
+
+    Args:
+        text (str): Text recognized from sample pages.
+        available_languages (list[str]): Tesseract languages that are installed.
+
+    Returns:
+        Detected languages, the most frequent first. Empty if no language is frequent enough.
+    """
+    # Letters of any script, not digits or underscore
+    words: Counter[str] = Counter(fold_word(word) for word in re.findall(r"[^\W\d_]+", text.lower()))
+    scores: dict[str, int] = {
+        lang: sum(words[word] for word in {fold_word(word) for word in common_words})
+        for lang, common_words in latin_common_words.items()
+        if lang in available_languages
+    }
+
+    ranked: list[tuple[str, int]] = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    if not ranked or ranked[0][1] < MIN_COMMON_WORDS:
+        return []
+    best_score: int = ranked[0][1]
+    return [
+        lang for lang, score in ranked if score >= MIN_COMMON_WORDS and score >= best_score * SECONDARY_LANGUAGE_RATIO
+    ]
+
+
+def choose_languages(scripts: list[str], latin_text: str, available_languages: list[str]) -> Optional[str]:
+    """
+    Choose the smallest set of Tesseract languages covering scripts detected on sample pages.
+
+    Args:
+        scripts (list[str]): Script names detected on sample pages.
+        latin_text (str): Text recognized from sample pages in Latin script.
+        available_languages (list[str]): Tesseract languages that are installed.
+
+    Returns:
+        Language identifier for OCR Tesseract like "deu+eng", or None if nothing was detected.
+    """
+    languages: list[str] = []
+    # Most frequent script first, Tesseract prefers the first language
+    for script, _ in Counter(scripts).most_common():
+        if script == SCRIPT_LATIN:
+            candidates: list[str] = detect_latin_languages(latin_text, available_languages) or ["eng"]
+        else:
+            candidates = [script_to_tesseract.get(script, "")]
+
+        for lang in candidates:
+            if lang in available_languages and lang not in languages:
+                languages.append(lang)
+
+    return "+".join(languages) if languages else None
+
+
+def fold_word(word: str) -> str:
+    """
+    Remove diacritics from a word, e.g. "się" becomes "sie".
+
+    Args:
+        word (str): Lowercase word.
+
+    Returns:
+        Word without combining marks.
+    """
+    return "".join(char for char in unicodedata.normalize("NFKD", word) if not unicodedata.combining(char))
@@ -4,17 +4,47 @@ import sys
 import threading
 import traceback
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from constants import CONFIG_FILE
+from constants import (
+    CONFIG_FILE,
+    DEFAULT_CACHE_SIZE,
+    DEFAULT_HOST,
+    DEFAULT_JOB_TTL,
+    DEFAULT_MAX_PIXELS,
+    DEFAULT_MAX_UPLOAD_SIZE,
+    DEFAULT_PORT,
+    DEFAULT_QUEUE_SIZE,
+    ENGINE_AUTO,
+    ENGINES,
+    LANG_AUTO,
+    MODE_FORCE,
+    MODES,
+    REGIONS,
+    REGIONS_PAGE,
+    RENDER_GRAY,
+    RENDER_MODES,
+    SAVE_FULL,
+    SAVE_MODES,
+    UPDATE_CHECK_DISABLE_ENV,
+)
 from exceptions import (
     EC_ARG_GENERAL,
     MESSAGE_ARG_GENERAL,
+    ArgumentException,
     ArgumentInputMissingException,
     ArgumentInputPdfOutputPdfException,
+    BatchFailedException,
     ExpectedException,
 )
-from image_update import DockerImageContainerUpdateChecker
-from tesseract import ocr
+from image_update import DockerImageContainerUpdateChecker, is_update_check_disabled
+from metrics import DocumentMetrics, write_metrics_json
+from ocr_options import OcrOptions
+
+# Modules loading PDFix SDK or Tesseract are imported by the subcommands that use them,
+# so that --help and config start without them
+if TYPE_CHECKING:
+    from ocr_batch import BatchItem, BatchResult
 
 
 def set_arguments(
@@ -31,8 +61,85 @@ def set_arguments(
     """
     for name in names:
         match name:
+            case "batch-input":
+                parser.add_argument(
+                    "--input",
+                    "-i",
+                    type=str,
+                    required=True,
+                    help='Directory with input PDF files or JSONL manifest with "input", "output" and "lang"',
+                )
+            case "cache-dir":
+                parser.add_argument(
+                    "--cache-dir",
+                    type=str,
+                    default="",
+                    help="Directory for caching OCR results, reused for identical pages. Disabled if not provided",
+                )
+            case "cache-size":
+                parser.add_argument(
+                    "--cache-size",
+                    type=int,
+                    default=DEFAULT_CACHE_SIZE,
+                    help=f"Maximum size of the OCR cache in MB, oldest used are removed. Default {DEFAULT_CACHE_SIZE}",
+                )
+            case "chunk-size":
+                parser.add_argument(
+                    "--chunk-size",
+                    type=int,
+                    default=0,
+                    help="Save and reopen the document after this many pages to limit memory. Disabled if not provided",
+                )
+            case "deskew":
+                parser.add_argument(
+                    "--deskew",
+                    action="store_true",
+                    help="Straighten slightly skewed pages before OCR",
+                )
+            case "dpi":
+                parser.add_argument(
+                    "--dpi",
+                    type=float,
+                    default=0,
+                    help="Fixed rendering resolution. Chosen for each page from its images if not provided",
+                )
+            case "engine":
+                parser.add_argument(
+                    "--engine",
+                    type=str,
+                    choices=ENGINES,
+                    default=ENGINE_AUTO,
+                    help="OCR engine. Auto uses persistent tesserocr engine if installed, pytesseract otherwise",
+                )
+            case "first-n":
+                parser.add_argument(
+                    "--first-n",
+                    type=int,
+                    default=0,
+                    help="OCR only this many pages from the start of the selected pages. All if not provided",
+                )
+            case "host":
+                parser.add_argument(
+                    "--host", type=str, default=DEFAULT_HOST, help=f"Address to listen on. Default {DEFAULT_HOST}"
+                )
             case "input":
                 parser.add_argument("--input", "-i", type=str, required=True, help="The input PDF file")
+            case "jobs":
+                parser.add_argument(
+                    "--jobs",
+                    "-j",
+                    type=int,
+                    default=0,
+                    help="Number of parallel OCR workers. All available cores are used if not provided",
+                )
+            case "job-ttl":
+                parser.add_argument(
+                    "--job-ttl",
+                    type=int,
+                    default=DEFAULT_JOB_TTL,
+                    help="Seconds a finished job and its files are kept, 0 keeps them until deleted. "
+                    + f"Default {DEFAULT_JOB_TTL}",
+                )
             case "key":
                 parser.add_argument("--key", type=str, default="", nargs="?", help="PDFix license key")
             case "lang":
@@ -40,12 +147,155 @@ def set_arguments(
                     "--lang",
                     type=str,
                     default="",
-                    help="Language identifier",
+                    help=f'Language identifier, "{LANG_AUTO}" detects it from sample pages',
+                )
+            case "max-memory":
+                parser.add_argument(
+                    "--max-memory",
+                    type=int,
+                    default=0,
+                    help="Memory limit in MB, above it fewer pages are processed in parallel. No limit if not provided",
+                )
+            case "max-upload-size":
+                parser.add_argument(
+                    "--max-upload-size",
+                    type=int,
+                    default=DEFAULT_MAX_UPLOAD_SIZE,
+                    help="Maximum size of a submitted document in MB, larger are rejected. "
+                    + f"Default {DEFAULT_MAX_UPLOAD_SIZE}",
+                )
+            case "max-pixels":
+                parser.add_argument(
+                    "--max-pixels",
+                    type=int,
+                    default=DEFAULT_MAX_PIXELS,
+                    help=f"Maximum number of pixels of a rendered page, 0 for no limit. Default {DEFAULT_MAX_PIXELS}",
+                )
+            case "metrics-json":
+                parser.add_argument(
+                    "--metrics-json",
+                    type=str,
+                    default="",
+                    help="JSON file to write timing and memory measurements of every page to",
+                )
+            case "mode":
+                parser.add_argument(
+                    "--mode",
+                    type=str,
+                    choices=MODES,
+                    default=MODE_FORCE,
+                    help="Pages to OCR. force: all pages, skip-text: only pages without any text, "
+                    + "redo: remove existing OCR text layer, then OCR the pages it was removed from "
+                    + "and pages without text",
                 )
             case "name":
                 parser.add_argument("--name", type=str, default="", nargs="?", help="PDFix license name")
+            case "pages":
+                parser.add_argument(
+                    "--pages",
+                    type=str,
+                    default="",
+                    help='Pages to OCR, e.g. "1-10,25,40-". All pages if not provided',
+                )
+            case "port":
+                parser.add_argument(
+                    "--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on. Default {DEFAULT_PORT}"
+                )
+            case "queue-size":
+                parser.add_argument(
+                    "--queue-size",
+                    type=int,
+                    default=DEFAULT_QUEUE_SIZE,
+                    help=f"Maximum number of jobs waiting for OCR, more are rejected. Default {DEFAULT_QUEUE_SIZE}",
+                )
             case "output":
                 parser.add_argument("--output", "-o", type=str, required=required_output, help=output_help)
+            case "report":
+                parser.add_argument(
+                    "--report", type=str, default="", help="JSONL file to write result of each document to"
+                )
+            case "progress-json":
+                parser.add_argument(
+                    "--progress-json",
+                    action="store_true",
+                    help="Write progress as JSON lines to stderr instead of the progress bar",
+                )
+            case "regions":
+                parser.add_argument(
+                    "--regions",
+                    type=str,
+                    choices=REGIONS,
+                    default=REGIONS_PAGE,
+                    help="What to OCR on each page. page: the whole page, images: only areas covered by images",
+                )
+            case "render-mode":
+                parser.add_argument(
+                    "--render-mode",
+                    type=str,
+                    choices=RENDER_MODES,
+                    default=RENDER_GRAY,
+                    help="Pixel format of rendered pages. gray: 8-bit grayscale, binary: black and white "
+                    + "(Otsu threshold), color: RGB",
+                )
+            case "rotate-pages":
+                parser.add_argument(
+                    "--rotate-pages",
+                    action="store_true",
+                    help="Detect page orientation and turn pages upright before OCR",
+                )
+            case "resume":
+                parser.add_argument(
+                    "--resume",
+                    action="store_true",
+                    help="Keep OCR results of finished pages next to the output and skip them when run again",
+                )
+            case "save-mode":
+                parser.add_argument(
+                    "--save-mode",
+                    type=str,
+                    choices=SAVE_MODES,
+                    default=SAVE_FULL,
+                    help="How the output is written. full: rewrite and compress the whole document, incremental: "
+                    + "append only the changed pages to a copy of the input",
+                )
+            case "shard":
+                parser.add_argument(
+                    "--shard",
+                    type=str,
+                    default="",
+                    help="OCR only shard i of n of the pages to OCR, e.g. 2/8, and write the text layers to the "
+                    + "output directory instead of a PDF. Put the shards together with merge",
+                )
+            case "shards":
+                parser.add_argument(
+                    "--shards",
+                    type=str,
+                    nargs="+",
+                    required=True,
+                    help="Directories written by ocr --shard, one for every shard of the document",
+                )
+            case "tile-size":
+                parser.add_argument(
+                    "--tile-size",
+                    type=int,
+                    default=0,
+                    help="Maximum width and height of a rendered image in pixels. Larger pages are recognized in "
+                    + "overlapping tiles in parallel instead of lowering the zoom to --max-pixels. 0 disables tiles",
+                )
+            case "work-dir":
+                parser.add_argument(
+                    "--work-dir",
+                    type=str,
+                    default="",
+                    help="Directory for uploaded documents and results. Temporary directory if not provided",
+                )
+            case "zoom":
+                parser.add_argument(
+                    "--zoom",
+                    type=float,
+                    default=0,
+                    help="Fixed zoom level for rendering pages, overrides --dpi. Chosen for each page if not provided",
+                )
 
 
 def run_config_subcommand(args) -> None:
@@ -71,18 +321,121 @@ def get_pdfix_config(path: str) -> None:
 
 
 def run_ocr_subcommand(args) -> None:
-    zoom: float = 2.0
+    if not os.path.isfile(args.input):
+        raise ArgumentInputMissingException()
+
+    # Output of a shard is a directory
+    if args.input.lower().endswith(".pdf") and (args.shard or args.output.lower().endswith(".pdf")):
+        metrics: DocumentMetrics = ocr_file(args.input, args.output, args.name, args.key, get_ocr_options(args))
+        if args.metrics_json:
+            write_metrics_json([metrics], args.metrics_json)
+    else:
+        raise ArgumentInputPdfOutputPdfException()
 
+
+def run_merge_subcommand(args) -> None:
     if not os.path.isfile(args.input):
         raise ArgumentInputMissingException()
 
     if args.input.lower().endswith(".pdf") and args.output.lower().endswith(".pdf"):
-        ocr_file(args.input, args.output, args.name, args.key, args.lang, zoom)
+        from ocr_shard import merge_shards
+
+        options: OcrOptions = OcrOptions(save_mode=args.save_mode)
+        metrics: DocumentMetrics = merge_shards(args.input, args.output, args.shards, args.name, args.key, options)
+        if args.metrics_json:
+            write_metrics_json([metrics], args.metrics_json)
     else:
         raise ArgumentInputPdfOutputPdfException()
 
 
-def ocr_file(input_file: str, output_file: str, name: str, key: str, lang: str, zoom: float) -> None:
+def run_ocr_batch_subcommand(args) -> None:
+    from ocr_batch import load_batch_items, ocr_batch, write_batch_report
+
+    items: list[BatchItem] = load_batch_items(args.input, args.output)
+    print(f"Documents to OCR: {len(items)}")
+
+    results: list[BatchResult] = ocr_batch(items, args.name, args.key, get_ocr_options(args))
+    if args.report:
+        write_batch_report(results, args.report)
+    if args.metrics_json:
+        write_metrics_json([result.metrics for result in results if result.metrics is not None], args.metrics_json)
+
+    failed: int = sum(1 for result in results if result.error_code != 0)
+    print(f"Processed {len(results)} documents, {failed} failed")
+    if failed > 0:
+        raise BatchFailedException(failed, len(results))
+
+
+def run_serve_subcommand(args) -> None:
+    if args.queue_size < 1:
+        raise ArgumentException("Queue size must be at least 1.")
+    if args.max_upload_size < 1:
+        raise ArgumentException("Maximum upload size must be at least 1 MB.")
+    if args.job_ttl < 0:
+        raise ArgumentException("Job time to live must not be negative.")
+
+    from ocr_service import serve
+
+    serve(
+        args.host,
+        args.port,
+        args.name,
+        args.key,
+        get_ocr_options(args),
+        args.queue_size,
+        args.work_dir,
+        args.max_upload_size * 1024 * 1024,
+        args.job_ttl,
+    )
+
+
+def get_ocr_options(args) -> OcrOptions:
+    """
+    Collect OCR settings from parsed arguments.
+
+    Args:
+        args (argparse.Namespace): Parsed arguments of the OCR subcommand.
+
+    Returns:
+        Settings of the OCR run.
+    """
+    if args.pages:
+        from page_classifier import parse_page_ranges
+
+        # Fail on invalid syntax before initializing PDFix SDK and OCR workers
+        parse_page_ranges(args.pages)
+    if getattr(args, "shard", ""):
+        from page_classifier import parse_shard
+
+        parse_shard(args.shard)
+
+    return OcrOptions(
+        lang=args.lang,
+        jobs=args.jobs,
+        engine=args.engine,
+        mode=args.mode,
+        zoom=args.zoom,
+        dpi=args.dpi,
+        max_pixels=args.max_pixels,
+        render_mode=args.render_mode,
+        cache_dir=args.cache_dir,
+        cache_size=args.cache_size,
+        progress_json=args.progress_json,
+        chunk_size=args.chunk_size,
+        max_memory=args.max_memory,
+        rotate_pages=args.rotate_pages,
+        deskew=args.deskew,
+        pages=args.pages,
+        first_n=args.first_n,
+        resume=getattr(args, "resume", False),
+        regions=args.regions,
+        tile_size=args.tile_size,
+        save_mode=args.save_mode,
+        shard=getattr(args, "shard", ""),
+    )
+
+
+def ocr_file(input_file: str, output_file: str, name: str, key: str, options: OcrOptions) -> DocumentMetrics:
     """
     Run OCR on a PDF file using Tesseract.
 
@@ -91,10 +444,14 @@ def ocr_file(input_file: str, output_file: str, name: str, key: str, lang: str,
         output_file (str): Path to the output PDF file.
         name (str): PDFix license name.
         key (str): PDFix license key.
-        lang (str): Language identifier for OCR Tesseract.
-        zoom (float): Zoom level for rendering the page.
+        options (OcrOptions): Settings of the OCR run.
+
+    Returns:
+        Measurements of the OCR run.
     """
-    ocr(input_file, output_file, name, key, lang, zoom)
+    from tesseract import ocr
+
+    return ocr(input_file, output_file, name, key, options)
 
 
 def main() -> None:  # noqa: D103
@@ -103,6 +460,11 @@ def main() -> None:  # noqa: D103
     )
     parser.add_argument("--name", type=str, default="", help="license name")
     parser.add_argument("--key", type=str, default="", help="license key")
+    parser.add_argument(
+        "--check-updates",
+        action="store_true",
+        help=f"Check Docker Hub for a newer image once a day. Disabled by {UPDATE_CHECK_DISABLE_ENV}=1",
+    )
 
     subparsers = parser.add_subparsers(dest="subparser")
 
@@ -124,9 +486,136 @@ def main() -> None:  # noqa: D103
         "ocr",
         help="Run ocr in PDF document with predefined language.",
     )
-    set_arguments(ocr_subparser, ["name", "key", "input", "output", "lang"], True, "The output PDF file")
+    set_arguments(
+        ocr_subparser,
+        [
+            "name",
+            "key",
+            "input",
+            "output",
+            "lang",
+            "jobs",
+            "engine",
+            "mode",
+            "pages",
+            "first-n",
+            "regions",
+            "zoom",
+            "dpi",
+            "max-pixels",
+            "tile-size",
+            "render-mode",
+            "rotate-pages",
+            "deskew",
+            "cache-dir",
+            "cache-size",
+            "chunk-size",
+            "max-memory",
+            "save-mode",
+            "resume",
+            "shard",
+            "metrics-json",
+            "progress-json",
+        ],
+        True,
+        "The output PDF file, or the shard directory with --shard",
+    )
     ocr_subparser.set_defaults(func=run_ocr_subcommand)
 
+    # Merge subparser
+    merge_subparser = subparsers.add_parser(
+        "merge",
+        help="Put text layers of all shards of a document created by ocr --shard onto the PDF document.",
+    )
+    set_arguments(
+        merge_subparser,
+        ["name", "key", "input", "output", "shards", "save-mode", "metrics-json"],
+        True,
+        "The output PDF file",
+    )
+    merge_subparser.set_defaults(func=run_merge_subcommand)
+
+    # OCR batch subparser
+    ocr_batch_subparser = subparsers.add_parser(
+        "ocr-batch",
+        help="Run ocr in all PDF documents of a directory or JSONL manifest.",
+    )
+    set_arguments(
+        ocr_batch_subparser,
+        [
+            "name",
+            "key",
+            "batch-input",
+            "output",
+            "report",
+            "lang",
+            "jobs",
+            "engine",
+            "mode",
+            "pages",
+            "first-n",
+            "regions",
+            "zoom",
+            "dpi",
+            "max-pixels",
+            "tile-size",
+            "render-mode",
+            "rotate-pages",
+            "deskew",
+            "cache-dir",
+            "cache-size",
+            "chunk-size",
+            "max-memory",
+            "save-mode",
+            "resume",
+            "metrics-json",
+            "progress-json",
+        ],
+        False,
+        "The output directory. Required for input directory, optional for manifest",
+    )
+    ocr_batch_subparser.set_defaults(func=run_ocr_batch_subcommand)
+
+    # Serve subparser
+    serve_subparser = subparsers.add_parser(
+        "serve",
+        help="Run HTTP service for OCR of submitted PDF documents.",
+    )
+    set_arguments(
+        serve_subparser,
+        [
+            "name",
+            "key",
+            "host",
+            "port",
+            "queue-size",
+            "max-upload-size",
+            "job-ttl",
+            "work-dir",
+            "lang",
+            "jobs",
+            "engine",
+            "mode",
+            "pages",
+            "first-n",
+            "regions",
+            "zoom",
+            "dpi",
+            "max-pixels",
+            "tile-size",
+            "render-mode",
+            "rotate-pages",
+            "deskew",
+            "cache-dir",
+            "cache-size",
+            "chunk-size",
+            "max-memory",
+            "save-mode",
+            "progress-json",
+        ],
+    )
+    serve_subparser.set_defaults(func=run_serve_subcommand)
+
     # Parse arguments
     try:
         args = parser.parse_args()
@@ -145,11 +634,11 @@ def main() -> None:  # noqa: D103
         sys.exit(1)
 
     if hasattr(args, "func"):
-        # Check for updates only when help is not checked
-        update_checker = DockerImageContainerUpdateChecker()
-        # Check it in separate thread not to be delayed when there is slow or no internet connection
-        update_thread = threading.Thread(target=update_checker.check_for_image_updates)
-        update_thread.start()
+        # Check for updates only when asked for and help is not checked
+        if args.check_updates and not is_update_check_disabled():
+            update_checker = DockerImageContainerUpdateChecker()
+            # Daemon thread is not waited for, so neither start nor exit depends on the network
+            threading.Thread(target=update_checker.check_for_image_updates, daemon=True).start()
 
         # Run subcommand
         try:
@@ -161,9 +650,6 @@ def main() -> None:  # noqa: D103
             print(traceback.format_exc(), file=sys.stderr)
             print(f"Failed to run the program: {e}", file=sys.stderr)
             sys.exit(1)
-        finally:
-            # Make sure to let update thread finish before exiting
-            update_thread.join()
     else:
         parser.print_help()
 
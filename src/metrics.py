@@ -0,0 +1,212 @@
+import dataclasses
+import json
+import os
+import resource
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+# Seconds a listing of child processes is reused, listing reads the stat file of every process
+CHILD_PROCESSES_TTL: float = 1.0
+
+
+@dataclass
+class PageMetrics:
+    """
+    Measurements of OCR of one page.
+
+    Attributes:
+        page_index (int): Index of the page in the document.
+        dpi (float): Resolution the page was rendered in.
+        width (int): Width of the rendered bitmap in pixels, of the largest one with image regions.
+        height (int): Height of the rendered bitmap in pixels, of the largest one with image regions.
+        regions (int): Number of image regions recognized separately, 0 when the whole page was recognized.
+        tiles (int): Number of tiles recognized separately, 0 when no page or region was split.
+        render_seconds (float): Time spent rendering the page.
+        ocr_seconds (float): Time spent in the OCR worker, including cache lookup.
+        merge_seconds (float): Time spent placing the text layer onto the page.
+        cached (bool): Whether the OCR result was taken from the cache.
+        resumed (bool): Whether the OCR result was taken from the checkpoint of a previous run.
+        rotation (float): Clockwise rotation in degrees applied to the page image before OCR.
+        words (int): Number of recognized words.
+        confidence (float): Mean word confidence 0-100, -1 if not provided by the engine.
+        peak_rss_mb (float): Peak memory of the process and its children after the page was merged.
+    """
+
+    page_index: int
+    dpi: float = 0.0
+    width: int = 0
+    height: int = 0
+    regions: int = 0
+    tiles: int = 0
+    render_seconds: float = 0.0
+    ocr_seconds: float = 0.0
+    merge_seconds: float = 0.0
+    cached: bool = False
+    resumed: bool = False
+    rotation: float = 0.0
+    words: int = 0
+    confidence: float = -1.0
+    peak_rss_mb: float = 0.0
+
+
+@dataclass
+class DocumentMetrics:
+    """
+    Measurements of OCR of one document.
+
+    Attributes:
+        input_path (str): Path to the input PDF file.
+        output_path (str): Path to the output PDF file.
+        page_count (int): Number of pages of the document.
+        lang (str): Language identifier used for OCR Tesseract.
+        open_seconds (float): Time spent opening the document and selecting pages for OCR.
+        detect_seconds (float): Time spent detecting the language.
+        save_seconds (float): Time spent saving the document.
+        total_seconds (float): Time spent on the whole document.
+        peak_rss_mb (float): Peak memory of the process and its children after the document was saved.
+        flushes (int): Number of times the document was saved and reopened to release memory.
+        pages (list[PageMetrics]): Measurements of OCR-ed pages in page order.
+    """
+
+    input_path: str
+    output_path: str
+    page_count: int = 0
+    lang: str = ""
+    open_seconds: float = 0.0
+    detect_seconds: float = 0.0
+    save_seconds: float = 0.0
+    total_seconds: float = 0.0
+    peak_rss_mb: float = 0.0
+    flushes: int = 0
+    pages: list[PageMetrics] = field(default_factory=list)
+
+
+@dataclass
+class ChildProcesses:
+    """
+    Child processes found by the last listing.
+
+    Attributes:
+        pids (list[str]): Process ids of the children.
+        listed (float): Monotonic time of the listing.
+    """
+
+    pids: list[str] = field(default_factory=list)
+    listed: float = float("-inf")
+
+
+# Memory is measured several times per page, while children change only when OCR workers start or exit
+child_processes: ChildProcesses = ChildProcesses()
+
+
+def get_peak_rss_mb() -> float:
+    """
+    Get peak resident memory of the process and its child processes, e.g. OCR workers. Peaks of
+    the processes are summed, so it is an upper bound when they did not peak at the same time.
+
+    Returns:
+        Peak resident set size in MB.
+    """
+    # Linux reports kilobytes, macOS bytes
+    unit: int = 1024 * 1024 if sys.platform == "darwin" else 1024
+    peak_rss: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Largest of the exited children, e.g. tesseract executable run for one page or a crashed worker
+    peak_rss += resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    peak_mb: float = peak_rss / unit
+
+    # Running children are reported by the system only after they exit
+    for child in list_child_processes():
+        try:
+            with open(f"/proc/{child}/status", "r") as file:
+                for line in file:
+                    if line.startswith("VmHWM:"):
+                        peak_mb += int(line.split()[1]) / 1024
+                        break
+        except (OSError, IndexError, ValueError):
+            # Process exited while reading
+            continue
+
+    return peak_mb
+
+
+def get_current_memory_mb() -> float:
+    """
+    Get resident memory of the process and its child processes, e.g. OCR workers.
+
+    Returns:
+        Resident set size in MB. Peak memory of the processes where /proc is not available.
+    """
+    if not os.path.exists("/proc/self/statm"):
+        return get_peak_rss_mb()
+
+    page_size: int = os.sysconf("SC_PAGE_SIZE")
+    resident_pages: int = 0
+    for process in [str(os.getpid())] + list_child_processes():
+        try:
+            with open(f"/proc/{process}/statm", "r") as file:
+                resident_pages += int(file.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            # Process exited while reading
+            continue
+
+    return resident_pages * page_size / (1024 * 1024)
+
+
+def list_child_processes() -> list[str]:
+    """
+    List running child processes of the process. The listing is reused for a second, or until one
+    of the listed children exits, e.g. an OCR worker that is restarted.
+
+    Returns:
+        Process ids of the children, empty where /proc is not available.
+    """
+    if not os.path.isdir("/proc"):
+        return []
+
+    if time.monotonic() - child_processes.listed < CHILD_PROCESSES_TTL and all(
+        os.path.exists(f"/proc/{child}") for child in child_processes.pids
+    ):
+        return child_processes.pids
+
+    pid: str = str(os.getpid())
+    children: list[str] = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit() or entry == pid:
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as file:
+                # Parent id follows the state after the parenthesized command name
+                if file.read().rsplit(")", 1)[1].split()[1] == pid:
+                    children.append(entry)
+        except (OSError, IndexError, ValueError):
+            # Process exited while reading
+            continue
+
+    child_processes.pids = children
+    child_processes.listed = time.monotonic()
+    return children
+
+
+def emit_progress(event: str, values: dict[str, Any]) -> None:
+    """
+    Write one machine-readable progress line as JSON to stderr.
+
+    Args:
+        event (str): Kind of progress event ("start", "page" or "document").
+        values (dict[str, Any]): Values of the event.
+    """
+    print(json.dumps({"event": event, **values}), file=sys.stderr, flush=True)
+
+
+def write_metrics_json(documents: list[DocumentMetrics], metrics_path: str) -> None:
+    """
+    Write measurements of all processed documents as JSON.
+
+    Args:
+        documents (list[DocumentMetrics]): Measurements of the documents.
+        metrics_path (str): Path to the JSON report.
+    """
+    with open(metrics_path, "w", encoding="utf-8") as file:
+        json.dump({"documents": [dataclasses.asdict(document) for document in documents]}, file, indent=2)
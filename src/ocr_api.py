@@ -0,0 +1,194 @@
+"""
+Asyncio API for OCR of PDF documents in the calling process, without starting the command line tool:
+
+    async with OcrClient(license_name, license_key, OcrOptions(lang="eng")) as client:
+        metrics = await client.ocr_document("scanned.pdf", "ocr.pdf", progress=on_progress)
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from tqdm import tqdm
+
+from exceptions import ArgumentInputMissingException, ArgumentInputPdfOutputPdfException, ExpectedException, OcrError
+from metrics import DocumentMetrics
+from ocr_options import OcrOptions
+from tesseract import OcrSession, process_document
+
+
+class OcrClient:
+    """
+    OCR session shared by documents submitted from asyncio code. PDFix SDK is used from one background
+    thread, so documents submitted concurrently are opened and saved one at a time while pages of the
+    running document are recognized in parallel by the OCR workers. Nothing is printed to stdout, OCR
+    workers restarted after a crash are reported to stderr.
+
+    With the tesserocr engine OCR workers are spawned processes, so the script using the client needs
+    the usual `if __name__ == "__main__":` guard.
+    """
+
+    def __init__(self, license_name: str = "", license_key: str = "", options: Optional[OcrOptions] = None) -> None:
+        """
+        Args:
+            license_name (str): Pdfix SDK license name. Trial if empty.
+            license_key (str): Pdfix SDK license key. Trial if empty.
+            options (Optional[OcrOptions]): Default settings of documents. Engine and number of workers
+                of the session are taken from them.
+        """
+        self.license_name: str = license_name
+        self.license_key: str = license_key
+        self.options: OcrOptions = options if options is not None else OcrOptions()
+        self._session: Optional[OcrSession] = None
+        self._thread: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr-document")
+        self._start_lock: asyncio.Lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "OcrClient":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """
+        Initialize PDFix SDK, Tesseract engine and OCR workers. Called by the first document if not
+        called before.
+
+        Raises:
+            OcrError: PDFix SDK or the engine failed to initialize.
+        """
+        async with self._start_lock:
+            if self._session is None:
+                loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+                self._session = await loop.run_in_executor(self._thread, self._create_session)
+
+    async def ocr_document(
+        self,
+        input_path: str,
+        output_path: str,
+        options: Optional[OcrOptions] = None,
+        progress: Optional[Callable[[str, dict[str, Any]], None]] = None,
+    ) -> DocumentMetrics:
+        """
+        Run OCR of one document. Cancelling the call stops the document after the page being merged.
+
+        Args:
+            input_path (str): Input path to the PDF file.
+            output_path (str): Output path for saving the PDF file.
+            options (Optional[OcrOptions]): Settings of the document. Default settings of the client if None.
+            progress (Optional[Callable[[str, dict[str, Any]], None]]): Called in the event loop with progress
+                events "start", "page" and "document" and their values, the same as written by --progress-json.
+
+        Returns:
+            Measurements of the document and each of its pages.
+
+        Raises:
+            OcrError: The document could not be processed.
+        """
+        await self.start()
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        cancelled: threading.Event = threading.Event()
+
+        def report(event: str, values: dict[str, Any]) -> None:
+            # Runs in the document thread, raising here stops the document
+            if cancelled.is_set():
+                raise asyncio.CancelledError()
+            if progress is not None:
+                loop.call_soon_threadsafe(progress, event, values)
+
+        document_options: OcrOptions = options if options is not None else self.options
+        try:
+            return await loop.run_in_executor(
+                self._thread, self._process_document, input_path, output_path, document_options, report
+            )
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def close(self) -> None:
+        """
+        Stop OCR workers and release Tesseract engine. The client cannot be used afterwards.
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        session: Optional[OcrSession] = self._session
+        self._session = None
+        if session is not None:
+            await loop.run_in_executor(self._thread, session.close)
+        self._thread.shutdown(wait=False)
+
+    def _create_session(self) -> OcrSession:
+        """
+        Create the OCR session in the document thread.
+
+        Returns:
+            Initialized session.
+        """
+        try:
+            return OcrSession(self.license_name, self.license_key, self.options, verbose=False)
+        except ExpectedException as e:
+            raise OcrError(e.error_code, e.message) from e
+
+    def _process_document(
+        self,
+        input_path: str,
+        output_path: str,
+        options: OcrOptions,
+        progress: Callable[[str, dict[str, Any]], None],
+    ) -> DocumentMetrics:
+        """
+        Run OCR of one document in the document thread.
+
+        Args:
+            input_path (str): Input path to the PDF file.
+            output_path (str): Output path for saving the PDF file.
+            options (OcrOptions): Settings of the document.
+            progress (Callable[[str, dict[str, Any]], None]): Receiver of progress events.
+
+        Returns:
+            Measurements of the document and each of its pages.
+        """
+        if self._session is None:
+            raise OcrError(1, "OCR client is closed.")
+
+        try:
+            if not os.path.isfile(input_path):
+                raise ArgumentInputMissingException(input_path)
+            if not input_path.lower().endswith(".pdf") or not output_path.lower().endswith(".pdf"):
+                raise ArgumentInputPdfOutputPdfException()
+
+            with tqdm(disable=True) as progress_bar:
+                return process_document(self._session, progress_bar, input_path, output_path, options, progress)
+        except ExpectedException as e:
+            raise OcrError(e.error_code, e.message) from e
+
+
+async def ocr_document(
+    input_path: str,
+    output_path: str,
+    options: Optional[OcrOptions] = None,
+    license_name: str = "",
+    license_key: str = "",
+    progress: Optional[Callable[[str, dict[str, Any]], None]] = None,
+) -> DocumentMetrics:
+    """
+    Run OCR of one document with a session of its own. OcrClient keeps the session for many documents.
+
+    Args:
+        input_path (str): Input path to the PDF file.
+        output_path (str): Output path for saving the PDF file.
+        options (Optional[OcrOptions]): Settings of the OCR run. Defaults if None.
+        license_name (str): Pdfix SDK license name. Trial if empty.
+        license_key (str): Pdfix SDK license key. Trial if empty.
+        progress (Optional[Callable[[str, dict[str, Any]], None]]): Called in the event loop with progress events.
+
+    Returns:
+        Measurements of the document and each of its pages.
+
+    Raises:
+        OcrError: The document could not be processed.
+    """
+    async with OcrClient(license_name, license_key, options) as client:
+        return await client.ocr_document(input_path, output_path, progress=progress)
@@ -0,0 +1,227 @@
+import dataclasses
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from exceptions import (
+    ArgumentInputMissingException,
+    ArgumentInputPdfOutputPdfException,
+    ArgumentInvalidBatchException,
+    ExpectedException,
+)
+from metrics import DocumentMetrics
+from ocr_options import OcrOptions
+from tesseract import OcrSession, ocr_document
+
+
+@dataclass
+class BatchItem:
+    """
+    One document of the batch.
+
+    Attributes:
+        input_path (str): Path to the input PDF file.
+        output_path (str): Path to the output PDF file.
+        lang (str): Language identifier overriding the batch language. Empty to use the batch language.
+    """
+
+    input_path: str
+    output_path: str
+    lang: str = ""
+
+
+@dataclass
+class BatchResult:
+    """
+    Outcome of OCR of one document of the batch.
+
+    Attributes:
+        input_path (str): Path to the input PDF file.
+        output_path (str): Path to the output PDF file.
+        error_code (int): 0 on success, otherwise the exit code the ocr subcommand would return.
+        message (str): Error message. Empty on success.
+        seconds (float): Time spent on the document.
+        metrics (Optional[DocumentMetrics]): Measurements of the OCR run. None if the document failed.
+    """
+
+    input_path: str
+    output_path: str
+    error_code: int = 0
+    message: str = ""
+    seconds: float = 0.0
+    metrics: Optional[DocumentMetrics] = None
+
+
+def load_batch_items(input_path: str, output_dir: str) -> list[BatchItem]:
+    """
+    Collect documents of the batch from an input directory or a JSONL manifest.
+
+    Args:
+        input_path (str): Directory with PDF files or path to JSONL manifest.
+        output_dir (str): Output directory. Required for directory input, optional for manifest
+            entries which specify their own output.
+
+    Returns:
+        Documents of the batch.
+    """
+    if os.path.isdir(input_path):
+        if not output_dir:
+            raise ArgumentInvalidBatchException("Output directory is required for input directory.")
+        return find_pdf_files(input_path, output_dir)
+
+    if os.path.isfile(input_path):
+        return read_manifest(input_path, output_dir)
+
+    raise ArgumentInputMissingException(input_path)
+
+
+def find_pdf_files(input_dir: str, output_dir: str) -> list[BatchItem]:
+    """
+    Find all PDF files in the directory and its subdirectories. Directory structure is mirrored
+    in the output directory.
+
+    Args:
+        input_dir (str): Directory with PDF files.
+        output_dir (str): Output directory.
+
+    Returns:
+        Documents of the batch sorted by path.
+    """
+    input_root: Path = Path(input_dir).resolve()
+    output_root: Path = Path(output_dir).resolve()
+
+    items: list[BatchItem] = []
+    for path in sorted(input_root.rglob("*")):
+        if not path.is_file() or path.suffix.lower() != ".pdf":
+            continue
+        # Skip results of previous runs when output directory is inside input directory
+        if path.is_relative_to(output_root):
+            continue
+        items.append(BatchItem(str(path), str(output_root.joinpath(path.relative_to(input_root)))))
+
+    return items
+
+
+def read_manifest(manifest_path: str, output_dir: str) -> list[BatchItem]:
+    """
+    Read documents of the batch from JSONL manifest. Each line is a JSON object with "input"
+    and optional "output" and "lang". Relative paths are resolved against the manifest directory.
+
+    Args:
+        manifest_path (str): Path to JSONL manifest.
+        output_dir (str): Output directory used for entries without "output".
+
+    Returns:
+        Documents of the batch in manifest order.
+    """
+    manifest_dir: Path = Path(manifest_path).resolve().parent
+
+    items: list[BatchItem] = []
+    with open(manifest_path, "r", encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            if line.strip() == "":
+                continue
+
+            try:
+                entry: Any = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ArgumentInvalidBatchException(f"Line {line_number}: {e}")
+
+            if not isinstance(entry, dict) or not isinstance(entry.get("input"), str):
+                raise ArgumentInvalidBatchException(f'Line {line_number}: missing "input".')
+
+            input_file: Path = manifest_dir.joinpath(entry["input"])
+            if isinstance(entry.get("output"), str):
+                output_file: Path = manifest_dir.joinpath(entry["output"])
+            elif output_dir:
+                output_file = Path(output_dir).resolve().joinpath(input_file.name)
+            else:
+                raise ArgumentInvalidBatchException(f'Line {line_number}: missing "output" and no output directory.')
+
+            lang: Any = entry.get("lang", "")
+            items.append(BatchItem(str(input_file), str(output_file), lang if isinstance(lang, str) else ""))
+
+    return items
+
+
+def ocr_batch(items: list[BatchItem], license_name: str, license_key: str, options: OcrOptions) -> list[BatchResult]:
+    """
+    Run OCR of all documents of the batch. PDFix SDK, Tesseract engine and OCR workers are
+    initialized once. Failure of one document does not stop processing of the others.
+
+    Args:
+        items (list[BatchItem]): Documents of the batch.
+        license_name (str): Pdfix SDK license name.
+        license_key (str): Pdfix SDK license key.
+        options (OcrOptions): Settings of the OCR run.
+
+    Returns:
+        Results in the order of the documents.
+    """
+    results: list[BatchResult] = []
+
+    session: OcrSession = OcrSession(license_name, license_key, options)
+    try:
+        for item in items:
+            print(f"Processing: {item.input_path}")
+            result: BatchResult = BatchResult(item.input_path, item.output_path)
+            start: float = time.perf_counter()
+
+            try:
+                if not os.path.isfile(item.input_path):
+                    raise ArgumentInputMissingException(item.input_path)
+                if not item.input_path.lower().endswith(".pdf") or not item.output_path.lower().endswith(".pdf"):
+                    raise ArgumentInputPdfOutputPdfException()
+
+                os.makedirs(os.path.dirname(item.output_path) or ".", exist_ok=True)
+                item_options: OcrOptions = dataclasses.replace(options, lang=item.lang) if item.lang else options
+                result.metrics = ocr_document(session, item.input_path, item.output_path, item_options)
+            except ExpectedException as e:
+                result.error_code = e.error_code
+                result.message = e.message
+            except Exception as e:
+                result.error_code = 1
+                result.message = str(e)
+
+            result.seconds = time.perf_counter() - start
+            print_batch_result(result)
+            results.append(result)
+    except Exception:
+        raise
+    finally:
+        session.close()
+
+    return results
+
+
+def print_batch_result(result: BatchResult) -> None:
+    """
+    Print one line summarizing the result of a document.
+
+    Args:
+        result (BatchResult): Outcome of OCR of the document.
+    """
+    if result.error_code == 0:
+        print(f"OK ({result.seconds:.2f} s): {result.input_path} -> {result.output_path}")
+    else:
+        print(f"FAILED [{result.error_code}] ({result.seconds:.2f} s): {result.input_path}: {result.message}")
+
+
+def write_batch_report(results: list[BatchResult], report_path: str) -> None:
+    """
+    Write results of the batch as JSONL, one object per document.
+
+    Args:
+        results (list[BatchResult]): Results of the batch.
+        report_path (str): Path to the report file.
+    """
+    with open(report_path, "w", encoding="utf-8") as file:
+        for result in results:
+            # Page measurements are written by --metrics-json
+            values: dict[str, Any] = {
+                key: value for key, value in dataclasses.asdict(result).items() if key != "metrics"
+            }
+            file.write(json.dumps(values) + "\n")
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Optional
+
+from PIL import Image
+
+from ocr_engine import OcrResult, get_image_dpi
+
+# Change when the format of cached OCR results changes, so that old entries are not used
+CACHE_FORMAT: str = "2"
+# Extension of cached results, a JSON line with confidence and rotation followed by the raw PDF bytes
+ENTRY_SUFFIX: str = ".ocr"
+# Extensions of results written by this or older formats, counted in the cache size and evicted
+ENTRY_SUFFIXES: tuple[str, ...] = (ENTRY_SUFFIX, ".pdf")
+# Eviction frees some space below the limit, so that the cache is not scanned on every new result
+EVICT_TO_RATIO: float = 0.9
+
+
+class OcrCache:
+    """
+    On-disk cache of OCR results keyed by the rendered page bitmap and OCR settings. Entries are
+    evicted in least recently used order when the cache grows over its size limit.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int) -> None:
+        """
+        Args:
+            cache_dir (str): Directory of the cache. Created if it does not exist.
+            max_size (int): Maximum total size of cached results in bytes.
+        """
+        self.cache_dir: str = cache_dir
+        self.max_size: int = max_size
+        self.hits: int = 0
+        self.misses: int = 0
+        self._lock: threading.Lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size: int = sum(size for _, _, size in self._list_entries())
+
+    def get_key(
+        self, image: Image.Image, lang: str, engine_name: str, model_version: str, rotate_pages: bool, deskew: bool
+    ) -> str:
+        """
+        Compute cache key of the page. Zoom and render mode are part of the bitmap itself. The key
+        is computed from the image before rotation, so that a cached page skips detection of its
+        rotation as well.
+
+        Args:
+            image (Image.Image): Rendered page image.
+            lang (str): Language identifier for OCR Tesseract.
+            engine_name (str): Name of the Tesseract engine.
+            model_version (str): Tesseract version and language models used for the language.
+            rotate_pages (bool): Whether the image is turned upright before OCR.
+            deskew (bool): Whether text lines of the image are straightened before OCR.
+
+        Returns:
+            Hex digest identifying the OCR result.
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{CACHE_FORMAT}|{engine_name}|{model_version}|{lang}|".encode("utf-8"))
+        digest.update(f"{rotate_pages}|{deskew}|{get_image_dpi(image)}|".encode("utf-8"))
+        digest.update(f"{image.mode}|{image.width}x{image.height}|".encode("utf-8"))
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[OcrResult]:
+        """
+        Read cached OCR result and mark it as recently used.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            OCR page with its confidence and rotation applied to the image, or None if not cached.
+        """
+        path: str = self._get_path(key)
+        try:
+            with open(path, "rb") as f:
+                header: dict[str, Any] = json.loads(f.readline())
+                data: bytes = f.read()
+            os.utime(path)
+            result: OcrResult = OcrResult(
+                data, float(header["confidence"]), cached=True, rotation=float(header["rotation"])
+            )
+        except (OSError, ValueError, LookupError, TypeError):
+            # Not cached, or removed while being read by another process sharing the cache
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def put(self, key: str, result: OcrResult) -> None:
+        """
+        Store OCR result and evict least recently used results over the size limit.
+
+        Args:
+            key (str): Cache key.
+            result (OcrResult): OCR page with its confidence and rotation applied to the image.
+        """
+        header: bytes = json.dumps({"confidence": result.confidence, "rotation": result.rotation}).encode("utf-8")
+        path: str = self._get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first, so that readers never see a partial result
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header + b"\n")
+                f.write(result.data)
+            os.replace(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+        with self._lock:
+            self._size += len(header) + 1 + len(result.data)
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self) -> None:
+        """
+        Remove least recently used results until the cache fits its size limit. Called with lock held.
+        """
+        entries: list[tuple[float, str, int]] = sorted(self._list_entries())
+        self._size = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if self._size <= self.max_size * EVICT_TO_RATIO:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
+
+    def _list_entries(self) -> list[tuple[float, str, int]]:
+        """
+        List cached results.
+
+        Returns:
+            List of (last use time, path, size in bytes).
+        """
+        entries: list[tuple[float, str, int]] = []
+        for directory in os.scandir(self.cache_dir):
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory.path):
+                if not entry.name.endswith(ENTRY_SUFFIXES):
+                    continue
+                try:
+                    stat: os.stat_result = entry.stat()
+                except OSError:
+                    # Removed meanwhile by another process sharing the cache
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def _get_path(self, key: str) -> str:
+        """
+        Path of the cached result. Results are spread over subdirectories by the key prefix.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            Path to the cached result.
+        """
+        return os.path.join(self.cache_dir, key[:2], f"{key}{ENTRY_SUFFIX}")
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from typing import Any, Optional
+
+from ocr_engine import OcrResult
+
+# Change when the format of checkpoints changes, so that old checkpoints are not used
+CHECKPOINT_FORMAT: str = "4"
+STATE_FILE: str = "checkpoint.json"
+DIGEST_BLOCK_SIZE: int = 1024 * 1024
+# Files written for a page, the list of its results and an OCR page of every result
+PAGE_RESULTS_PATTERN: re.Pattern[str] = re.compile(r"page_(\d+)\.json")
+PAGE_FILE_PATTERN: re.Pattern[str] = re.compile(r"page_\d+(\.json|_\d+\.pdf)")
+
+
+class OcrCheckpoint:
+    """
+    Sidecar directory of OCR results of already processed pages of one document. A rerun of
+    the same document with the same settings merges these results instead of running OCR again.
+    """
+
+    def __init__(self, checkpoint_dir: str, state: dict[str, Any]) -> None:
+        """
+        Open the checkpoint directory, discarding results that belong to another input or settings.
+
+        Args:
+            checkpoint_dir (str): Directory of the checkpoint. Created if it does not exist.
+            state (dict[str, Any]): Identification of the input document and OCR settings.
+        """
+        self.checkpoint_dir: str = checkpoint_dir
+        self.state: dict[str, Any] = {"format": CHECKPOINT_FORMAT} | state
+
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        state_path: str = os.path.join(checkpoint_dir, STATE_FILE)
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                previous_state: Optional[dict[str, Any]] = json.load(f)
+        except (OSError, ValueError):
+            previous_state = None
+
+        if previous_state != self.state:
+            # Other files are left alone, the directory may be given by the user
+            for entry in os.scandir(checkpoint_dir):
+                if PAGE_FILE_PATTERN.fullmatch(entry.name):
+                    os.remove(entry.path)
+            with open(state_path, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, indent=2)
+
+    def get_page_indexes(self) -> set[int]:
+        """
+        Find pages with stored OCR results.
+
+        Returns:
+            Indexes of checkpointed pages.
+        """
+        page_indexes: set[int] = set()
+        for entry in os.scandir(self.checkpoint_dir):
+            match: Optional[re.Match[str]] = PAGE_RESULTS_PATTERN.fullmatch(entry.name)
+            if match:
+                page_indexes.add(int(match.group(1)))
+        return page_indexes
+
+    def get(self, page_index: int) -> Optional[list[OcrResult]]:
+        """
+        Read stored OCR results of the page.
+
+        Args:
+            page_index (int): Index of the page.
+
+        Returns:
+            OCR pages of the whole page, its image regions or tiles with their confidence, rotation,
+            region and clip, or None if the page is not checkpointed.
+        """
+        results: list[OcrResult] = []
+        try:
+            with open(self._get_path(page_index, ".json"), "r", encoding="utf-8") as f:
+                values: list[dict[str, Any]] = json.load(f)
+            for index, value in enumerate(values):
+                with open(self._get_path(page_index, f"_{index}.pdf"), "rb") as f:
+                    data: bytes = f.read()
+                results.append(
+                    OcrResult(
+                        data,
+                        confidence=value["confidence"],
+                        rotation=value["rotation"],
+                        region=read_area(value["region"]),
+                        clip=read_area(value["clip"]),
+                    )
+                )
+        except (OSError, ValueError, LookupError):
+            return None
+
+        return results
+
+    def put(self, page_index: int, results: list[OcrResult]) -> None:
+        """
+        Store OCR results of the page.
+
+        Args:
+            page_index (int): Index of the page.
+            results (list[OcrResult]): OCR pages of the whole page, its image regions or tiles. Empty for
+                pages without image regions.
+        """
+        for index, result in enumerate(results):
+            self._write(self._get_path(page_index, f"_{index}.pdf"), result.data)
+        # The page counts as done once its list of results exists, so it is written last
+        values: list[dict[str, Any]] = [
+            {"confidence": result.confidence, "rotation": result.rotation, "region": result.region, "clip": result.clip}
+            for result in results
+        ]
+        self._write(self._get_path(page_index, ".json"), json.dumps(values).encode("utf-8"))
+
+    def _write(self, path: str, data: bytes) -> None:
+        """
+        Write file of the checkpoint.
+
+        Args:
+            path (str): Path to the file.
+            data (bytes): Content of the file.
+        """
+        # Write to a temporary file first, so that a killed run never leaves a partial result
+        fd, temp_path = tempfile.mkstemp(dir=self.checkpoint_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+    def remove(self) -> None:
+        """
+        Remove the checkpoint after the output document was saved.
+        """
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+
+    def _get_path(self, page_index: int, suffix: str) -> str:
+        """
+        Path of a stored file of the page.
+
+        Args:
+            page_index (int): Index of the page.
+            suffix (str): End of the file name after the page index.
+
+        Returns:
+            Path to the stored file.
+        """
+        return os.path.join(self.checkpoint_dir, f"page_{page_index}{suffix}")
+
+
+def read_checkpoint_state(checkpoint_dir: str) -> Optional[dict[str, Any]]:
+    """
+    Read identification of the input document and OCR settings of an existing checkpoint without
+    changing it.
+
+    Args:
+        checkpoint_dir (str): Directory of the checkpoint.
+
+    Returns:
+        State of the checkpoint including its format, or None if the directory is not a checkpoint.
+    """
+    try:
+        with open(os.path.join(checkpoint_dir, STATE_FILE), "r", encoding="utf-8") as f:
+            state: Any = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if isinstance(state, dict) else None
+
+
+def get_file_digest(path: str) -> str:
+    """
+    Compute digest of the file content, which identifies the input on every machine unlike its
+    path and modification time.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        Hex digest of the file.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(DIGEST_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_area(values: Optional[list[float]]) -> Optional[tuple[float, float, float, float]]:
+    """
+    Convert an area of the page read from JSON.
+
+    Args:
+        values (Optional[list[float]]): Left, bottom, right and top, or None.
+
+    Returns:
+        Area as (left, bottom, right, top), or None.
+    """
+    return None if values is None else (values[0], values[1], values[2], values[3])
+
+
+def get_checkpoint_dir(output_path: str) -> str:
+    """
+    Get the sidecar checkpoint directory of the output file.
+
+    Args:
+        output_path (str): Output path for saving the PDF file.
+
+    Returns:
+        Path to the checkpoint directory next to the output file.
+    """
+    return f"{output_path}.checkpoint"
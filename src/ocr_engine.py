@@ -0,0 +1,640 @@
+import ctypes
+import json
+import multiprocessing
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar
+
+import pytesseract
+from PIL import Image
+
+from constants import ENGINE_AUTO, ENGINE_PYTESSERACT, ENGINE_TESSEROCR
+from exceptions import ArgumentEngineUnavailableException, TesseractFailedToOcrException
+from user_cache import get_user_cache_path
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+LANGUAGES_FILE: str = "languages.json"
+# Most Tesseract instances a worker process keeps loaded, the least recently used one is released first
+MAX_WORKER_APIS: int = 4
+
+T = TypeVar("T")
+
+
+@dataclass
+class OcrResult:
+    """
+    Result of OCR of one page.
+
+    Attributes:
+        data (bytes): Raw PDF bytes (OCR page).
+        confidence (float): Mean word confidence 0-100, -1 if not provided by the engine.
+        cached (bool): Whether the result was taken from the OCR cache.
+        seconds (float): Time spent on the page in the OCR worker.
+        rotation (float): Clockwise rotation in degrees applied to the page image before OCR.
+        region (Optional[tuple[float, float, float, float]]): Area of the page the image was rendered from
+            as (left, bottom, right, top) in page coordinates. None for the whole page.
+        clip (Optional[tuple[float, float, float, float]]): Part of the region owned by the tile the image was
+            rendered from, words centered outside it are dropped. None keeps all words.
+    """
+
+    data: bytes
+    confidence: float = -1.0
+    cached: bool = False
+    seconds: float = 0.0
+    rotation: float = 0.0
+    region: Optional[tuple[float, float, float, float]] = None
+    clip: Optional[tuple[float, float, float, float]] = None
+
+
+@dataclass
+class OsdResult:
+    """
+    Result of orientation and script detection of one page.
+
+    Attributes:
+        rotate (int): Clockwise rotation in degrees (0, 90, 180 or 270) that makes the text upright.
+        orientation_confidence (float): Confidence of the orientation, 0 if not detected.
+        script (str): Name of the detected script like "Latin" or "Cyrillic", empty if not detected.
+        script_confidence (float): Confidence of the script, 0 if not detected.
+    """
+
+    rotate: int = 0
+    orientation_confidence: float = 0.0
+    script: str = ""
+    script_confidence: float = 0.0
+
+
+class OcrEngine(ABC):
+    """
+    Base class for Tesseract engines. Engines are safe to use from multiple worker threads.
+    """
+
+    name: str = ""
+    _languages: Optional[list[str]] = None
+    _tessdata_dir: str = ""
+    _version: Optional[str] = None
+
+    def get_languages(self) -> list[str]:
+        """
+        List languages available to the engine. The list is computed once per engine and kept in
+        the cache directory of the user until the tessdata directory changes.
+
+        Returns:
+            List of Tesseract language identifiers.
+        """
+        if self._languages is None:
+            cached: Optional[tuple[str, list[str]]] = get_cached_languages(self.name)
+            if cached is not None:
+                self._tessdata_dir, self._languages = cached
+        if self._languages is None:
+            self._tessdata_dir, self._languages = self.list_languages()
+            put_cached_languages(self.name, self._tessdata_dir, self._languages)
+        return self._languages
+
+    def get_model_version(self, lang: str) -> str:
+        """
+        Identify Tesseract version and language models used for the language, so that cached
+        results of another Tesseract or of replaced traineddata files are not reused.
+
+        Args:
+            lang (str): Language identifier for OCR Tesseract.
+
+        Returns:
+            Tesseract version with size and modification time of every traineddata file of the language.
+        """
+        if self._version is None:
+            self._version = self.get_tesseract_version()
+        self.get_languages()
+
+        parts: list[str] = [self._version]
+        for part in lang.split("+"):
+            try:
+                stat: os.stat_result = os.stat(os.path.join(self._tessdata_dir, f"{part}.traineddata"))
+                parts.append(f"{part}:{stat.st_size}:{stat.st_mtime_ns}")
+            except OSError:
+                # Tessdata directory not reported by the engine
+                parts.append(part)
+        return "|".join(parts)
+
+    @abstractmethod
+    def get_tesseract_version(self) -> str:
+        """
+        Ask Tesseract for its version.
+
+        Returns:
+            Version of the Tesseract library used by the engine.
+        """
+
+    @abstractmethod
+    def list_languages(self) -> tuple[str, list[str]]:
+        """
+        Ask Tesseract for the languages available to the engine.
+
+        Returns:
+            Tessdata directory, empty if not reported, and list of Tesseract language identifiers.
+        """
+
+    @abstractmethod
+    def recognize(self, image: Image.Image, lang: str) -> OcrResult:
+        """
+        Run OCR on a rendered page image.
+
+        Args:
+            image (Image.Image): Rendered page image.
+            lang (str): Language identifier for OCR Tesseract.
+
+        Returns:
+            OCR page and its confidence.
+        """
+
+    @abstractmethod
+    def recognize_text(self, image: Image.Image, lang: str) -> str:
+        """
+        Run OCR on a rendered page image and return only the plain text.
+
+        Args:
+            image (Image.Image): Rendered page image.
+            lang (str): Language identifier for OCR Tesseract.
+
+        Returns:
+            Recognized text.
+        """
+
+    @abstractmethod
+    def detect_orientation_script(self, image: Image.Image) -> OsdResult:
+        """
+        Detect orientation and script of the text on a rendered page image.
+
+        Args:
+            image (Image.Image): Rendered page image.
+
+        Returns:
+            Detected orientation and script, empty if the page has too little text.
+        """
+
+    def preload(self, lang: str, count: int) -> None:
+        """
+        Load language models in advance, so that the first pages are not delayed.
+
+        Args:
+            lang (str): Language identifier for OCR Tesseract.
+            count (int): Number of workers that will use the language concurrently.
+        """
+
+    def close(self) -> None:
+        """
+        Release all resources held by the engine.
+        """
+
+
+class PytesseractEngine(OcrEngine):
+    """
+    Runs the tesseract executable for every page.
+    """
+
+    name: str = ENGINE_PYTESSERACT
+
+    def list_languages(self) -> tuple[str, list[str]]:
+        output: str = subprocess.run(
+            [pytesseract.pytesseract.tesseract_cmd, "--list-langs"], capture_output=True, text=True, check=True
+        ).stdout
+        # First line is 'List of available languages in "<tessdata>" (<count>):' on Tesseract 5
+        lines: list[str] = output.splitlines()
+        match: Optional[re.Match[str]] = re.search(r'"(.*)"', lines[0]) if lines else None
+        return match.group(1) if match else "", [line.strip() for line in lines[1:] if line.strip()]
+
+    def get_tesseract_version(self) -> str:
+        return str(pytesseract.get_tesseract_version())
+
+    def recognize(self, image: Image.Image, lang: str) -> OcrResult:
+        dpi: int = get_image_dpi(image)
+        # Image is removed from the OCR page anyway, do not let Tesseract embed it
+        config: str = "-c textonly_pdf=1"
+        if dpi > 0:
+            config += f" --dpi {dpi}"
+        data: bytes = pytesseract.image_to_pdf_or_hocr(
+            image,
+            extension="pdf",
+            lang=lang,
+            config=config,
+        )
+        return OcrResult(data)
+
+    def recognize_text(self, image: Image.Image, lang: str) -> str:
+        dpi: int = get_image_dpi(image)
+        return pytesseract.image_to_string(image, lang=lang, config=f"--dpi {dpi}" if dpi > 0 else "")
+
+    def detect_orientation_script(self, image: Image.Image) -> OsdResult:
+        dpi: int = get_image_dpi(image)
+        try:
+            osd: dict[str, Any] = pytesseract.image_to_osd(
+                image, config=f"--dpi {dpi}" if dpi > 0 else "", output_type=pytesseract.Output.DICT
+            )
+        except pytesseract.TesseractError:
+            # Too few characters on the page
+            return OsdResult()
+        return OsdResult(
+            int(osd["rotate"]), float(osd["orientation_conf"]), str(osd["script"]), float(osd["script_conf"])
+        )
+
+
+class TesserocrEngine(OcrEngine):
+    """
+    Keeps initialized Tesseract instances alive, so the language model is loaded only once
+    per worker and reused for all following pages and documents.
+
+    Each worker is a separate process. Tesseract PDF output is only available through
+    ProcessPages, which holds the GIL for the whole recognition, so worker threads would
+    recognize pages one at a time.
+    """
+
+    name: str = ENGINE_TESSEROCR
+
+    def __init__(self, workers: int) -> None:
+        """
+        Args:
+            workers (int): Number of worker processes.
+        """
+        self._workers: int = workers
+        self._lock: threading.Lock = threading.Lock()
+        self._executor: ProcessPoolExecutor = self._create_executor()
+
+    def list_languages(self) -> tuple[str, list[str]]:
+        tessdata_dir, languages = tesserocr.get_languages()
+        return tessdata_dir, list(languages)
+
+    def get_tesseract_version(self) -> str:
+        # First line is "tesseract <version>", followed by versions of the image libraries
+        return str(tesserocr.tesseract_version()).splitlines()[0]
+
+    def recognize(self, image: Image.Image, lang: str) -> OcrResult:
+        return self._run_in_worker(recognize_in_worker, image, lang)
+
+    def recognize_text(self, image: Image.Image, lang: str) -> str:
+        return self._run_in_worker(recognize_text_in_worker, image, lang)
+
+    def detect_orientation_script(self, image: Image.Image) -> OsdResult:
+        return self._run_in_worker(detect_orientation_script_in_worker, image)
+
+    def preload(self, lang: str, count: int) -> None:
+        # Worker processes are started on demand, every task waiting in the queue starts a new one
+        futures: list[Future[None]] = [self._executor.submit(preload_in_worker, lang) for _ in range(count)]
+        for future in futures:
+            future.result()
+
+    def close(self) -> None:
+        # Tesseract instances are released with the worker processes
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        """
+        Create pool of worker processes.
+
+        Returns:
+            Process pool, workers are started on demand.
+        """
+        # Parent process has running threads and PDFix SDK loaded, which must not be forked
+        return ProcessPoolExecutor(
+            max_workers=self._workers, mp_context=multiprocessing.get_context("spawn"), initializer=init_worker
+        )
+
+    def _run_in_worker(self, function: Callable[..., T], *args: Any) -> T:
+        """
+        Run the function in a worker process. If a worker process died, e.g. killed for using too
+        much memory, the pool is replaced by a new one and the function is run once more.
+
+        Args:
+            function (Callable[..., T]): Module level function to run.
+            *args (Any): Arguments of the function.
+
+        Returns:
+            Return value of the function.
+        """
+        executor: ProcessPoolExecutor = self._executor
+        try:
+            return executor.submit(function, *args).result()
+        except BrokenProcessPool:
+            with self._lock:
+                # Pages running concurrently fail together, only the first one replaces the pool
+                if self._executor is executor:
+                    print("OCR worker process stopped unexpectedly, restarting OCR workers", file=sys.stderr)
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = self._create_executor()
+            return self._executor.submit(function, *args).result()
+
+
+# Tesseract instances of the worker process for each language, most recently used last
+worker_apis: OrderedDict[str, Any] = OrderedDict()
+# Key of the orientation and script detection instance in worker_apis, not a language identifier
+OSD_API_KEY: str = "#osd"
+
+
+def init_worker() -> None:
+    """
+    Prepare the worker process. Ctrl+C is delivered to the whole process group, the parent
+    process stops the workers itself.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def get_worker_api(lang: str) -> Any:
+    """
+    Get Tesseract instance of the worker process for the language, initializing it on first use.
+
+    Args:
+        lang (str): Language identifier for OCR Tesseract.
+
+    Returns:
+        Initialized Tesseract instance.
+    """
+    api: Any = worker_apis.get(lang)
+    if api is not None:
+        worker_apis.move_to_end(lang)
+        return api
+
+    try:
+        api = tesserocr.PyTessBaseAPI(lang=lang)
+    except RuntimeError as e:
+        raise TesseractFailedToOcrException(f"Unable to initialize Tesseract for language {lang}: {e}")
+    api.SetVariable("tessedit_create_pdf", "1")
+    # Image is removed from the OCR page anyway, do not let Tesseract encode it
+    api.SetVariable("textonly_pdf", "1")
+
+    put_worker_api(lang, api)
+    return api
+
+
+def put_worker_api(key: str, api: Any) -> None:
+    """
+    Keep Tesseract instance in the worker process and release the least recently used ones
+    above the limit, so that a long running service does not keep every language it has seen.
+
+    Args:
+        key (str): Language identifier or OSD_API_KEY.
+        api (Any): Initialized Tesseract instance.
+    """
+    worker_apis[key] = api
+    while len(worker_apis) > MAX_WORKER_APIS:
+        _, evicted_api = worker_apis.popitem(last=False)
+        evicted_api.End()
+
+
+def recognize_in_worker(image: Image.Image, lang: str) -> OcrResult:
+    """
+    Run OCR on a rendered page image in the worker process.
+
+    Args:
+        image (Image.Image): Rendered page image.
+        lang (str): Language identifier for OCR Tesseract.
+
+    Returns:
+        OCR page and its confidence.
+    """
+    api: Any = get_worker_api(lang)
+    dpi: int = get_image_dpi(image)
+    api.SetVariable("user_defined_dpi", str(dpi) if dpi > 0 else "0")
+
+    # The PDF renderer needs a complete document, which is only produced by ProcessPages from
+    # an input file. Uncompressed PNM costs little more than a memory copy.
+    data: bytes = process_pages_in_memory(api, image) if hasattr(os, "memfd_create") else process_pages(api, image)
+    return OcrResult(data, float(api.MeanTextConf()))
+
+
+def process_pages_in_memory(api: Any, image: Image.Image) -> bytes:
+    """
+    Create Tesseract PDF of the image without touching the file system. The image is read from
+    an anonymous in-memory file and the PDF is written to standard output, which is pointed to
+    another one for the duration of the call. Only available on Linux.
+
+    Args:
+        api (Any): Initialized Tesseract instance.
+        image (Image.Image): Rendered page image.
+
+    Returns:
+        Raw PDF bytes (OCR page).
+    """
+    image_fd: int = os.memfd_create("page.pnm")
+    pdf_fd: int = os.memfd_create("page.pdf")
+    try:
+        with open(image_fd, "wb", closefd=False) as f:
+            image.save(f, "PPM")
+
+        sys.stdout.flush()
+        stdout_fd: int = os.dup(1)
+        try:
+            os.dup2(pdf_fd, 1)
+            if not api.ProcessPages("stdout", f"/proc/self/fd/{image_fd}"):
+                raise TesseractFailedToOcrException("Unable to create OCR page")
+        finally:
+            # Tesseract writes through the buffered C standard output
+            ctypes.CDLL(None).fflush(None)
+            os.dup2(stdout_fd, 1)
+            os.close(stdout_fd)
+
+        return os.pread(pdf_fd, os.fstat(pdf_fd).st_size, 0)
+    finally:
+        os.close(image_fd)
+        os.close(pdf_fd)
+
+
+def process_pages(api: Any, image: Image.Image) -> bytes:
+    """
+    Create Tesseract PDF of the image through a temporary directory.
+
+    Args:
+        api (Any): Initialized Tesseract instance.
+        image (Image.Image): Rendered page image.
+
+    Returns:
+        Raw PDF bytes (OCR page).
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path: str = os.path.join(temp_dir, "page.pnm")
+        output_base: str = os.path.join(temp_dir, "page")
+        image.save(image_path)
+
+        if not api.ProcessPages(output_base, image_path):
+            raise TesseractFailedToOcrException("Unable to create OCR page")
+
+        with open(output_base + ".pdf", "rb") as f:
+            return f.read()
+
+
+def recognize_text_in_worker(image: Image.Image, lang: str) -> str:
+    """
+    Run OCR on a rendered page image in the worker process and return only the plain text.
+
+    Args:
+        image (Image.Image): Rendered page image.
+        lang (str): Language identifier for OCR Tesseract.
+
+    Returns:
+        Recognized text.
+    """
+    api: Any = get_worker_api(lang)
+    dpi: int = get_image_dpi(image)
+    api.SetVariable("user_defined_dpi", str(dpi) if dpi > 0 else "0")
+    api.SetImage(image)
+    return api.GetUTF8Text()
+
+
+def detect_orientation_script_in_worker(image: Image.Image) -> OsdResult:
+    """
+    Detect orientation and script of the text on a rendered page image in the worker process.
+
+    Args:
+        image (Image.Image): Rendered page image.
+
+    Returns:
+        Detected orientation and script, empty if the page has too little text.
+    """
+    api: Any = worker_apis.get(OSD_API_KEY)
+    if api is None:
+        try:
+            api = tesserocr.PyTessBaseAPI(lang="osd", psm=tesserocr.PSM.OSD_ONLY)
+        except RuntimeError as e:
+            raise TesseractFailedToOcrException(f"Unable to initialize Tesseract orientation detection: {e}")
+        put_worker_api(OSD_API_KEY, api)
+    else:
+        worker_apis.move_to_end(OSD_API_KEY)
+
+    dpi: int = get_image_dpi(image)
+    api.SetVariable("user_defined_dpi", str(dpi) if dpi > 0 else "0")
+    api.SetImage(image)
+    osd: Any = api.DetectOrientationScript()
+    if not osd:
+        # Too few characters on the page
+        return OsdResult()
+    # Tesseract reports the orientation of the page, i.e. counter-clockwise rotation of the text
+    return OsdResult((360 - osd["orient_deg"]) % 360, osd["orient_conf"], osd["script_name"], osd["script_conf"])
+
+
+def preload_in_worker(lang: str) -> None:
+    """
+    Initialize Tesseract instance for the language in the worker process.
+
+    Args:
+        lang (str): Language identifier for OCR Tesseract.
+    """
+    get_worker_api(lang)
+    # Keep the worker busy for a moment, so that the other preload tasks start their own workers
+    time.sleep(0.1)
+
+
+def get_image_dpi(image: Image.Image) -> int:
+    """
+    Get resolution of the rendered page image in the range accepted by Tesseract.
+
+    Args:
+        image (Image.Image): Rendered page image.
+
+    Returns:
+        Resolution in DPI, or 0 if not known.
+    """
+    dpi: Any = image.info.get("dpi")
+    if not dpi:
+        return 0
+    return min(max(round(dpi[0]), 70), 2400)
+
+
+def get_cached_languages(engine_name: str) -> Optional[tuple[str, list[str]]]:
+    """
+    Read languages of the engine listed by a previous run.
+
+    Args:
+        engine_name (str): Name of the Tesseract engine.
+
+    Returns:
+        Tessdata directory and list of Tesseract language identifiers, or None if not cached or
+        the tessdata directory or TESSDATA_PREFIX changed since.
+    """
+    try:
+        with open(get_user_cache_path(LANGUAGES_FILE), "r", encoding="utf-8") as f:
+            entry: Any = json.load(f)[engine_name]
+        # Adding or removing a traineddata file changes the modification time of the directory
+        if (
+            entry["prefix"] == os.environ.get("TESSDATA_PREFIX", "")
+            and entry["mtime"] == os.stat(entry["path"]).st_mtime_ns
+        ):
+            return str(entry["path"]), [str(language) for language in entry["languages"]]
+    except (OSError, ValueError, LookupError, TypeError):
+        pass
+    return None
+
+
+def put_cached_languages(engine_name: str, tessdata_dir: str, languages: list[str]) -> None:
+    """
+    Store languages of the engine for later runs. Nothing is stored if the tessdata directory is unknown.
+
+    Args:
+        engine_name (str): Name of the Tesseract engine.
+        tessdata_dir (str): Directory the languages were found in.
+        languages (list[str]): List of Tesseract language identifiers.
+    """
+    if not tessdata_dir:
+        return
+    path: Path = get_user_cache_path(LANGUAGES_FILE)
+    try:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries: dict[str, Any] = dict(json.load(f))
+        except (OSError, ValueError, TypeError):
+            entries = {}
+        entries[engine_name] = {
+            "prefix": os.environ.get("TESSDATA_PREFIX", ""),
+            "path": tessdata_dir,
+            "mtime": os.stat(tessdata_dir).st_mtime_ns,
+            "languages": languages,
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Replace at once, so that a concurrent run never reads a partial file
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(temp_path, path)
+    except OSError:
+        # Cache is optional, e.g. read-only home directory
+        pass
+
+
+def create_ocr_engine(name: str = ENGINE_AUTO, workers: int = 1) -> OcrEngine:
+    """
+    Create Tesseract engine by name.
+
+    Args:
+        name (str): One of "auto", "tesserocr" or "pytesseract". "auto" prefers tesserocr
+            and falls back to pytesseract if tesserocr is not installed.
+        workers (int): Number of pages recognized in parallel.
+
+    Returns:
+        Tesseract engine.
+    """
+    engine_name: str = name
+    if engine_name == ENGINE_AUTO:
+        engine_name = ENGINE_PYTESSERACT if tesserocr is None else ENGINE_TESSEROCR
+
+    match engine_name:
+        case "tesserocr":
+            if tesserocr is None:
+                raise ArgumentEngineUnavailableException(name)
+            return TesserocrEngine(workers)
+        case "pytesseract":
+            return PytesseractEngine()
+        case _:
+            raise ArgumentEngineUnavailableException(name)
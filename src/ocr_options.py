@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+
+from constants import (
+    DEFAULT_CACHE_SIZE,
+    DEFAULT_MAX_PIXELS,
+    ENGINE_AUTO,
+    MODE_FORCE,
+    REGIONS_PAGE,
+    RENDER_GRAY,
+    SAVE_FULL,
+)
+
+
+@dataclass
+class OcrOptions:
+    """
+    Settings of the OCR run.
+
+    Attributes:
+        lang (str): Language identifier for OCR Tesseract. Empty uses document language or English,
+            "auto" detects languages from sample pages.
+        jobs (int): Number of parallel Tesseract workers. 0 uses all available cores.
+        engine (str): Tesseract engine to use ("auto", "tesserocr" or "pytesseract").
+        mode (str): Which pages to OCR ("force", "skip-text" or "redo").
+        zoom (float): Fixed zoom level for rendering pages. 0 chooses zoom for each page.
+        dpi (float): Fixed rendering resolution, used when zoom is not set. 0 chooses resolution for each page.
+        max_pixels (int): Maximum number of pixels of a rendered page. 0 means no limit.
+        render_mode (str): Pixel format of rendered pages passed to Tesseract ("gray", "binary" or "color").
+        cache_dir (str): Directory of the OCR result cache. Empty disables the cache.
+        cache_size (int): Maximum size of the OCR result cache in MB.
+        progress_json (bool): Write machine-readable progress lines to stderr instead of the progress bar.
+        chunk_size (int): Number of merged pages after which the document is saved to a temporary file and
+            reopened to release memory. 0 keeps the whole document open.
+        max_memory (int): Memory limit in MB of the process and its OCR workers. Above it fewer pages are
+            recognized in parallel and the document is flushed like with chunk_size. 0 means no limit.
+        rotate_pages (bool): Detect page orientation and turn upright pages before OCR.
+        deskew (bool): Detect small skew of text lines and straighten pages before OCR.
+        pages (str): Page ranges to OCR like "1-10,25,40-", page numbers start at 1. Empty selects all pages.
+        first_n (int): OCR only this many pages from the start of the selection. 0 means no limit.
+        resume (bool): Store OCR results of finished pages next to the output and reuse them when the run
+            is repeated after a failure.
+        regions (str): What to recognize on each page ("page" or "images"). With "images" only areas covered
+            by images are rendered and recognized, existing vector text outside them is left alone.
+        tile_size (int): Maximum width and height in pixels of a rendered image. Larger pages or image regions
+            are recognized in overlapping tiles in parallel instead of lowering zoom to max_pixels. 0 disables tiles.
+        save_mode (str): How the output is written ("full" or "incremental"). "full" rewrites and compresses the
+            whole document, "incremental" copies the input unchanged and appends only the changed pages.
+        shard (str): Shard of the selected pages like "2/8" to OCR into a shard directory instead of the output
+            PDF. Shards are put together by merge_shards. Empty processes the whole document.
+    """
+
+    lang: str = ""
+    jobs: int = 0
+    engine: str = ENGINE_AUTO
+    mode: str = MODE_FORCE
+    zoom: float = 0.0
+    dpi: float = 0.0
+    max_pixels: int = DEFAULT_MAX_PIXELS
+    render_mode: str = RENDER_GRAY
+    cache_dir: str = ""
+    cache_size: int = DEFAULT_CACHE_SIZE
+    progress_json: bool = False
+    chunk_size: int = 0
+    max_memory: int = 0
+    rotate_pages: bool = False
+    deskew: bool = False
+    pages: str = ""
+    first_n: int = 0
+    resume: bool = False
+    regions: str = REGIONS_PAGE
+    tile_size: int = 0
+    save_mode: str = SAVE_FULL
+    shard: str = ""
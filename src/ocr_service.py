@@ -0,0 +1,508 @@
+import dataclasses
+import json
+import os
+import queue
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, BinaryIO, Optional
+from urllib.parse import parse_qs, urlparse
+
+from constants import DEFAULT_JOB_TTL, DEFAULT_MAX_UPLOAD_SIZE, LANG_AUTO, MODES
+from exceptions import ArgumentInvalidPagesException, ExpectedException
+from ocr_options import OcrOptions
+from page_classifier import parse_page_ranges
+from tesseract import OcrSession, ocr_document
+
+JOB_DONE: str = "done"
+JOB_FAILED: str = "failed"
+JOB_QUEUED: str = "queued"
+JOB_RUNNING: str = "running"
+
+# Longest time a status request may wait for the job to finish
+MAX_WAIT_SECONDS: float = 60.0
+# Longest time between two checks for expired jobs while the queue is empty
+EXPIRE_INTERVAL_SECONDS: float = 60.0
+
+
+@dataclass
+class OcrJob:
+    """
+    OCR of one submitted document.
+
+    Attributes:
+        id (str): Job identifier.
+        input_path (str): Path to the uploaded PDF file.
+        output_path (str): Path to the OCR result.
+        options (OcrOptions): Settings of the OCR run.
+        status (str): One of "queued", "running", "done" or "failed".
+        error_code (int): 0 on success, otherwise the exit code the ocr subcommand would return.
+        message (str): Error message. Empty on success.
+        seconds (float): Time spent on OCR.
+        finished (float): Monotonic time the job was finished at, 0 if not finished.
+    """
+
+    id: str
+    input_path: str
+    output_path: str
+    options: OcrOptions
+    status: str = JOB_QUEUED
+    error_code: int = 0
+    message: str = ""
+    seconds: float = 0.0
+    finished: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Public state of the job returned by the API.
+
+        Returns:
+            Job state serializable to JSON.
+        """
+        return {
+            "id": self.id,
+            "status": self.status,
+            "lang": self.options.lang,
+            "error_code": self.error_code,
+            "message": self.message,
+            "seconds": self.seconds,
+        }
+
+
+class OcrService:
+    """
+    Queue of OCR jobs processed one by one with a warm OCR session. Pages of the running
+    document are recognized in parallel by the workers of the session.
+    """
+
+    def __init__(
+        self,
+        session: OcrSession,
+        options: OcrOptions,
+        work_dir: str,
+        queue_size: int,
+        max_upload_size: int = DEFAULT_MAX_UPLOAD_SIZE,
+        job_ttl: float = DEFAULT_JOB_TTL,
+    ) -> None:
+        """
+        Args:
+            session (OcrSession): Initialized PDFix SDK, engine and OCR workers.
+            options (OcrOptions): Default settings of OCR jobs.
+            work_dir (str): Directory for uploaded documents and results.
+            queue_size (int): Maximum number of jobs waiting for processing.
+            max_upload_size (int): Maximum size of a submitted document in bytes.
+            job_ttl (float): Seconds a finished job and its files are kept. 0 keeps them until deleted.
+        """
+        self.session: OcrSession = session
+        self.options: OcrOptions = options
+        self.work_dir: str = work_dir
+        self.max_upload_size: int = max_upload_size
+        self.job_ttl: float = job_ttl
+        self._queue: queue.Queue[OcrJob] = queue.Queue(maxsize=queue_size)
+        self._jobs: dict[str, OcrJob] = {}
+        # Guards jobs and notifies waiting status requests about finished jobs
+        self._changed: threading.Condition = threading.Condition()
+
+    def submit(self, data: bytes, options: OcrOptions) -> Optional[OcrJob]:
+        """
+        Store the uploaded document and queue it for OCR.
+
+        Args:
+            data (bytes): Raw PDF bytes.
+            options (OcrOptions): Settings of the OCR run.
+
+        Returns:
+            Queued job, or None if the queue is full.
+        """
+        self.remove_expired()
+
+        job_id: str = uuid.uuid4().hex
+        job: OcrJob = OcrJob(
+            job_id,
+            os.path.join(self.work_dir, f"{job_id}.pdf"),
+            os.path.join(self.work_dir, f"{job_id}.ocr.pdf"),
+            options,
+        )
+        with open(job.input_path, "wb") as f:
+            f.write(data)
+
+        with self._changed:
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                os.remove(job.input_path)
+                return None
+            self._jobs[job_id] = job
+
+        return job
+
+    def get(self, job_id: str, wait: float = 0.0) -> Optional[OcrJob]:
+        """
+        Find the job, optionally waiting until it is finished.
+
+        Args:
+            job_id (str): Job identifier.
+            wait (float): Seconds to wait for the job to finish. 0 returns immediately.
+
+        Returns:
+            The job, or None if it does not exist.
+        """
+        deadline: float = time.monotonic() + min(wait, MAX_WAIT_SECONDS)
+        with self._changed:
+            job: Optional[OcrJob] = self._jobs.get(job_id)
+            while job is not None and job.status in (JOB_QUEUED, JOB_RUNNING):
+                remaining: float = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+                job = self._jobs.get(job_id)
+            return job
+
+    def open_result(self, job: OcrJob) -> Optional[BinaryIO]:
+        """
+        Open the result of a finished job. The file is opened while the job is known, so an open result
+        stays readable when the job expires or is deleted during the download.
+
+        Args:
+            job (OcrJob): Finished job.
+
+        Returns:
+            Opened result, or None if the job was removed meanwhile.
+        """
+        with self._changed:
+            if self._jobs.get(job.id) is not job:
+                return None
+            return open(job.output_path, "rb")
+
+    def delete(self, job_id: str) -> bool:
+        """
+        Forget a finished job and remove its files.
+
+        Args:
+            job_id (str): Job identifier.
+
+        Returns:
+            True if the job was removed, False if it does not exist or is not finished.
+        """
+        with self._changed:
+            job: Optional[OcrJob] = self._jobs.get(job_id)
+            if job is None or job.status in (JOB_QUEUED, JOB_RUNNING):
+                return False
+            del self._jobs[job_id]
+
+        remove_job_files(job)
+        return True
+
+    def remove_expired(self) -> None:
+        """
+        Forget jobs finished longer than the time to live ago and remove their files.
+        """
+        if self.job_ttl <= 0:
+            return
+
+        expired_before: float = time.monotonic() - self.job_ttl
+        with self._changed:
+            expired: list[OcrJob] = [
+                job
+                for job in self._jobs.values()
+                if job.status in (JOB_DONE, JOB_FAILED) and job.finished <= expired_before
+            ]
+            for job in expired:
+                del self._jobs[job.id]
+
+        for job in expired:
+            remove_job_files(job)
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        Load of the service, used for health checks and autoscaling.
+
+        Returns:
+            Number of queued and running jobs and the queue capacity.
+        """
+        with self._changed:
+            running: int = sum(1 for job in self._jobs.values() if job.status == JOB_RUNNING)
+        return {
+            "queued": self._queue.qsize(),
+            "running": running,
+            "queue_size": self._queue.maxsize,
+            "workers": self.session.workers,
+        }
+
+    def run(self) -> None:
+        """
+        Process queued jobs until interrupted. PDFix SDK is used only from the calling thread.
+        """
+        while True:
+            self.remove_expired()
+            try:
+                job: OcrJob = self._queue.get(timeout=EXPIRE_INTERVAL_SECONDS)
+            except queue.Empty:
+                continue
+
+            self._set_status(job, JOB_RUNNING)
+            start: float = time.perf_counter()
+
+            status: str = JOB_FAILED
+            try:
+                ocr_document(self.session, job.input_path, job.output_path, job.options)
+                status = JOB_DONE
+            except ExpectedException as e:
+                job.error_code = e.error_code
+                job.message = e.message
+            except Exception as e:
+                job.error_code = 1
+                job.message = str(e)
+
+            job.seconds = time.perf_counter() - start
+            job.finished = time.monotonic()
+            self._set_status(job, status)
+
+    def _set_status(self, job: OcrJob, status: str) -> None:
+        """
+        Change status of the job and wake up requests waiting for it.
+
+        Args:
+            job (OcrJob): The job.
+            status (str): New status.
+        """
+        with self._changed:
+            job.status = status
+            self._changed.notify_all()
+
+
+def remove_job_files(job: OcrJob) -> None:
+    """
+    Remove uploaded document and result of the job.
+
+    Args:
+        job (OcrJob): Finished job.
+    """
+    for path in (job.input_path, job.output_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def is_available_lang(lang: str, languages: list[str]) -> bool:
+    """
+    Check that the language of a submitted job can be used.
+
+    Args:
+        lang (str): Language identifier like "eng" or "eng+deu", "auto" or empty for the language of the document.
+        languages (list[str]): Languages available to the engine.
+
+    Returns:
+        True if all languages are available.
+    """
+    if lang in ("", LANG_AUTO):
+        return True
+    return all(part in languages for part in lang.split("+"))
+
+
+class OcrHTTPServer(ThreadingHTTPServer):
+    """
+    HTTP server holding the OCR service for its request handlers.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: OcrService) -> None:
+        super().__init__(address, OcrRequestHandler)
+        self.service: OcrService = service
+
+
+class OcrRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP API of the OCR service:
+
+    - POST /jobs?lang=eng&mode=force&pages=1-3&first_n=1: submit PDF in the request body, returns the job
+    - GET /jobs/<id>?wait=30: status of the job, optionally waiting until it is finished
+    - GET /jobs/<id>/result: OCR-ed PDF
+    - DELETE /jobs/<id>: remove finished job and its files
+    - GET /health: queue depth and load of the service
+    """
+
+    server: OcrHTTPServer
+
+    def do_GET(self) -> None:
+        url: Any = urlparse(self.path)
+        parts: list[str] = url.path.strip("/").split("/")
+        query: dict[str, list[str]] = parse_qs(url.query)
+
+        if parts == ["health"]:
+            self._send_json(200, self.server.service.get_stats())
+            return
+
+        if len(parts) not in (2, 3) or parts[0] != "jobs" or (len(parts) == 3 and parts[2] != "result"):
+            self._send_error(404, "Not found")
+            return
+
+        try:
+            wait: float = float(query.get("wait", ["0"])[0])
+        except ValueError:
+            self._send_error(400, "Invalid wait")
+            return
+
+        job: Optional[OcrJob] = self.server.service.get(parts[1], wait if len(parts) == 2 else 0.0)
+        if job is None:
+            self._send_error(404, "Job not found")
+        elif len(parts) == 2:
+            self._send_json(200, job.to_dict())
+        elif job.status != JOB_DONE:
+            self._send_json(409, job.to_dict())
+        else:
+            result: Optional[BinaryIO] = self.server.service.open_result(job)
+            if result is None:
+                self._send_error(404, "Job not found")
+            else:
+                self._send_file(result)
+
+    def do_POST(self) -> None:
+        url: Any = urlparse(self.path)
+        query: dict[str, list[str]] = parse_qs(url.query)
+
+        if url.path.strip("/") != "jobs":
+            self._send_error(404, "Not found")
+            return
+
+        try:
+            length: int = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            self._send_error(400, "Content-Length expected")
+            return
+        if length <= 0:
+            self._send_error(400, "PDF document expected in request body")
+            return
+        if length > self.server.service.max_upload_size:
+            # Body is not read, the connection cannot be reused
+            self.close_connection = True
+            self._send_error(413, f"Document is larger than {self.server.service.max_upload_size} bytes")
+            return
+
+        data: bytes = self.rfile.read(length)
+        if not data.startswith(b"%PDF"):
+            self._send_error(400, "PDF document expected in request body")
+            return
+
+        options: OcrOptions = dataclasses.replace(self.server.service.options)
+        if "lang" in query:
+            if not is_available_lang(query["lang"][0], self.server.service.session.engine.get_languages()):
+                self._send_error(400, "Invalid lang, expected languages available to Tesseract")
+                return
+            options.lang = query["lang"][0]
+        if "mode" in query:
+            if query["mode"][0] not in MODES:
+                self._send_error(400, f"Invalid mode, expected one of {MODES}")
+                return
+            options.mode = query["mode"][0]
+        try:
+            if "pages" in query:
+                options.pages = query["pages"][0]
+                parse_page_ranges(options.pages)
+            if "first_n" in query:
+                options.first_n = int(query["first_n"][0])
+        except (ArgumentInvalidPagesException, ValueError):
+            self._send_error(400, "Invalid pages")
+            return
+
+        job: Optional[OcrJob] = self.server.service.submit(data, options)
+        if job is None:
+            self._send_error(503, "Job queue is full", {"Retry-After": "5"})
+            return
+
+        self._send_json(202, job.to_dict(), {"Location": f"/jobs/{job.id}"})
+
+    def do_DELETE(self) -> None:
+        parts: list[str] = urlparse(self.path).path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] != "jobs":
+            self._send_error(404, "Not found")
+        elif self.server.service.get(parts[1]) is None:
+            self._send_error(404, "Job not found")
+        elif not self.server.service.delete(parts[1]):
+            self._send_error(409, "Job is not finished")
+        else:
+            self.send_response(204)
+            self.end_headers()
+
+    def _send_json(self, status: int, body: dict[str, Any], headers: Optional[dict[str, str]] = None) -> None:
+        data: bytes = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int, message: str, headers: Optional[dict[str, str]] = None) -> None:
+        self._send_json(status, {"error": message}, headers)
+
+    def _send_file(self, file: BinaryIO) -> None:
+        with file:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", str(os.fstat(file.fileno()).st_size))
+            self.end_headers()
+            shutil.copyfileobj(file, self.wfile)
+
+
+def serve(
+    host: str,
+    port: int,
+    license_name: str,
+    license_key: str,
+    options: OcrOptions,
+    queue_size: int,
+    work_dir: str,
+    max_upload_size: int = DEFAULT_MAX_UPLOAD_SIZE,
+    job_ttl: float = DEFAULT_JOB_TTL,
+) -> None:
+    """
+    Run the OCR HTTP service until interrupted.
+
+    Args:
+        host (str): Address to listen on.
+        port (int): Port to listen on.
+        license_name (str): Pdfix SDK license name.
+        license_key (str): Pdfix SDK license key.
+        options (OcrOptions): Default settings of OCR jobs.
+        queue_size (int): Maximum number of jobs waiting for processing.
+        work_dir (str): Directory for uploaded documents and results. Temporary directory if empty.
+        max_upload_size (int): Maximum size of a submitted document in bytes.
+        job_ttl (float): Seconds a finished job and its files are kept. 0 keeps them until deleted.
+    """
+    session: OcrSession = OcrSession(license_name, license_key, options)
+    try:
+        # Language models are loaded before the first job arrives
+        session.engine.preload(options.lang if options.lang not in ("", LANG_AUTO) else "eng", session.workers)
+
+        job_dir: str = work_dir or tempfile.mkdtemp(prefix="ocr-service-")
+        os.makedirs(job_dir, exist_ok=True)
+
+        service: OcrService = OcrService(session, options, job_dir, queue_size, max_upload_size, job_ttl)
+
+        server: OcrHTTPServer = OcrHTTPServer((host, port), service)
+        server_thread: threading.Thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+        print(f"Listening on http://{host}:{port}")
+
+        # Docker stops the container with SIGTERM, shut down the same way as on Ctrl+C
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        try:
+            service.run()
+        except KeyboardInterrupt:
+            print("Shutting down")
+        finally:
+            server.shutdown()
+            server.server_close()
+            if not work_dir:
+                shutil.rmtree(job_dir, ignore_errors=True)
+    except Exception:
+        raise
+    finally:
+        session.close()
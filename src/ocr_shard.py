@@ -0,0 +1,144 @@
+import os
+import time
+from typing import Any, Optional
+
+from pdfixsdk import GetPdfix, PdfDoc, Pdfix, PdfPage, PdsObject
+
+from constants import MODE_REDO
+from exceptions import (
+    ArgumentInvalidShardException,
+    PdfixFailedToOcrException,
+    PdfixFailedToOpenException,
+    PdfixInitializeException,
+)
+from metrics import DocumentMetrics, PageMetrics, get_peak_rss_mb
+from ocr_checkpoint import CHECKPOINT_FORMAT, OcrCheckpoint, get_file_digest, read_checkpoint_state
+from ocr_engine import OcrResult
+from ocr_options import OcrOptions
+from page_classifier import parse_shard, remove_ocr_text
+from tesseract import add_ocr_results, save_document
+from utils_sdk import authorize_sdk
+
+# Values of the shard state that differ between shards of one document
+SHARD_KEYS: list[str] = ["shard", "pages"]
+
+
+def merge_shards(
+    input_path: str, output_path: str, shard_dirs: list[str], license_name: str, license_key: str, options: OcrOptions
+) -> DocumentMetrics:
+    """
+    Place text layers of all shards of a document onto the original PDF and save it once.
+
+    Args:
+        input_path (str): Input path to the PDF file the shards were created from.
+        output_path (str): Output path for saving the PDF file.
+        shard_dirs (list[str]): Shard directories written by OCR with the shard option, one per shard.
+        license_name (str): Pdfix SDK license name.
+        license_key (str): Pdfix SDK license key.
+        options (OcrOptions): Settings of the merge. Only the save mode is used.
+
+    Returns:
+        Measurements of the merge.
+    """
+    document_start: float = time.perf_counter()
+    checkpoints: list[OcrCheckpoint] = open_shards(input_path, shard_dirs)
+    metrics: DocumentMetrics = DocumentMetrics(input_path, output_path, lang=checkpoints[0].state["lang"])
+
+    pdfix: Optional[Pdfix] = GetPdfix()
+    if pdfix is None:
+        raise PdfixInitializeException()
+    authorize_sdk(pdfix, license_name, license_key)
+
+    doc: Optional[PdfDoc] = pdfix.OpenDoc(input_path, "")
+    if doc is None:
+        raise PdfixFailedToOpenException(pdfix, input_path)
+
+    try:
+        metrics.page_count = doc.GetNumPages()
+        metrics.open_seconds = time.perf_counter() - document_start
+
+        # Results of one shard are spread over the whole document, pages are merged in document order
+        page_shards: list[tuple[int, OcrCheckpoint]] = sorted(
+            ((page_index, checkpoint) for checkpoint in checkpoints for page_index in checkpoint.state["pages"]),
+            key=lambda page_shard: page_shard[0],
+        )
+        # Fonts of text layers by their content, shared by text layers from all shards
+        shared_fonts: dict[str, PdsObject] = {}
+        for page_index, checkpoint in page_shards:
+            page_metrics: PageMetrics = PageMetrics(page_index, resumed=True)
+            merge_start: float = time.perf_counter()
+            results: Optional[list[OcrResult]] = checkpoint.get(page_index)
+            if results is None:
+                raise ArgumentInvalidShardException(f"Page {page_index + 1} is missing in {checkpoint.checkpoint_dir}")
+            if checkpoint.state["mode"] == MODE_REDO:
+                # Shards removed the old text layer only from their own copy of the document
+                page: Optional[PdfPage] = doc.AcquirePage(page_index)
+                if page is None:
+                    raise PdfixFailedToOcrException(pdfix, "Unable to acquire page")
+                try:
+                    remove_ocr_text(pdfix, page)
+                finally:
+                    page.Release()
+            page_metrics.words = add_ocr_results(pdfix, doc, page_index, results, shared_fonts)
+            page_metrics.merge_seconds = time.perf_counter() - merge_start
+
+            confidences: list[float] = [result.confidence for result in results if result.confidence >= 0]
+            page_metrics.confidence = sum(confidences) / len(confidences) if confidences else -1.0
+            page_metrics.rotation = results[0].rotation if results else 0.0
+            metrics.pages.append(page_metrics)
+
+        save_start: float = time.perf_counter()
+        save_document(pdfix, doc, output_path, options.save_mode)
+        metrics.save_seconds = time.perf_counter() - save_start
+    except Exception:
+        raise
+    finally:
+        doc.Close()
+
+    metrics.total_seconds = time.perf_counter() - document_start
+    metrics.peak_rss_mb = get_peak_rss_mb()
+    print(f"Merged {len(metrics.pages)} pages of {len(checkpoints)} shards into {output_path}")
+
+    return metrics
+
+
+def open_shards(input_path: str, shard_dirs: list[str]) -> list[OcrCheckpoint]:
+    """
+    Open shard directories and check that together they are all shards of the input document
+    created with the same settings.
+
+    Args:
+        input_path (str): Input path to the PDF file the shards were created from.
+        shard_dirs (list[str]): Shard directories.
+
+    Returns:
+        Checkpoints of the shards.
+    """
+    states: list[dict[str, Any]] = []
+    for shard_dir in shard_dirs:
+        state: Optional[dict[str, Any]] = read_checkpoint_state(shard_dir)
+        if state is None or "shard" not in state:
+            raise ArgumentInvalidShardException(f"{shard_dir} is not a shard directory")
+        if state.get("format") != CHECKPOINT_FORMAT:
+            raise ArgumentInvalidShardException(f"{shard_dir} was created by another version")
+        states.append(state)
+
+    # Settings and input are the same in all shards, only the pages differ
+    common: dict[str, Any] = {key: value for key, value in states[0].items() if key not in SHARD_KEYS}
+    for shard_dir, state in zip(shard_dirs, states):
+        if {key: value for key, value in state.items() if key not in SHARD_KEYS} != common:
+            raise ArgumentInvalidShardException(f"{shard_dir} was created with other settings than {shard_dirs[0]}")
+
+    if common["size"] != os.path.getsize(input_path) or common["sha256"] != get_file_digest(input_path):
+        raise ArgumentInvalidShardException(f"Shards were created from another document than {input_path}")
+
+    shards: list[tuple[int, int]] = [parse_shard(state["shard"]) for state in states]
+    shard_count: int = shards[0][1]
+    if sorted(shards) != [(number, shard_count) for number in range(1, shard_count + 1)]:
+        found: str = ", ".join(f"{number}/{count}" for number, count in sorted(shards))
+        raise ArgumentInvalidShardException(
+            f"Expected shards 1/{shard_count} to {shard_count}/{shard_count}, got {found}"
+        )
+
+    # Same state as stored, so that the results are kept
+    return [OcrCheckpoint(shard_dir, state) for shard_dir, state in zip(shard_dirs, states)]
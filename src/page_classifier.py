@@ -0,0 +1,291 @@
+from typing import Optional, cast
+
+from pdfixsdk import (
+    PdfDoc,
+    Pdfix,
+    PdfPage,
+    PdfTextState,
+    PdsContent,
+    PdsForm,
+    PdsPageObject,
+    PdsText,
+    kFillTypeNone,
+    kPdsPageForm,
+    kPdsPageImage,
+    kPdsPageText,
+)
+
+from constants import MODE_FORCE, MODE_REDO
+from exceptions import ArgumentInvalidPagesException, ArgumentInvalidShardException, PdfixFailedToOcrException
+
+PAGE_EMPTY: str = "empty"
+PAGE_IMAGE: str = "image"
+PAGE_MIXED: str = "mixed"
+PAGE_TEXT: str = "text"
+
+
+class ContentSummary:
+    """
+    Counts of page objects relevant for deciding whether a page needs OCR.
+    """
+
+    def __init__(self) -> None:
+        self.images: int = 0
+        self.visible_texts: int = 0
+        self.invisible_texts: int = 0
+
+    def add(self, other: "ContentSummary") -> None:
+        self.images += other.images
+        self.visible_texts += other.visible_texts
+        self.invisible_texts += other.invisible_texts
+
+
+def parse_page_ranges(pages: str) -> list[tuple[int, Optional[int]]]:
+    """
+    Parse page selection like "1-10,25,40-". Page numbers start at 1, "40-" is page 40 to the end
+    and "-5" the first five pages.
+
+    Args:
+        pages (str): Comma-separated page numbers and ranges.
+
+    Returns:
+        List of (first, last) page numbers, last is None for ranges open to the end.
+    """
+    ranges: list[tuple[int, Optional[int]]] = []
+    for part in pages.split(","):
+        if part.strip() in ("", "-"):
+            raise ArgumentInvalidPagesException(pages)
+
+        first, separator, last = part.strip().partition("-")
+        try:
+            first_number: int = int(first) if first.strip() else 1
+            last_number: Optional[int] = int(last) if last.strip() else None
+            if not separator:
+                last_number = first_number
+        except ValueError:
+            raise ArgumentInvalidPagesException(pages)
+
+        if first_number < 1 or (last_number is not None and last_number < first_number):
+            raise ArgumentInvalidPagesException(pages)
+        ranges.append((first_number, last_number))
+
+    return ranges
+
+
+def get_selected_pages(number_of_pages: int, pages: str, first_n: int) -> list[int]:
+    """
+    Get indexes of pages chosen by page ranges and page count limit.
+
+    Args:
+        number_of_pages (int): Number of pages of the document.
+        pages (str): Page ranges like "1-10,25,40-". Empty selects all pages. Pages past the end are ignored.
+        first_n (int): Maximum number of selected pages, taken from the start. 0 means no limit.
+
+    Returns:
+        Sorted list of page indexes.
+    """
+    page_indexes: list[int] = list(range(number_of_pages))
+    if pages:
+        selected: set[int] = set()
+        for first, last in parse_page_ranges(pages):
+            selected.update(range(first - 1, number_of_pages if last is None else min(last, number_of_pages)))
+        page_indexes = sorted(selected)
+
+    return page_indexes[:first_n] if first_n > 0 else page_indexes
+
+
+def parse_shard(shard: str) -> tuple[int, int]:
+    """
+    Parse shard selection like "2/8". Shard numbers start at 1.
+
+    Args:
+        shard (str): Shard number and number of shards separated by a slash.
+
+    Returns:
+        Shard number and number of shards.
+    """
+    number, separator, count = shard.strip().partition("/")
+    try:
+        shard_number: int = int(number)
+        shard_count: int = int(count)
+    except ValueError:
+        raise ArgumentInvalidShardException(shard)
+
+    if not separator or shard_count < 1 or not 1 <= shard_number <= shard_count:
+        raise ArgumentInvalidShardException(shard)
+    return shard_number, shard_count
+
+
+def get_shard_pages(page_indexes: list[int], shard: str) -> list[int]:
+    """
+    Get pages of one shard of the document.
+
+    Args:
+        page_indexes (list[int]): Indexes of all pages to OCR, the same in every shard.
+        shard (str): Shard like "2/8".
+
+    Returns:
+        Every n-th page starting at the shard number, so that slow parts of the document are spread
+        over all shards.
+    """
+    shard_number, shard_count = parse_shard(shard)
+    return page_indexes[shard_number - 1 :: shard_count]
+
+
+def select_pages_for_ocr(pdfix: Pdfix, doc: PdfDoc, mode: str, pages: str = "", first_n: int = 0) -> list[int]:
+    """
+    Decide which pages of the document are sent to OCR.
+
+    Args:
+        pdfix (Pdfix): The Pdfix SDK object.
+        doc (PdfDoc): The PDF document.
+        mode (str): "force" OCRs every page. "skip-text" OCRs only image-only pages.
+            "redo" removes existing invisible OCR text first and OCRs the pages it was removed from
+            and image-only pages.
+        pages (str): Page ranges like "1-10,25,40-" to consider. Empty considers all pages.
+        first_n (int): Consider only this many pages from the start of the range. 0 means no limit.
+
+    Returns:
+        Sorted list of page indexes to OCR.
+    """
+    selected_pages: list[int] = get_selected_pages(doc.GetNumPages(), pages, first_n)
+    if mode == MODE_FORCE:
+        return selected_pages
+
+    page_indexes: list[int] = []
+    for page_index in selected_pages:
+        page: Optional[PdfPage] = doc.AcquirePage(page_index)
+        if page is None:
+            raise PdfixFailedToOcrException(pdfix, "Unable to acquire page")
+
+        try:
+            # Page that lost its text layer needs a new one, even if some visible text remains
+            removed: bool = mode == MODE_REDO and remove_ocr_text(pdfix, page)
+            if removed or classify_page(pdfix, page) == PAGE_IMAGE:
+                page_indexes.append(page_index)
+        finally:
+            page.Release()
+
+    return page_indexes
+
+
+def classify_page(pdfix: Pdfix, page: PdfPage) -> str:
+    """
+    Classify page by its content.
+
+    Args:
+        pdfix (Pdfix): The Pdfix SDK object.
+        page (PdfPage): The PDF page.
+
+    Returns:
+        "text" if page contains only text, "image" if it contains images without any text,
+        "mixed" if it contains both and "empty" if it contains neither.
+    """
+    content: Optional[PdsContent] = page.GetContent()
+    if content is None:
+        raise PdfixFailedToOcrException(pdfix, "Failed to obtain content from page")
+
+    summary: ContentSummary = summarize_content(content)
+    has_text: bool = summary.visible_texts + summary.invisible_texts > 0
+    has_image: bool = summary.images > 0
+
+    if has_text and has_image:
+        return PAGE_MIXED
+    if has_text:
+        return PAGE_TEXT
+    if has_image:
+        return PAGE_IMAGE
+    return PAGE_EMPTY
+
+
+def summarize_content(content: PdsContent) -> ContentSummary:
+    """
+    Count images and text objects in the content including nested form XObjects.
+
+    Args:
+        content (PdsContent): Page or form content.
+
+    Returns:
+        Counts of page objects.
+    """
+    summary: ContentSummary = ContentSummary()
+    for index in range(content.GetNumObjects()):
+        obj: Optional[PdsPageObject] = content.GetObject(index)
+        if obj is None:
+            continue
+
+        obj_type: int = obj.GetObjectType()
+        if obj_type == kPdsPageImage:
+            summary.images += 1
+        elif obj_type == kPdsPageText:
+            text: PdsText = cast(PdsText, obj)
+            if text.GetText().strip() == "":
+                continue
+            if is_invisible_text(text):
+                summary.invisible_texts += 1
+            else:
+                summary.visible_texts += 1
+        elif obj_type == kPdsPageForm:
+            form_content: Optional[PdsContent] = cast(PdsForm, obj).GetContent()
+            if form_content is not None:
+                summary.add(summarize_content(form_content))
+
+    return summary
+
+
+def is_invisible_text(text: PdsText) -> bool:
+    """
+    Check if text is neither filled nor stroked (text render mode 3), as used by OCR text layers.
+
+    Args:
+        text (PdsText): Text page object.
+
+    Returns:
+        True if the text is invisible.
+    """
+    text_state: PdfTextState = text.GetTextState()
+    return text_state.color_state.fill_type == kFillTypeNone and text_state.color_state.stroke_type == kFillTypeNone
+
+
+def remove_ocr_text(pdfix: Pdfix, page: PdfPage) -> bool:
+    """
+    Remove existing OCR text layer from the page. These are invisible text objects placed directly
+    on the page and form XObjects containing only invisible text.
+
+    Args:
+        pdfix (Pdfix): The Pdfix SDK object.
+        page (PdfPage): The PDF page.
+
+    Returns:
+        True if anything was removed.
+    """
+    content: Optional[PdsContent] = page.GetContent()
+    if content is None:
+        raise PdfixFailedToOcrException(pdfix, "Failed to obtain content from page")
+
+    removed: bool = False
+    for index in reversed(range(content.GetNumObjects())):
+        obj: Optional[PdsPageObject] = content.GetObject(index)
+        if obj is None:
+            continue
+
+        obj_type: int = obj.GetObjectType()
+        if obj_type == kPdsPageText:
+            if not is_invisible_text(cast(PdsText, obj)):
+                continue
+        elif obj_type == kPdsPageForm:
+            form_content: Optional[PdsContent] = cast(PdsForm, obj).GetContent()
+            if form_content is None:
+                continue
+            summary: ContentSummary = summarize_content(form_content)
+            if summary.invisible_texts == 0 or summary.visible_texts > 0 or summary.images > 0:
+                continue
+        else:
+            continue
+
+        content.RemoveObject(obj)
+        removed = True
+
+    if removed:
+        page.SetContent()
+    return removed
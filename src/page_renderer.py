@@ -1,78 +1,362 @@
-from typing import BinaryIO, Optional
+import ctypes
+import math
+from typing import Optional, cast
 
 from pdfixsdk import (
-    PdfImageParams,
+    PdfDevRect,
     Pdfix,
+    PdfMatrix,
     PdfPage,
     PdfPageRenderParams,
     PdfPageView,
-    PsFileStream,
+    PdfRect,
+    PdsContent,
+    PdsDictionary,
+    PdsForm,
+    PdsImage,
+    PdsPageObject,
+    PdsStream,
     PsImage,
+    PsMemoryStream,
     kImageDIBFormatArgb,
-    kImageFormatJpg,
-    kPsTruncate,
+    kPdsPageForm,
+    kPdsPageImage,
     kRotate0,
 )
+from PIL import Image
 
+from constants import (
+    DEFAULT_ZOOM,
+    MAX_ZOOM,
+    MIN_REGION_SIZE,
+    MIN_ZOOM,
+    REGION_MARGIN,
+    RENDER_COLOR,
+    TILE_MIN_OVERLAP,
+    TILE_OVERLAP_RATIO,
+)
 from exceptions import PdfixFailedToRenderException
+from image_processing import convert_page_image
 
 
-def render_page(pdfix: Pdfix, page: PdfPage, zoom: float, temporary_file: BinaryIO) -> None:
+def get_render_zoom(page: PdfPage, zoom: float, dpi: float, max_pixels: int) -> float:
     """
-    Render a PDF page into a temporary file, which is then used for OCR.
+    Choose zoom level for rendering the page.
+
+    Fixed zoom or DPI is used when provided. Otherwise zoom follows the resolution of the largest
+    image on the page, so scans are rendered in their native resolution.
+
+    Args:
+        page (PdfPage): The PDF page to be processed for OCR.
+        zoom (float): Fixed zoom level. 0 if not set.
+        dpi (float): Fixed rendering resolution. 0 if not set.
+        max_pixels (int): Maximum number of pixels of the rendered page. 0 means no limit.
+
+    Returns:
+        Zoom level for rendering the page.
+    """
+    if zoom > 0:
+        page_zoom: float = zoom
+    elif dpi > 0:
+        page_zoom = dpi / 72
+    else:
+        image_zoom: Optional[float] = get_dominant_image_zoom(page)
+        page_zoom = DEFAULT_ZOOM if image_zoom is None else min(max(image_zoom, MIN_ZOOM), MAX_ZOOM)
+
+    if max_pixels > 0:
+        crop_box: PdfRect = page.GetCropBox()
+        page_area: float = (crop_box.right - crop_box.left) * (crop_box.top - crop_box.bottom)
+        if page_area > 0 and page_area * page_zoom * page_zoom > max_pixels:
+            page_zoom = math.sqrt(max_pixels / page_area)
+
+    return page_zoom
+
+
+def get_dominant_image_zoom(page: PdfPage) -> Optional[float]:
+    """
+    Find the image covering the largest area of the page and compute zoom matching its resolution.
+
+    Args:
+        page (PdfPage): The PDF page.
+
+    Returns:
+        Zoom level rendering the image 1:1, or None if page has no image.
+    """
+    content: Optional[PdsContent] = page.GetContent()
+    if content is None:
+        return None
+
+    images: list[tuple[PdfRect, int]] = []
+    collect_images(content, images)
+    # Image with the largest area on the page; resolution from areas does not depend on image rotation
+    sizes: list[tuple[float, int]] = [(get_rect_area(bbox), pixels) for bbox, pixels in images if pixels > 0]
+    if not sizes:
+        return None
+
+    page_area, pixels = max(sizes)
+    return math.sqrt(pixels / page_area)
+
+
+def get_image_regions(page: PdfPage) -> list[PdfRect]:
+    """
+    Find areas of the page covered by images. Images close to each other are merged into one area.
+
+    Args:
+        page (PdfPage): The PDF page.
+
+    Returns:
+        Areas in page coordinates within the crop box, in the order of the first image of each area.
+    """
+    content: Optional[PdsContent] = page.GetContent()
+    if content is None:
+        return []
+
+    images: list[tuple[PdfRect, int]] = []
+    collect_images(content, images)
+
+    crop_box: PdfRect = page.GetCropBox()
+    # (left, bottom, right, top) grown by the margin and clipped to the crop box
+    boxes: list[tuple[float, float, float, float]] = []
+    for bbox, _ in images:
+        box: tuple[float, float, float, float] = (
+            max(bbox.left - REGION_MARGIN, crop_box.left),
+            max(bbox.bottom - REGION_MARGIN, crop_box.bottom),
+            min(bbox.right + REGION_MARGIN, crop_box.right),
+            min(bbox.top + REGION_MARGIN, crop_box.top),
+        )
+        if box[2] - box[0] >= MIN_REGION_SIZE and box[3] - box[1] >= MIN_REGION_SIZE:
+            boxes.append(box)
+
+    # Merging grows areas, which can make them overlap others, repeat until nothing changes
+    merged: bool = True
+    while merged:
+        merged = False
+        result: list[tuple[float, float, float, float]] = []
+        for box in boxes:
+            for index, other in enumerate(result):
+                if box[0] <= other[2] and other[0] <= box[2] and box[1] <= other[3] and other[1] <= box[3]:
+                    result[index] = (
+                        min(box[0], other[0]),
+                        min(box[1], other[1]),
+                        max(box[2], other[2]),
+                        max(box[3], other[3]),
+                    )
+                    merged = True
+                    break
+            else:
+                result.append(box)
+        boxes = result
+
+    regions: list[PdfRect] = []
+    for left, bottom, right, top in boxes:
+        region: PdfRect = PdfRect()
+        region.left, region.bottom, region.right, region.top = left, bottom, right, top
+        regions.append(region)
+    return regions
+
+
+def split_into_tiles(area: PdfRect, zoom: float, tile_size: int) -> list[tuple[PdfRect, PdfRect]]:
+    """
+    Split an area of the page into overlapping tiles, which are rendered and recognized separately.
+
+    Neighbouring tiles share a strip of the area. The middle of the strip is the border between parts
+    of the area owned by the tiles, words are taken from the tile owning their center.
+
+    Args:
+        area (PdfRect): Area of the page in page coordinates.
+        zoom (float): Zoom level for rendering the page.
+        tile_size (int): Maximum width and height of a rendered tile in pixels.
+
+    Returns:
+        Tiles with the parts of the area they own, in page coordinates. One tile equal to the area
+        if it fits into the tile size.
+    """
+    tile_length: float = tile_size / zoom
+    overlap: float = min(max(tile_length * TILE_OVERLAP_RATIO, TILE_MIN_OVERLAP), tile_length / 2)
+
+    def split(start: float, end: float) -> list[tuple[float, float, float, float]]:
+        # (tile start, tile end, owned start, owned end) evenly spread over the length
+        count: int = max(1, math.ceil((end - start - overlap) / (tile_length - overlap)))
+        step: float = (end - start - overlap) / count if count > 1 else end - start
+        return [
+            (
+                start + i * step,
+                end if i == count - 1 else start + i * step + step + overlap,
+                start if i == 0 else start + i * step + overlap / 2,
+                end if i == count - 1 else start + (i + 1) * step + overlap / 2,
+            )
+            for i in range(count)
+        ]
+
+    tiles: list[tuple[PdfRect, PdfRect]] = []
+    # From the top left, in reading order
+    for bottom, top, owned_bottom, owned_top in reversed(split(area.bottom, area.top)):
+        for left, right, owned_left, owned_right in split(area.left, area.right):
+            tile: PdfRect = PdfRect()
+            tile.left, tile.bottom, tile.right, tile.top = left, bottom, right, top
+            owned: PdfRect = PdfRect()
+            owned.left, owned.bottom, owned.right, owned.top = owned_left, owned_bottom, owned_right, owned_top
+            tiles.append((tile, owned))
+    return tiles
+
+
+def collect_images(content: PdsContent, images: list[tuple[PdfRect, int]]) -> None:
+    """
+    Collect bounding box and number of pixels of all images in the content including nested forms.
+
+    Args:
+        content (PdsContent): Page or form content.
+        images (list[tuple[PdfRect, int]]): Output list of (bounding box in page coordinates, number of pixels).
+            Number of pixels is 0 if not known.
+    """
+    for index in range(content.GetNumObjects()):
+        obj: Optional[PdsPageObject] = content.GetObject(index)
+        if obj is None:
+            continue
+
+        obj_type: int = obj.GetObjectType()
+        if obj_type == kPdsPageImage:
+            bbox: PdfRect = obj.GetBBox()
+            if get_rect_area(bbox) <= 0:
+                continue
+            pixels: int = 0
+            stream: Optional[PdsStream] = cast(PdsImage, obj).GetDataStm()
+            stream_dict: Optional[PdsDictionary] = None if stream is None else stream.GetStreamDict()
+            if stream_dict is not None:
+                pixels = max(0, stream_dict.GetInteger("Width", 0) * stream_dict.GetInteger("Height", 0))
+            images.append((bbox, pixels))
+        elif obj_type == kPdsPageForm:
+            form_content: Optional[PdsContent] = cast(PdsForm, obj).GetContent()
+            if form_content is not None:
+                collect_images(form_content, images)
+
+
+def get_rect_area(rect: PdfRect) -> float:
+    """
+    Compute area of the rectangle.
+
+    Args:
+        rect (PdfRect): Rectangle.
+
+    Returns:
+        Area, 0 for empty rectangles.
+    """
+    return max(0.0, rect.right - rect.left) * max(0.0, rect.top - rect.bottom)
+
+
+def render_page(
+    pdfix: Pdfix,
+    page: PdfPage,
+    zoom: float,
+    render_mode: str = RENDER_COLOR,
+    region: Optional[PdfRect] = None,
+) -> Image.Image:
+    """
+    Render a PDF page into an in-memory image, which is then used for OCR.
+
+    The raw pixel buffer of the rendered page is handed over directly, without
+    encoding it into an image file format. Each intermediate buffer is released
+    before the next copy is made to keep peak memory low.
 
     Args:
         pdfix (Pdfix): The Pdfix SDK object.
         page (PdfPage): The PDF page to be processed for OCR.
         zoom (float): Zoom level for rendering the page.
-        temporary_file (BinaryIO): Temporary file for saving image.
+        render_mode (str): Pixel format of the result ("color", "gray" or "binary").
+        region (Optional[PdfRect]): Area of the page in page coordinates to render. Whole page if None.
 
     Returns:
-        Raw PDF bytes (OCR page).
+        Rendered page image.
     """
     page_view: Optional[PdfPageView] = page.AcquirePageView(zoom, kRotate0)
     if page_view is None:
         raise PdfixFailedToRenderException(pdfix, "Unable to acquire page view")
 
     try:
+        matrix: PdfMatrix = page_view.GetDeviceMatrix()
         width: int = page_view.GetDeviceWidth()
         height: int = page_view.GetDeviceHeight()
+        if region is not None:
+            device_rect: PdfDevRect = page_view.RectToDevice(region)
+            width = device_rect.right - device_rect.left
+            height = device_rect.bottom - device_rect.top
+            if width <= 0 or height <= 0:
+                raise PdfixFailedToRenderException(pdfix, "Empty area of page")
 
-        # Create an image
-        image: Optional[PsImage] = pdfix.CreateImage(width, height, kImageDIBFormatArgb)
-        if image is None:
-            raise PdfixFailedToRenderException(pdfix, "Unable to create image")
+        memory_stream: Optional[PsMemoryStream] = pdfix.CreateMemStream()
+        if memory_stream is None:
+            raise PdfixFailedToRenderException(pdfix, "Unable to create memory stream")
 
         try:
-            # Render page
-            render_params: PdfPageRenderParams = PdfPageRenderParams()
-            render_params.image = image
-            render_params.matrix = page_view.GetDeviceMatrix()
-
-            if not page.DrawContent(render_params):
-                raise PdfixFailedToRenderException(pdfix, "Unable to draw content")
-
-            # Save image to file
-            file_stream: Optional[PsFileStream] = pdfix.CreateFileStream(temporary_file.name + ".jpg", kPsTruncate)
-            if file_stream is None:
-                raise PdfixFailedToRenderException(pdfix, "Unable to create file stream")
-
-            try:
-                img_params: PdfImageParams = PdfImageParams()
-                img_params.format = kImageFormatJpg
-                img_params.quality = 100
-
-                if not image.SaveToStream(file_stream, img_params):
-                    raise PdfixFailedToRenderException(pdfix, "Unable to save image to stream")
-            except Exception:
-                raise
-            finally:
-                file_stream.Destroy()
+            draw_page_to_stream(pdfix, page, width, height, matrix, region, memory_stream)
+
+            size: int = memory_stream.GetSize()
+            if size < width * height * 4:
+                raise PdfixFailedToRenderException(pdfix, "Unexpected size of image data")
+
+            data = (ctypes.c_ubyte * size)()
+            if not memory_stream.Read(0, data, size):
+                raise PdfixFailedToRenderException(pdfix, "Unable to read image data from stream")
         except Exception:
             raise
         finally:
-            image.Destroy()
+            memory_stream.Destroy()
     except Exception:
         raise
     finally:
         page_view.Release()
+
+    # ARGB DIB is stored as B, G, R, A bytes per pixel, alpha is not used for rendered page.
+    # ctypes array is decoded through the buffer protocol, without converting it to bytes first
+    page_image: Image.Image = Image.frombuffer("RGB", (width, height), cast(bytes, data), "raw", "BGRX", 0, 1)
+    del data
+    # Let Tesseract know the real resolution instead of guessing it
+    page_image.info["dpi"] = (72 * zoom, 72 * zoom)
+
+    return convert_page_image(page_image, render_mode)
+
+
+def draw_page_to_stream(
+    pdfix: Pdfix,
+    page: PdfPage,
+    width: int,
+    height: int,
+    matrix: PdfMatrix,
+    region: Optional[PdfRect],
+    stream: PsMemoryStream,
+) -> None:
+    """
+    Draw the page into an ARGB image and write its raw pixels into the stream.
+
+    Args:
+        pdfix (Pdfix): The Pdfix SDK object.
+        page (PdfPage): The PDF page.
+        width (int): Width of the image in pixels.
+        height (int): Height of the image in pixels.
+        matrix (PdfMatrix): Transformation from page coordinates to pixels of the whole page.
+        region (Optional[PdfRect]): Area of the page in page coordinates drawn at the origin of the image.
+            Whole page if None.
+        stream (PsMemoryStream): Stream receiving the raw pixels.
+    """
+    # Create an image
+    image: Optional[PsImage] = pdfix.CreateImage(width, height, kImageDIBFormatArgb)
+    if image is None:
+        raise PdfixFailedToRenderException(pdfix, "Unable to create image")
+
+    try:
+        # Render page
+        render_params: PdfPageRenderParams = PdfPageRenderParams()
+        render_params.image = image
+        render_params.matrix = matrix
+        if region is not None:
+            render_params.clip_box = region
+
+        if not page.DrawContent(render_params):
+            raise PdfixFailedToRenderException(pdfix, "Unable to draw content")
+
+        if not image.SaveDataToStream(stream):
+            raise PdfixFailedToRenderException(pdfix, "Unable to save image data to stream")
+    except Exception:
+        raise
+    finally:
+        image.Destroy()
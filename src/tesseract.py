@@ -1,9 +1,16 @@
+import ctypes
+import dataclasses
+import hashlib
+import math
 import os
+import shutil
 import tempfile
-import uuid
-from typing import Any, BinaryIO, Optional, cast
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, cast
 
-import pytesseract
 from pdfixsdk import (
     GetPdfix,
     PdfDoc,
@@ -11,30 +18,70 @@ from pdfixsdk import (
     PdfMatrix,
     PdfPage,
     PdfRect,
+    PdsArray,
+    PdsBoolean,
     PdsContent,
+    PdsDictionary,
     PdsForm,
+    PdsName,
+    PdsNumber,
+    PdsObject,
     PdsPageObject,
     PdsStream,
+    PdsString,
+    PdsText,
+    PsMemoryStream,
+    kPdsArray,
+    kPdsBoolean,
+    kPdsDictionary,
+    kPdsName,
+    kPdsNumber,
     kPdsPageText,
+    kPdsStream,
+    kPdsString,
     kSaveFull,
+    kSaveIncremental,
 )
+from PIL import Image
 from tqdm import tqdm
 
 from constants import (
+    LANG_AUTO,
+    LANG_DETECT_DPI,
+    LANG_DETECT_PAGES,
+    MAX_OBJECT_DEPTH,
+    MIN_FLUSH_GROWTH,
+    MIN_FLUSH_PAGES,
+    MIN_ORIENTATION_CONFIDENCE,
+    MIN_SCRIPT_CONFIDENCE,
+    ORIENTATION_DPI,
     PERCENT_OCR,
     PERCENT_RENDER,
     PERCENT_XOBJECT,
     PROGRESS_FIRST_STEP,
     PROGRESS_SECOND_STEP,
     PROGRESS_THIRD_STEP,
+    REGIONS_IMAGES,
+    RENDER_GRAY,
+    SAVE_INCREMENTAL,
+    SKEW_DPI,
 )
 from exceptions import (
+    ArgumentInvalidShardException,
     PdfixFailedToOcrException,
     PdfixFailedToOpenException,
     PdfixFailedToSaveException,
     PdfixInitializeException,
 )
-from page_renderer import render_page
+from image_processing import detect_skew_angle, downscale_page_image, rotate_page_image
+from language_detector import SCRIPT_LATIN, choose_languages
+from metrics import DocumentMetrics, PageMetrics, emit_progress, get_current_memory_mb, get_peak_rss_mb
+from ocr_cache import OcrCache
+from ocr_checkpoint import OcrCheckpoint, get_checkpoint_dir, get_file_digest, read_checkpoint_state
+from ocr_engine import OcrEngine, OcrResult, OsdResult, create_ocr_engine, get_image_dpi
+from ocr_options import OcrOptions
+from page_classifier import get_shard_pages, select_pages_for_ocr
+from page_renderer import get_image_regions, get_render_zoom, render_page, split_into_tiles
 from utils_sdk import (
     authorize_sdk,
     pdf_matrix_rotate,
@@ -45,192 +92,1104 @@ from utils_sdk import (
 )
 
 
-def ocr(input_path: str, output_path: str, license_name: str, license_key: str, lang: str, zoom: float) -> None:
+@dataclass
+class PageArea:
+    """
+    Part of a page rendered and recognized separately.
+
+    Attributes:
+        region (Optional[tuple[float, float, float, float]]): Area rendered as (left, bottom, right, top) in
+            page coordinates. None for the whole page.
+        clip (Optional[tuple[float, float, float, float]]): Part of the area owned by a tile, words centered
+            outside it are taken from a neighbouring tile. None keeps all words.
+    """
+
+    region: Optional[tuple[float, float, float, float]] = None
+    clip: Optional[tuple[float, float, float, float]] = None
+
+
+class OcrSession:
+    """
+    PDFix SDK, Tesseract engine and pool of OCR workers initialized once and shared by all
+    documents processed in one run.
+    """
+
+    def __init__(self, license_name: str, license_key: str, options: OcrOptions, verbose: bool = True) -> None:
+        """
+        Initialize and authorize PDFix SDK, create Tesseract engine and start OCR workers.
+
+        Args:
+            license_name (str): Pdfix SDK license name.
+            license_key (str): Pdfix SDK license key.
+            options (OcrOptions): Settings of the OCR run. Engine and number of workers are used.
+            verbose (bool): Print settings and decisions of the run to stdout.
+        """
+        self.verbose: bool = verbose
+        self.workers: int = options.jobs if options.jobs > 0 else get_available_cpu_count()
+        self.engine: OcrEngine = create_ocr_engine(options.engine, self.workers)
+        self.log(f"Using OCR engine: {self.engine.name}")
+
+        try:
+            # List of available languages
+            self.log(f"Available config files: {self.engine.get_languages()}")
+
+            pdfix: Optional[Pdfix] = GetPdfix()
+            if pdfix is None:
+                raise PdfixInitializeException()
+
+            authorize_sdk(pdfix, license_name, license_key, self.verbose)
+        except BaseException:
+            self.engine.close()
+            raise
+
+        self.pdfix: Pdfix = pdfix
+        self.log(f"Using OCR workers: {self.workers}")
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=self.workers)
+
+        self.cache: Optional[OcrCache] = None
+        if options.cache_dir:
+            self.cache = OcrCache(options.cache_dir, options.cache_size * 1024 * 1024)
+            self.log(f"Using OCR cache: {options.cache_dir}")
+
+    def recognize(self, image: Image.Image, lang: str, rotate_pages: bool = False, deskew: bool = False) -> OcrResult:
+        """
+        Run OCR on a rendered page image, reusing the cached result of an identical page.
+
+        Args:
+            image (Image.Image): Rendered page image.
+            lang (str): Language identifier for OCR Tesseract.
+            rotate_pages (bool): Turn the image upright before OCR.
+            deskew (bool): Straighten text lines of the image before OCR.
+
+        Returns:
+            OCR page, its confidence and rotation applied to the image.
+        """
+        start: float = time.perf_counter()
+        # Looked up before rotation is detected, a cached page does not need Tesseract at all
+        key: str = ""
+        if self.cache is not None:
+            key = self.cache.get_key(
+                image, lang, self.engine.name, self.engine.get_model_version(lang), rotate_pages, deskew
+            )
+            cached: Optional[OcrResult] = self.cache.get(key)
+            if cached is not None:
+                cached.seconds = time.perf_counter() - start
+                return cached
+
+        rotation: float = 0.0
+        if rotate_pages or deskew:
+            rotation = self.detect_rotation(image, rotate_pages, deskew)
+            if rotation != 0:
+                image = rotate_page_image(image, rotation)
+
+        result: OcrResult = self.engine.recognize(image, lang)
+        result.rotation = rotation
+        if self.cache is not None:
+            self.cache.put(key, result)
+        result.seconds = time.perf_counter() - start
+        return result
+
+    def detect_rotation(self, image: Image.Image, rotate_pages: bool, deskew: bool) -> float:
+        """
+        Detect rotation making the text of the page upright and its lines horizontal. Works on
+        a downscaled copy of the image.
+
+        Args:
+            image (Image.Image): Rendered page image.
+            rotate_pages (bool): Detect orientation in steps of 90 degrees.
+            deskew (bool): Detect small skew of text lines.
+
+        Returns:
+            Clockwise rotation in degrees.
+        """
+        small: Image.Image = downscale_page_image(image, ORIENTATION_DPI)
+
+        rotate: int = 0
+        if rotate_pages:
+            osd: OsdResult = self.engine.detect_orientation_script(small)
+            if osd.orientation_confidence >= MIN_ORIENTATION_CONFIDENCE:
+                rotate = osd.rotate
+
+        skew: float = 0.0
+        if deskew:
+            upright: Image.Image = rotate_page_image(small, rotate) if rotate else small
+            skew = detect_skew_angle(downscale_page_image(upright, SKEW_DPI))
+
+        return rotate + skew
+
+    def log(self, message: str) -> None:
+        """
+        Print a message about the run unless the session is quiet.
+
+        Args:
+            message (str): Message to print.
+        """
+        if self.verbose:
+            print(message)
+
+    def close(self) -> None:
+        """
+        Stop OCR workers and release Tesseract engine.
+        """
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.engine.close()
+
+        if self.cache is not None:
+            self.log(f"OCR cache: {self.cache.hits} hits, {self.cache.misses} misses")
+
+
+def ocr(input_path: str, output_path: str, license_name: str, license_key: str, options: OcrOptions) -> DocumentMetrics:
     """
     Run OCR using Tesseract.
 
+    Pages are rendered on the main thread, recognized by a pool of Tesseract workers
+    and merged back into the document in page order on the main thread.
+
     Args:
         input_path (str): Input path to the PDF file.
         output_path  (str): Output path for saving the PDF file.
         license_name (str): Pdfix SDK license name.
         license_key (str): dfix SDK license key.
-        lang (str): Language identifier for OCR Tesseract.
-        zoom (float): Zoom level for rendering the page.
+        options (OcrOptions): Settings of the OCR run.
+
+    Returns:
+        Measurements of the OCR run.
+    """
+    session: OcrSession = OcrSession(license_name, license_key, options)
+    try:
+        return ocr_document(session, input_path, output_path, options)
+    except Exception:
+        raise
+    finally:
+        session.close()
+
+
+def ocr_document(session: OcrSession, input_path: str, output_path: str, options: OcrOptions) -> DocumentMetrics:
+    """
+    Run OCR of one document with progress reporting.
+
+    Args:
+        session (OcrSession): Initialized PDFix SDK, engine and OCR workers.
+        input_path (str): Input path to the PDF file.
+        output_path  (str): Output path for saving the PDF file.
+        options (OcrOptions): Settings of the OCR run.
+
+    Returns:
+        Measurements of the OCR run.
     """
     total_progress_count: int = PROGRESS_FIRST_STEP + PROGRESS_SECOND_STEP + PROGRESS_THIRD_STEP
-    with tqdm(total=total_progress_count) as progress_bar:
+    # Progress bar would mix with machine-readable progress lines on stderr
+    with tqdm(total=total_progress_count, disable=options.progress_json) as progress_bar:
         progress_bar.set_description("Initializing")
 
-        # List of available languages
-        print(f"Available config files: {pytesseract.get_languages(config='')}")
+        metrics: DocumentMetrics = process_document(session, progress_bar, input_path, output_path, options)
+
+        progress_bar.n = total_progress_count
+        progress_bar.set_description("Done")
+        progress_bar.refresh()
+
+    return metrics
+
 
-        pdfix: Optional[Pdfix] = GetPdfix()
-        if pdfix is None:
-            raise PdfixInitializeException()
+def process_document(
+    session: OcrSession,
+    progress_bar: tqdm,
+    input_path: str,
+    output_path: str,
+    options: OcrOptions,
+    progress: Optional[Callable[[str, dict[str, Any]], None]] = None,
+) -> DocumentMetrics:
+    """
+    Open the document, OCR all pages with the engine and save the result.
+
+    With chunk size or memory limit set, the document is periodically saved to a temporary file
+    next to the output and reopened, which releases pages and text layers held by PDFix SDK.
 
-        authorize_sdk(pdfix, license_name, license_key)
+    Args:
+        session (OcrSession): Initialized PDFix SDK, engine and OCR workers.
+        progress_bar (tqdm): Progress bar to update.
+        input_path (str): Input path to the PDF file.
+        output_path  (str): Output path for saving the PDF file.
+        options (OcrOptions): Settings of the OCR run.
+        progress (Optional[Callable[[str, dict[str, Any]], None]]): Called with progress events "start", "page"
+            and "document" and their values. Progress lines are written to stderr if not set and enabled in
+            options. An exception raised by it stops processing of the document.
+
+    Returns:
+        Measurements of the OCR run.
+    """
+    if progress is None and options.progress_json:
+        progress = emit_progress
 
-        # Open doc
-        doc: Optional[PdfDoc] = pdfix.OpenDoc(input_path, "")
-        if doc is None:
-            raise PdfixFailedToOpenException(pdfix, input_path)
+    pdfix: Pdfix = session.pdfix
+    metrics: DocumentMetrics = DocumentMetrics(input_path, output_path)
+    document_start: float = time.perf_counter()
 
+    # Open doc
+    doc: Optional[PdfDoc] = pdfix.OpenDoc(input_path, "")
+    if doc is None:
+        raise PdfixFailedToOpenException(pdfix, input_path)
+
+    # Temporary copies of the document flushed during processing
+    stream_dir: str = ""
+    checkpoint: Optional[OcrCheckpoint] = None
+
+    try:
+        page_indexes: list[int] = select_pages_for_ocr(pdfix, doc, options.mode, options.pages, options.first_n)
+        metrics.page_count = doc.GetNumPages()
+        metrics.open_seconds = time.perf_counter() - document_start
+        session.log(f"Pages to OCR: {len(page_indexes)} of {metrics.page_count}")
+
+        lang: str = options.lang
+        if lang == LANG_AUTO:
+            detect_start: float = time.perf_counter()
+            # Decided once for the whole document from a few sample pages
+            lang = detect_language(session, doc, page_indexes, options) or ""
+            metrics.detect_seconds = time.perf_counter() - detect_start
         if lang == "":
             pdf_lang = translate_iso_to_tesseract(doc.GetLang())
             # default "eng" if pdf does not have lang identifier or is not supported
             lang = "eng" if pdf_lang is None else pdf_lang
 
-        print(f"Using language: {lang}")
+        session.log(f"Using language: {lang}")
+        metrics.lang = lang
+
+        # Shard results are stored in the shard directory and placed onto the document by merge_shards
+        sharding: bool = options.shard != ""
+        if sharding:
+            # Selected after detecting the language, so that all shards detect it from the same pages
+            page_indexes = get_shard_pages(page_indexes, options.shard)
+            session.log(f"Pages of shard {options.shard}: {len(page_indexes)}")
 
-        number_of_pages: int = doc.GetNumPages()
+        checkpointed: set[int] = set()
+        if options.resume or sharding:
+            checkpoint = create_checkpoint(input_path, output_path, lang, session.engine.name, options, page_indexes)
+            checkpointed = checkpoint.get_page_indexes().intersection(page_indexes)
+            session.log(f"Resuming pages: {len(checkpointed)} of {len(page_indexes)} already done")
+        if progress is not None:
+            progress("start", {"input": input_path, "pages": len(page_indexes), "page_count": metrics.page_count})
 
         progress_bar.update(PROGRESS_FIRST_STEP)
         progress_bar.set_description("Processing pages")
-        step_count: float = float(PROGRESS_SECOND_STEP) / number_of_pages
+        step_count: float = float(PROGRESS_SECOND_STEP) / max(1, len(page_indexes))
 
         render_step_units: float = step_count * PERCENT_RENDER
         ocr_step_units: float = step_count * PERCENT_OCR
         xobject_step_units: float = step_count * PERCENT_XOBJECT
 
-        # Process each page
-        for page_index in range(number_of_pages):
-            page: Optional[PdfPage] = doc.AcquirePage(page_index)
-            if page is None:
-                raise PdfixFailedToOcrException(pdfix, "Unable to acquire page")
+        # Rendered pages waiting for OCR, in page order, each with the area of the page every image was
+        # rendered from. Bounded so that rendering does not run too far ahead of recognition holding
+        # too many images in memory.
+        pending: deque[tuple[PageMetrics, list[tuple[PageArea, Future[OcrResult]]]]] = deque()
+        max_pending: int = 2 * session.workers
+        merged_since_flush: int = 0
+        # Memory left after the last flush, e.g. language models of OCR workers that a flush cannot release
+        flushed_memory_mb: float = 0.0
+        # Fonts of text layers by their content, Tesseract embeds the same font into every OCR page
+        shared_fonts: dict[str, PdsObject] = {}
 
-            try:
-                # Create temp file for rendering
-                with tempfile.NamedTemporaryFile() as tmp:
-                    render_page(pdfix, page, zoom, cast(BinaryIO, tmp.file))
+        def merge_next() -> None:
+            nonlocal merged_since_flush
+            page_metrics, futures = pending.popleft()
+            results: list[OcrResult] = []
+            for area, future in futures:
+                result: OcrResult = future.result()
+                result.region = area.region
+                result.clip = area.clip
+                results.append(result)
+            progress_bar.update(ocr_step_units)
+
+            merge_start: float = time.perf_counter()
+            if not sharding:
+                page_metrics.words = add_ocr_results(pdfix, doc, page_metrics.page_index, results, shared_fonts)
+            page_metrics.merge_seconds = time.perf_counter() - merge_start
+            progress_bar.update(xobject_step_units)
+
+            confidences: list[float] = [result.confidence for result in results if result.confidence >= 0]
+            page_metrics.ocr_seconds = sum(result.seconds for result in results)
+            page_metrics.cached = bool(results) and all(result.cached for result in results)
+            page_metrics.confidence = sum(confidences) / len(confidences) if confidences else -1.0
+            page_metrics.rotation = results[0].rotation if results else 0.0
+            page_metrics.peak_rss_mb = get_peak_rss_mb()
+            if checkpoint is not None and not page_metrics.resumed:
+                checkpoint.put(page_metrics.page_index, results)
+            metrics.pages.append(page_metrics)
+            merged_since_flush += 1
+            if progress is not None:
+                progress(
+                    "page",
+                    {"input": input_path, "done": len(metrics.pages), "pages": len(page_indexes)}
+                    | dataclasses.asdict(page_metrics),
+                )
+
+        def wait_for_workers(futures: list[tuple[PageArea, Future[OcrResult]]]) -> None:
+            # Tiles of one page together take as much memory as the whole page, so images waiting
+            # for OCR are bounded also within the page
+            while True:
+                waiting: list[Future[OcrResult]] = [
+                    future for _, page_futures in pending for _, future in page_futures if not future.done()
+                ] + [future for _, future in futures if not future.done()]
+                if len(waiting) < max_pending:
+                    return
+                wait(waiting, return_when=FIRST_COMPLETED)
+
+        def flush() -> None:
+            nonlocal doc, stream_dir, merged_since_flush, flushed_memory_mb
+            if sharding:
+                # Document of a shard is not changed
+                return
+            if stream_dir == "":
+                stream_dir = tempfile.mkdtemp(prefix=".ocr-", dir=os.path.dirname(os.path.abspath(output_path)))
+            # Alternate two files, the one that is open cannot be overwritten
+            stream_path: str = os.path.join(stream_dir, f"stream_{metrics.flushes % 2}.pdf")
+            # Incremental save appends to an existing file, the file of the flush before last is closed by now
+            if os.path.exists(stream_path):
+                os.remove(stream_path)
+            flushed_doc: PdfDoc = doc
+            # Incremental flushes keep the input bytes and append changes, so that the output stays incremental
+            if not flushed_doc.Save(stream_path, get_save_flags(options.save_mode)):
+                raise PdfixFailedToSaveException(pdfix, stream_path)
+            doc = None
+            flushed_doc.Close()
+            doc = pdfix.OpenDoc(stream_path, "")
+            if doc is None:
+                raise PdfixFailedToOpenException(pdfix, stream_path)
+            metrics.flushes += 1
+            merged_since_flush = 0
+            flushed_memory_mb = get_current_memory_mb()
+            # Objects of the closed document are not valid in the reopened one
+            shared_fonts.clear()
+
+        try:
+            # Process each page
+            for page_index in page_indexes:
+                if options.max_memory > 0:
+                    # Wait for pages in flight until memory drops below the limit, down to one page at a time
+                    while pending and get_current_memory_mb() > options.max_memory:
+                        merge_next()
+                    # Flushed again only when merged pages grew the document, otherwise every flush would
+                    # rewrite the whole document without getting below the limit
+                    if merged_since_flush >= MIN_FLUSH_PAGES:
+                        memory_mb: float = get_current_memory_mb()
+                        if memory_mb > options.max_memory and memory_mb > flushed_memory_mb + MIN_FLUSH_GROWTH:
+                            flush()
+                if options.chunk_size > 0 and merged_since_flush >= options.chunk_size:
+                    flush()
+
+                checkpointed_results: Optional[list[OcrResult]] = None
+                if page_index in checkpointed and checkpoint is not None:
+                    checkpointed_results = checkpoint.get(page_index)
+                if checkpointed_results is not None:
+                    # Merged like finished OCR results, in page order with the others
+                    resumed_futures: list[tuple[PageArea, Future[OcrResult]]] = []
+                    for checkpointed_result in checkpointed_results:
+                        resumed: Future[OcrResult] = Future()
+                        resumed.set_result(checkpointed_result)
+                        resumed_futures.append(
+                            (PageArea(checkpointed_result.region, checkpointed_result.clip), resumed)
+                        )
+                    pending.append((PageMetrics(page_index, resumed=True), resumed_futures))
                     progress_bar.update(render_step_units)
+                    if len(pending) >= max_pending:
+                        merge_next()
+                    continue
+
+                render_start: float = time.perf_counter()
+                zoom, region_count, areas = get_page_areas(pdfix, doc, page_index, options)
+                page_metrics: PageMetrics = PageMetrics(
+                    page_index,
+                    regions=region_count,
+                    tiles=sum(1 for area in areas if area.clip is not None),
+                    render_seconds=time.perf_counter() - render_start,
+                )
 
-                    # Run OCR
-                    temp_pdf_page = pytesseract.image_to_pdf_or_hocr(
-                        tmp.name + ".jpg",
-                        extension="pdf",
-                        lang=lang,
+                futures: list[tuple[PageArea, Future[OcrResult]]] = []
+                for area in areas:
+                    wait_for_workers(futures)
+                    render_start = time.perf_counter()
+                    image: Image.Image = render_document_page(pdfix, doc, page_index, options, area.region, zoom)
+                    page_metrics.render_seconds += time.perf_counter() - render_start
+                    if image.width * image.height > page_metrics.width * page_metrics.height:
+                        page_metrics.dpi = get_image_dpi(image)
+                        page_metrics.width = image.width
+                        page_metrics.height = image.height
+                    futures.append(
+                        (
+                            area,
+                            session.executor.submit(
+                                session.recognize, image, lang, options.rotate_pages, options.deskew
+                            ),
+                        )
                     )
-                    progress_bar.update(ocr_step_units)
+                    del image
+                progress_bar.update(render_step_units)
 
-                temp_path: str = (
-                    f"{tempfile.gettempdir()}{str(uuid.uuid4())}.pdf"  # temporary file for pdf generated by the OCR
-                )
-                with open(temp_path, "w+b") as f:
-                    f.write(temp_pdf_page)
+                pending.append((page_metrics, futures))
+
+                if len(pending) >= max_pending:
+                    merge_next()
+
+            while pending:
+                merge_next()
+        except BaseException:
+            # Workers are shared with other documents, drop pages of this one that did not start yet
+            for _, futures in pending:
+                for _, future in futures:
+                    future.cancel()
+            raise
+
+        progress_bar.n = PROGRESS_FIRST_STEP + PROGRESS_SECOND_STEP
+        progress_bar.set_description("Saving document")
+        progress_bar.refresh()
+
+        if not sharding:
+            save_start: float = time.perf_counter()
+            save_document(pdfix, doc, output_path, options.save_mode)
+            metrics.save_seconds = time.perf_counter() - save_start
+
+            if checkpoint is not None:
+                checkpoint.remove()
+    except Exception:
+        raise
+    finally:
+        if doc is not None:
+            doc.Close()
+        if stream_dir != "":
+            shutil.rmtree(stream_dir, ignore_errors=True)
+
+    metrics.total_seconds = time.perf_counter() - document_start
+    metrics.peak_rss_mb = get_peak_rss_mb()
+    if progress is not None:
+        progress("document", {key: value for key, value in dataclasses.asdict(metrics).items() if key != "pages"})
+
+    return metrics
+
+
+def detect_language(session: OcrSession, doc: PdfDoc, page_indexes: list[int], options: OcrOptions) -> Optional[str]:
+    """
+    Detect languages of the document from sample pages rendered in low resolution. Orientation
+    and script detection chooses the script, Latin script languages are told apart by common words
+    in the text recognized with the English model.
+
+    Args:
+        session (OcrSession): Initialized PDFix SDK, engine and OCR workers.
+        doc (PdfDoc): The PDF document.
+        page_indexes (list[int]): Pages to OCR, samples are taken from them.
+        options (OcrOptions): Settings of the OCR run.
+
+    Returns:
+        Language identifier for OCR Tesseract like "deu+eng", or None if no text was detected.
+    """
+    if not page_indexes:
+        return None
+
+    sample_count: int = min(LANG_DETECT_PAGES, len(page_indexes))
+    sample_indexes: list[int] = sorted(
+        {page_indexes[i * (len(page_indexes) - 1) // max(1, sample_count - 1)] for i in range(sample_count)}
+    )
+    sample_options: OcrOptions = dataclasses.replace(options, zoom=0.0, dpi=LANG_DETECT_DPI, render_mode=RENDER_GRAY)
+    images: list[Image.Image] = [
+        render_document_page(session.pdfix, doc, page_index, sample_options) for page_index in sample_indexes
+    ]
+
+    osd_results: list[OsdResult] = list(session.executor.map(session.engine.detect_orientation_script, images))
+    scripts: list[str] = [osd.script for osd in osd_results if osd.script_confidence >= MIN_SCRIPT_CONFIDENCE]
+
+    latin_text: str = ""
+    if SCRIPT_LATIN in scripts:
+        crops: list[Image.Image] = []
+        for image, osd in zip(images, osd_results):
+            if osd.script != SCRIPT_LATIN or osd.script_confidence < MIN_SCRIPT_CONFIDENCE:
+                continue
+            upright: Image.Image = image.rotate(-osd.rotate, expand=True) if osd.rotate else image
+            # A band in the middle of the page holds enough words and takes a fraction of the time of the whole page
+            crops.append(upright.crop((0, 2 * upright.height // 5, upright.width, 3 * upright.height // 5)))
+        latin_text = " ".join(session.executor.map(lambda crop: session.engine.recognize_text(crop, "eng"), crops))
+
+    detected: Optional[str] = choose_languages(scripts, latin_text, session.engine.get_languages())
+    session.log(f"Detected scripts: {scripts}, languages: {detected}")
+    return detected
+
+
+def create_checkpoint(
+    input_path: str, output_path: str, lang: str, engine_name: str, options: OcrOptions, page_indexes: list[int]
+) -> OcrCheckpoint:
+    """
+    Open the checkpoint of the output file, or the shard directory when a shard is processed.
+    Results are kept only for the same input file and settings that change the OCR result.
+
+    Args:
+        input_path (str): Input path to the PDF file.
+        output_path  (str): Output path for saving the PDF file, or the shard directory.
+        lang (str): Language identifier for OCR Tesseract.
+        engine_name (str): Name of the Tesseract engine.
+        options (OcrOptions): Settings of the OCR run.
+        page_indexes (list[int]): Pages to OCR.
+
+    Returns:
+        Checkpoint of the document.
+    """
+    stat: os.stat_result = os.stat(input_path)
+    input_state: dict[str, Any] = {
+        "input": os.path.abspath(input_path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+    }
+    if options.shard:
+        # Results of another shard are discarded, anything else in the folder is not ours to discard
+        if read_checkpoint_state(output_path) is None and os.path.exists(output_path):
+            if not os.path.isdir(output_path) or os.listdir(output_path):
+                raise ArgumentInvalidShardException(f"{output_path} is not empty and is not a shard directory")
+        # Shards of one document are processed and merged on different machines
+        input_state = {
+            "sha256": get_file_digest(input_path),
+            "size": stat.st_size,
+            "shard": options.shard,
+            "pages": page_indexes,
+        }
+    state: dict[str, Any] = input_state | {
+        "lang": lang,
+        "engine": engine_name,
+        "mode": options.mode,
+        "zoom": options.zoom,
+        "dpi": options.dpi,
+        "max_pixels": options.max_pixels,
+        "render_mode": options.render_mode,
+        "rotate_pages": options.rotate_pages,
+        "deskew": options.deskew,
+        "regions": options.regions,
+        "tile_size": options.tile_size,
+    }
+    return OcrCheckpoint(output_path if options.shard else get_checkpoint_dir(output_path), state)
+
+
+def save_document(pdfix: Pdfix, doc: PdfDoc, output_path: str, save_mode: str) -> None:
+    """
+    Save the document into a new file next to the output and replace the output with it at once.
+    Incremental save appends to an existing file, and a failed save does not destroy a previous output.
+
+    Args:
+        pdfix (Pdfix): The Pdfix SDK object.
+        doc (PdfDoc): The PDF document.
+        output_path (str): Output path for saving the PDF file.
+        save_mode (str): How the output is written ("full" or "incremental").
+    """
+    fd, temp_path = tempfile.mkstemp(prefix=".ocr-", suffix=".pdf", dir=os.path.dirname(os.path.abspath(output_path)))
+    os.close(fd)
+    # Only the unique name is needed, the file itself would be appended to
+    os.remove(temp_path)
+    try:
+        if not doc.Save(temp_path, get_save_flags(save_mode)):
+            raise PdfixFailedToSaveException(pdfix, output_path)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def get_save_flags(save_mode: str) -> int:
+    """
+    Get PDFix SDK flags of saving the output.
+
+    Args:
+        save_mode (str): How the output is written ("full" or "incremental").
+
+    Returns:
+        Flags for PdfDoc.Save.
+    """
+    return kSaveIncremental if save_mode == SAVE_INCREMENTAL else kSaveFull
+
+
+def get_available_cpu_count() -> int:
+    """
+    Get the number of CPU cores this process is allowed to run on.
+
+    Returns:
+        Number of usable CPU cores (at least 1).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def get_page_areas(
+    pdfix: Pdfix, doc: PdfDoc, page_index: int, options: OcrOptions
+) -> tuple[float, int, list[PageArea]]:
+    """
+    Choose zoom of the page and its parts rendered and recognized separately: the whole page or areas
+    covered by images, split into tiles when larger than the tile size.
+
+    Args:
+        pdfix (Pdfix): The Pdfix SDK object.
+        doc (PdfDoc): The PDF document.
+        page_index (int): Index of the page.
+        options (OcrOptions): Settings of the OCR run.
+
+    Returns:
+        Zoom of the page, number of image regions and areas to render. No areas if OCR of image
+        regions is selected and there are no images on the page.
+    """
+    page: Optional[PdfPage] = doc.AcquirePage(page_index)
+    if page is None:
+        raise PdfixFailedToOcrException(pdfix, "Unable to acquire page")
+
+    try:
+        # Tiles bound the size of rendered images instead of lowering the zoom
+        max_pixels: int = 0 if options.tile_size > 0 else options.max_pixels
+        # Whole page zoom, so that text in image regions is rendered like on the whole page
+        zoom: float = get_render_zoom(page, options.zoom, options.dpi, max_pixels)
+
+        regions: list[Optional[PdfRect]] = [None]
+        if options.regions == REGIONS_IMAGES:
+            regions = list(get_image_regions(page))
+
+        areas: list[PageArea] = []
+        for region in regions:
+            tiles: list[tuple[PdfRect, PdfRect]] = []
+            if options.tile_size > 0:
+                tiles = split_into_tiles(page.GetCropBox() if region is None else region, zoom, options.tile_size)
+            if len(tiles) > 1:
+                areas.extend(PageArea(get_area(tile), get_area(owned)) for tile, owned in tiles)
+            else:
+                areas.append(PageArea(None if region is None else get_area(region)))
+
+        return zoom, 0 if options.regions != REGIONS_IMAGES else len(regions), areas
+    except Exception:
+        raise
+    finally:
+        page.Release()
+
+
+def get_area(rect: PdfRect) -> tuple[float, float, float, float]:
+    """
+    Convert rectangle of PDFix SDK to an area that can be passed between threads and stored.
+
+    Args:
+        rect (PdfRect): Rectangle in page coordinates.
+
+    Returns:
+        Area as (left, bottom, right, top).
+    """
+    return (rect.left, rect.bottom, rect.right, rect.top)
+
+
+def get_rect(area: tuple[float, float, float, float]) -> PdfRect:
+    """
+    Convert an area to rectangle of PDFix SDK.
+
+    Args:
+        area (tuple[float, float, float, float]): Area as (left, bottom, right, top).
+
+    Returns:
+        Rectangle in page coordinates.
+    """
+    rect: PdfRect = PdfRect()
+    rect.left, rect.bottom, rect.right, rect.top = area
+    return rect
+
+
+def render_document_page(
+    pdfix: Pdfix,
+    doc: PdfDoc,
+    page_index: int,
+    options: OcrOptions,
+    region: Optional[tuple[float, float, float, float]] = None,
+    zoom: float = 0.0,
+) -> Image.Image:
+    """
+    Render a PDF page or its area into an in-memory image for OCR.
+
+    Args:
+        pdfix (Pdfix): The Pdfix SDK object.
+        doc (PdfDoc): The PDF document.
+        page_index (int): Index of the page to render.
+        options (OcrOptions): Settings of the OCR run.
+        region (Optional[tuple[float, float, float, float]]): Area as (left, bottom, right, top) in page
+            coordinates. Whole page if None.
+        zoom (float): Zoom level chosen for the page. 0 chooses zoom from the options.
+
+    Returns:
+        Rendered page image.
+    """
+    page: Optional[PdfPage] = doc.AcquirePage(page_index)
+    if page is None:
+        raise PdfixFailedToOcrException(pdfix, "Unable to acquire page")
+
+    try:
+        if zoom <= 0:
+            zoom = get_render_zoom(page, options.zoom, options.dpi, options.max_pixels)
+        return render_page(pdfix, page, zoom, options.render_mode, None if region is None else get_rect(region))
+    except Exception:
+        raise
+    finally:
+        page.Release()
+
+
+def add_ocr_results(
+    pdfix: Pdfix, doc: PdfDoc, page_index: int, results: list[OcrResult], shared_fonts: dict[str, PdsObject]
+) -> int:
+    """
+    Place the text layers of the whole page, its image regions or tiles onto a page of the document.
+
+    Args:
+        pdfix (Pdfix): The Pdfix SDK object.
+        doc (PdfDoc): The PDF document.
+        page_index (int): Index of the page the OCR results belong to.
+        results (list[OcrResult]): OCR pages with their rotation, region and clip.
+        shared_fonts (dict[str, PdsObject]): Fonts already placed into the document by their digest.
+
+    Returns:
+        Number of words in the text layers.
+    """
+    # Words recognized near borders of tiles, shared by all tiles of the page
+    border_words: list[tuple[str, tuple[float, float, float, float]]] = []
+    words: int = 0
+    for result in results:
+        words += add_ocr_page(
+            pdfix,
+            doc,
+            page_index,
+            result.data,
+            result.rotation,
+            result.region,
+            result.clip,
+            border_words,
+            shared_fonts,
+        )
+    return words
+
+
+def add_ocr_page(
+    pdfix: Pdfix,
+    doc: PdfDoc,
+    page_index: int,
+    temp_pdf_page: bytes,
+    rotation: float = 0.0,
+    region: Optional[tuple[float, float, float, float]] = None,
+    clip: Optional[tuple[float, float, float, float]] = None,
+    border_words: Optional[list[tuple[str, tuple[float, float, float, float]]]] = None,
+    shared_fonts: Optional[dict[str, PdsObject]] = None,
+) -> int:
+    """
+    Place the text layer produced by Tesseract onto a page of the document.
+
+    Args:
+        pdfix (Pdfix): The Pdfix SDK object.
+        doc (PdfDoc): The PDF document.
+        page_index (int): Index of the page the OCR result belongs to.
+        temp_pdf_page (bytes): Raw PDF bytes (OCR page).
+        rotation (float): Clockwise rotation in degrees applied to the page image before OCR.
+        region (Optional[tuple[float, float, float, float]]): Area of the page the image was rendered from
+            as (left, bottom, right, top). None for the whole page.
+        clip (Optional[tuple[float, float, float, float]]): Part of the page as (left, bottom, right, top),
+            words centered outside it are dropped. None keeps all words.
+        border_words (Optional[list[tuple[str, tuple[float, float, float, float]]]]): Words crossing the clip
+            placed from other tiles of the page with their areas. Words of this tile crossing the clip are
+            dropped if they repeat one of them, otherwise added.
+        shared_fonts (Optional[dict[str, PdsObject]]): Fonts already placed into the document by their digest.
+            Fonts of the text layer equal to one of them are replaced by it, others are added. None keeps the
+            fonts copied with the text layer.
+
+    Returns:
+        Number of words in the text layer.
+    """
+    page: Optional[PdfPage] = doc.AcquirePage(page_index)
+    if page is None:
+        raise PdfixFailedToOcrException(pdfix, "Unable to acquire page")
+
+    try:
+        # Tesseract output is opened directly from memory
+        temp_stream: Optional[PsMemoryStream] = pdfix.CreateMemStream()
+        if temp_stream is None:
+            raise PdfixFailedToOcrException(pdfix, "Unable to create memory stream")
+
+        try:
+            data = (ctypes.c_ubyte * len(temp_pdf_page)).from_buffer_copy(temp_pdf_page)
+            if not temp_stream.Write(0, data, len(temp_pdf_page)):
+                raise PdfixFailedToOcrException(pdfix, "Unable to write PDF to memory stream")
+
+            temp_doc: Optional[PdfDoc] = pdfix.OpenDocFromStream(temp_stream, "")
+            if temp_doc is None:
+                raise PdfixFailedToOcrException(pdfix, "Unable to open PDF")
+
+            try:
+                # There is always only one page in the new PDF file
+                temp_page: Optional[PdfPage] = temp_doc.AcquirePage(0)
+                if temp_page is None:
+                    raise PdfixFailedToOcrException(pdfix, "Unable to acquire page")
 
                 try:
-                    temp_doc: Optional[PdfDoc] = pdfix.OpenDoc(temp_path, "")
-                    if temp_doc is None:
-                        raise PdfixFailedToOcrException(pdfix, "Unable to open PDF")
-
-                    try:
-                        # There is always only one page in the new PDF file
-                        temp_page: Optional[PdfPage] = temp_doc.AcquirePage(0)
-                        if temp_page is None:
-                            raise PdfixFailedToOcrException(pdfix, "Unable to acquire page")
-
-                        try:
-                            temp_page_box: PdfRect = temp_page.GetCropBox()
-
-                            # Remove other then text page objects from the page content
-                            temp_page_content: Optional[PdsContent] = temp_page.GetContent()
-                            if temp_page_content is None:
-                                raise PdfixFailedToOcrException(pdfix, "Failed to obtain content from temporary page")
-                            for j in reversed(range(temp_page_content.GetNumObjects())):
-                                obj: Optional[PdsPageObject] = temp_page_content.GetObject(j)
-                                if not obj:
-                                    continue
-                                obj_type: int = obj.GetObjectType()
-                                if obj_type != kPdsPageText:
-                                    temp_page_content.RemoveObject(obj)
-
-                            temp_page.SetContent()
-
-                            xobj: Optional[PdsStream] = doc.CreateXObjectFromPage(temp_page)
-                            if xobj is None:
-                                raise PdfixFailedToOcrException(pdfix, "Failed to create XObject from page")
-
-                        except Exception:
-                            raise
-                        finally:
-                            temp_page.Release()
-                    except Exception:
-                        raise
-                    finally:
-                        temp_doc.Close()
+                    temp_page_box: PdfRect = temp_page.GetCropBox()
+                    matrix: PdfMatrix = get_text_layer_matrix(page, temp_page_box, rotation, region)
+
+                    # Remove other then text page objects from the page content
+                    # (Tesseract produces text-only PDF, so there is usually nothing to remove)
+                    # and words outside the clip, which are recognized in another tile
+                    temp_page_content: Optional[PdsContent] = temp_page.GetContent()
+                    if temp_page_content is None:
+                        raise PdfixFailedToOcrException(pdfix, "Failed to obtain content from temporary page")
+                    removed: bool = False
+                    # Tesseract writes every word as a separate text object
+                    words: int = 0
+                    for j in reversed(range(temp_page_content.GetNumObjects())):
+                        obj: Optional[PdsPageObject] = temp_page_content.GetObject(j)
+                        if not obj:
+                            continue
+                        obj_type: int = obj.GetObjectType()
+                        if obj_type != kPdsPageText or (
+                            clip is not None and not is_tile_word(cast(PdsText, obj), matrix, clip, border_words)
+                        ):
+                            temp_page_content.RemoveObject(obj)
+                            removed = True
+                        else:
+                            words += 1
+
+                    if removed:
+                        temp_page.SetContent()
+
+                    xobj: Optional[PdsStream] = doc.CreateXObjectFromPage(temp_page)
+                    if xobj is None:
+                        raise PdfixFailedToOcrException(pdfix, "Failed to create XObject from page")
+                    if shared_fonts is not None:
+                        share_fonts(xobj, shared_fonts)
+
                 except Exception:
                     raise
                 finally:
-                    os.remove(temp_path)
-
-                crop_box: PdfRect = page.GetCropBox()
-                rotate: float = page.GetRotate()
-
-                width: int | Any = crop_box.right - crop_box.left
-                width_tmp: int | Any = temp_page_box.right - temp_page_box.left
-                height: int | Any = crop_box.top - crop_box.bottom
-                height_tmp: int | Any = temp_page_box.top - temp_page_box.bottom
-
-                if rotate == 90 or rotate == 270:
-                    width_tmp, height_tmp = height_tmp, width_tmp
-
-                scale_x: float | Any = width / width_tmp
-                scale_y: float | Any = height / height_tmp
-
-                # Calculate matrix for placing xObject on a page
-                rotate = (page.GetRotate() / 90) % 4
-                matrix: PdfMatrix = PdfMatrix()
-                matrix = pdf_matrix_rotate(matrix, rotate * pi / 2, False)
-                matrix = pdf_matrix_scale(matrix, scale_x, scale_y, False)
-                if rotate == 0:
-                    matrix = pdf_matrix_translate(
-                        matrix,
-                        crop_box.left,
-                        crop_box.bottom,
-                        False,
-                    )
-                elif rotate == 1:
-                    matrix = pdf_matrix_translate(
-                        matrix,
-                        crop_box.right,
-                        crop_box.bottom,
-                        False,
-                    )
-                elif rotate == 2:
-                    matrix = pdf_matrix_translate(
-                        matrix,
-                        crop_box.right,
-                        crop_box.top,
-                        False,
-                    )
-                elif rotate == 3:
-                    matrix = pdf_matrix_translate(
-                        matrix,
-                        crop_box.left,
-                        crop_box.top,
-                        False,
-                    )
-
-                content: Optional[PdsContent] = page.GetContent()
-                if content is None:
-                    raise PdfixFailedToOcrException(pdfix, "Failed to obtain content from page")
-                form: Optional[PdsForm] = content.AddNewForm(-1, xobj, matrix)
-                if form is None:
-                    raise PdfixFailedToOcrException(pdfix, "Failed to add XObject to page")
-
-                progress_bar.update(xobject_step_units)
+                    temp_page.Release()
             except Exception:
                 raise
             finally:
-                page.Release()
+                temp_doc.Close()
+        except Exception:
+            raise
+        finally:
+            temp_stream.Destroy()
 
-        progress_bar.n = PROGRESS_FIRST_STEP + PROGRESS_SECOND_STEP
-        progress_bar.set_description("Saving document")
-        progress_bar.refresh()
+        content: Optional[PdsContent] = page.GetContent()
+        if content is None:
+            raise PdfixFailedToOcrException(pdfix, "Failed to obtain content from page")
+        form: Optional[PdsForm] = content.AddNewForm(-1, xobj, matrix)
+        if form is None:
+            raise PdfixFailedToOcrException(pdfix, "Failed to add XObject to page")
+    except Exception:
+        raise
+    finally:
+        page.Release()
 
-        if not doc.Save(output_path, kSaveFull):
-            raise PdfixFailedToSaveException(pdfix, output_path)
+    return words
 
-        progress_bar.n = total_progress_count
-        progress_bar.set_description("Done")
-        progress_bar.refresh()
+
+def share_fonts(xobj: PdsStream, shared_fonts: dict[str, PdsObject]) -> None:
+    """
+    Point fonts of the text layer to equal fonts placed with earlier text layers. Copies left unused
+    are not written when the document is saved.
+
+    Args:
+        xobj (PdsStream): Form XObject of the text layer.
+        shared_fonts (dict[str, PdsObject]): Fonts already placed into the document by their digest,
+            fonts seen for the first time are added.
+    """
+    resources: Optional[PdsDictionary] = xobj.GetStreamDict().GetDictionary("Resources")
+    fonts: Optional[PdsDictionary] = resources.GetDictionary("Font") if resources is not None else None
+    if fonts is None:
+        return
+
+    for i in range(fonts.GetNumKeys()):
+        key: str = fonts.GetKey(i)
+        font: Optional[PdsObject] = fonts.Get(key)
+        # Only indirect objects can be referenced from other text layers
+        if font is None or font.GetId() == 0:
+            continue
+        # PDFix SDK sometimes reuses a font copied before
+        if any(known.GetId() == font.GetId() for known in shared_fonts.values()):
+            continue
+        digest = hashlib.sha256()
+        update_object_digest(digest, font)
+        shared_font: PdsObject = shared_fonts.setdefault(digest.hexdigest(), font)
+        if shared_font.GetId() != font.GetId():
+            fonts.Put(key, shared_font)
+
+
+def update_object_digest(digest: Any, obj: Optional[PdsObject], depth: int = 0) -> None:
+    """
+    Add content of a PDF object and all objects it refers to into a digest. Equal objects give equal
+    digests regardless of their object numbers.
+
+    Args:
+        digest (Any): Hash object from hashlib.
+        obj (Optional[PdsObject]): The PDF object.
+        depth (int): Nesting level, objects nested too deep are left out to stop on reference cycles.
+    """
+    if obj is None or depth > MAX_OBJECT_DEPTH:
+        digest.update(b"?")
+        return
+
+    obj_type: int = obj.GetObjectType()
+    digest.update(f"{obj_type}:".encode("utf-8"))
+    if obj_type == kPdsBoolean:
+        digest.update(str(cast(PdsBoolean, obj).GetValue()).encode("utf-8"))
+    elif obj_type == kPdsNumber:
+        digest.update(repr(cast(PdsNumber, obj).GetValue()).encode("utf-8"))
+    elif obj_type == kPdsName:
+        digest.update(cast(PdsName, obj).GetText().encode("utf-8"))
+    elif obj_type == kPdsString:
+        string: PdsString = cast(PdsString, obj)
+        length: int = string.GetValue(None, 0)
+        value = ctypes.create_string_buffer(length)
+        string.GetValue(value, length)
+        digest.update(value.raw)
+    elif obj_type == kPdsArray:
+        array: PdsArray = cast(PdsArray, obj)
+        for i in range(array.GetNumObjects()):
+            update_object_digest(digest, array.Get(i), depth + 1)
+    elif obj_type == kPdsDictionary:
+        dictionary: PdsDictionary = cast(PdsDictionary, obj)
+        for key in sorted(dictionary.GetKey(i) for i in range(dictionary.GetNumKeys())):
+            digest.update(f"/{key}".encode("utf-8"))
+            update_object_digest(digest, dictionary.Get(key), depth + 1)
+    elif obj_type == kPdsStream:
+        stream: PdsStream = cast(PdsStream, obj)
+        update_object_digest(digest, stream.GetStreamDict(), depth + 1)
+        size: int = stream.GetSize()
+        data = (ctypes.c_ubyte * size)()
+        if size == 0 or stream.Read(0, data, size):
+            digest.update(bytes(data))
+        else:
+            # Unreadable stream, the object is not shared with any other
+            digest.update(f"#{obj.GetId()}".encode("utf-8"))
+
+
+def get_text_layer_matrix(
+    page: PdfPage, temp_page_box: PdfRect, rotation: float, region: Optional[tuple[float, float, float, float]]
+) -> PdfMatrix:
+    """
+    Compute the matrix placing the text layer produced by Tesseract onto the page.
+
+    Args:
+        page (PdfPage): The PDF page.
+        temp_page_box (PdfRect): Crop box of the OCR page.
+        rotation (float): Clockwise rotation in degrees applied to the page image before OCR.
+        region (Optional[tuple[float, float, float, float]]): Area of the page the image was rendered from
+            as (left, bottom, right, top). None for the whole page.
+
+    Returns:
+        Transformation from OCR page coordinates to page coordinates.
+    """
+    crop_box: PdfRect = page.GetCropBox()
+    if region is not None:
+        # The text layer covers only the area, placed like a page with this crop box
+        crop_box = get_rect(region)
+    rotate: float = page.GetRotate()
+
+    width: int | Any = crop_box.right - crop_box.left
+    width_tmp: int | Any = temp_page_box.right - temp_page_box.left
+    height: int | Any = crop_box.top - crop_box.bottom
+    height_tmp: int | Any = temp_page_box.top - temp_page_box.bottom
+
+    matrix: PdfMatrix = PdfMatrix()
+    if rotation != 0:
+        # Turn the text layer back from the corrected image to the rendered page. The image was
+        # rotated around its center and grown to fit, the rendered page has the size of the page.
+        displayed_width: int | Any = height if rotate == 90 or rotate == 270 else width
+        displayed_height: int | Any = width if rotate == 90 or rotate == 270 else height
+        cos: float = abs(math.cos(rotation * pi / 180))
+        sin: float = abs(math.sin(rotation * pi / 180))
+        # OCR page is measured in points of the rounded image resolution, so its scale to the page
+        # is taken from its size compared to the grown displayed page
+        ocr_scale: float | Any = (width_tmp + height_tmp) / ((displayed_width + displayed_height) * (cos + sin))
+        matrix = pdf_matrix_translate(matrix, -width_tmp / 2, -height_tmp / 2, False)
+        matrix = pdf_matrix_rotate(matrix, rotation * pi / 180, False)
+        width_tmp, height_tmp = displayed_width * ocr_scale, displayed_height * ocr_scale
+        matrix = pdf_matrix_translate(matrix, width_tmp / 2, height_tmp / 2, False)
+
+    if rotate == 90 or rotate == 270:
+        width_tmp, height_tmp = height_tmp, width_tmp
+
+    scale_x: float | Any = width / width_tmp
+    scale_y: float | Any = height / height_tmp
+
+    # Calculate matrix for placing xObject on a page
+    rotate = (page.GetRotate() / 90) % 4
+    matrix = pdf_matrix_rotate(matrix, rotate * pi / 2, False)
+    matrix = pdf_matrix_scale(matrix, scale_x, scale_y, False)
+    if rotate == 0:
+        matrix = pdf_matrix_translate(
+            matrix,
+            crop_box.left,
+            crop_box.bottom,
+            False,
+        )
+    elif rotate == 1:
+        matrix = pdf_matrix_translate(
+            matrix,
+            crop_box.right,
+            crop_box.bottom,
+            False,
+        )
+    elif rotate == 2:
+        matrix = pdf_matrix_translate(
+            matrix,
+            crop_box.right,
+            crop_box.top,
+            False,
+        )
+    elif rotate == 3:
+        matrix = pdf_matrix_translate(
+            matrix,
+            crop_box.left,
+            crop_box.top,
+            False,
+        )
+
+    return matrix
+
+
+def is_tile_word(
+    text: PdsText,
+    matrix: PdfMatrix,
+    clip: tuple[float, float, float, float],
+    border_words: Optional[list[tuple[str, tuple[float, float, float, float]]]],
+) -> bool:
+    """
+    Check whether the word recognized in a tile belongs to it. The word belongs to the tile owning its
+    center. A word centered at the border between tiles can be recognized in both of them with a slightly
+    different position, the copy placed first is kept.
+
+    Args:
+        text (PdsText): Word of the OCR page.
+        matrix (PdfMatrix): Transformation from OCR page coordinates to page coordinates.
+        clip (tuple[float, float, float, float]): Part of the page owned by the tile as (left, bottom, right, top).
+        border_words (Optional[list[tuple[str, tuple[float, float, float, float]]]]): Words crossing the clip
+            placed from other tiles of the page with their areas.
+
+    Returns:
+        True if the word is placed from this tile.
+    """
+    bbox: PdfRect = text.GetBBox()
+    # Corners transformed to the page, the matrix may rotate
+    points: list[tuple[float, float]] = [
+        (matrix.a * x + matrix.c * y + matrix.e, matrix.b * x + matrix.d * y + matrix.f)
+        for x, y in [(bbox.left, bbox.bottom), (bbox.right, bbox.bottom), (bbox.left, bbox.top), (bbox.right, bbox.top)]
+    ]
+    left: float = min(x for x, _ in points)
+    bottom: float = min(y for _, y in points)
+    right: float = max(x for x, _ in points)
+    top: float = max(y for _, y in points)
+
+    center_x: float = (left + right) / 2
+    center_y: float = (bottom + top) / 2
+    if not (clip[0] <= center_x < clip[2] and clip[1] <= center_y < clip[3]):
+        return False
+    if border_words is None or (clip[0] <= left and clip[1] <= bottom and right <= clip[2] and top <= clip[3]):
+        return True
+
+    word: str = text.GetText().strip()
+    for other_word, other in border_words:
+        overlap_width: float = min(right, other[2]) - max(left, other[0])
+        overlap_height: float = min(top, other[3]) - max(bottom, other[1])
+        if other_word == word and overlap_width > (right - left) / 2 and overlap_height > (top - bottom) / 2:
+            return False
+    border_words.append((word, (left, bottom, right, top)))
+    return True
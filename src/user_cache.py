@@ -0,0 +1,19 @@
+import os
+from pathlib import Path
+
+from constants import USER_CACHE_DIR
+
+
+def get_user_cache_path(file_name: str) -> Path:
+    """
+    Get path of a file in the cache directory of the user. Used instead of the working directory,
+    which is usually the mounted data volume.
+
+    Args:
+        file_name (str): Name of the file.
+
+    Returns:
+        Path to the file under $XDG_CACHE_HOME or ~/.cache.
+    """
+    cache_home: str = os.environ.get("XDG_CACHE_HOME", "") or os.path.join(Path.home(), ".cache")
+    return Path(cache_home).joinpath(USER_CACHE_DIR, file_name)
@@ -106,7 +106,7 @@ iso_to_tesseract: dict[str, str] = {
 }
 
 
-def authorize_sdk(pdfix: Pdfix, license_name: Optional[str], license_key: Optional[str]) -> None:
+def authorize_sdk(pdfix: Pdfix, license_name: Optional[str], license_key: Optional[str], verbose: bool = True) -> None:
     """
     Tries to authorize or activate Pdfix license.
 
@@ -114,6 +114,7 @@ def authorize_sdk(pdfix: Pdfix, license_name: Optional[str], license_key: Option
         pdfix (Pdfix): Pdfix sdk instance.
         license_name (string): Pdfix sdk license name (e-mail)
         license_key (string): Pdfix sdk license key
+        verbose (bool): Print notice about using the trial to stdout.
     """
     if license_name and license_key:
         authorization: Optional[PsAccountAuthorization] = pdfix.GetAccountAuthorization()
@@ -123,7 +124,7 @@ def authorize_sdk(pdfix: Pdfix, license_name: Optional[str], license_key: Option
         standard_authorization: Optional[PsStandardAuthorization] = pdfix.GetStandardAuthorization()
         if standard_authorization is None or not standard_authorization.Activate(license_key):
             raise PdfixActivationException(pdfix)
-    else:
+    elif verbose:
         print("No license name or key provided. Using PDFix SDK trial")
 
 
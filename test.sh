@@ -63,9 +63,59 @@ else
     EXIT_STATUS=1
 fi
 
+info "Test #04: Run ocr-batch with one valid and one missing document"
+echo '{"input": "../example/climate_change.pdf", "output": "climate_change_batch.pdf"}' > $TEMPORARY_DIRECTORY/batch.jsonl
+echo '{"input": "missing.pdf", "output": "missing_batch.pdf"}' >> $TEMPORARY_DIRECTORY/batch.jsonl
+docker run --rm $PLATFORM -v $(pwd):/data -w /data $DOCKER_IMAGE ocr-batch -i $TEMPORARY_DIRECTORY/batch.jsonl --report $TEMPORARY_DIRECTORY/batch_report.jsonl > /dev/null
+BATCH_EXIT_CODE=$?
+if [ $BATCH_EXIT_CODE -eq 40 ] \
+    && [ -f "$(pwd)/$TEMPORARY_DIRECTORY/climate_change_batch.pdf" ] \
+    && [ ! -f "$(pwd)/$TEMPORARY_DIRECTORY/missing_batch.pdf" ] \
+    && grep -q '"error_code": 0,' $TEMPORARY_DIRECTORY/batch_report.jsonl \
+    && grep -q '"error_code": 11,' $TEMPORARY_DIRECTORY/batch_report.jsonl; then
+    success "passed"
+else
+    error "ocr-batch exited with $BATCH_EXIT_CODE, expected 40 with one OK and one FAILED document"
+    EXIT_STATUS=1
+fi
+
+info "Test #05: Run ocr with --shard and --mode redo on an OCR-ed document and merge the shards"
+SHARD_EXIT_CODE=0
+for SHARD in 1 2; do
+    docker run --rm $PLATFORM -v $(pwd):/data -w /data $DOCKER_IMAGE ocr -i $TEMPORARY_DIRECTORY/changement_climatique_ocr.pdf -o $TEMPORARY_DIRECTORY/shard_$SHARD --shard $SHARD/2 --mode redo > /dev/null || SHARD_EXIT_CODE=$?
+done
+docker run --rm $PLATFORM -v $(pwd):/data -w /data $DOCKER_IMAGE merge -i $TEMPORARY_DIRECTORY/changement_climatique_ocr.pdf -o $TEMPORARY_DIRECTORY/changement_climatique_merged.pdf --shards $TEMPORARY_DIRECTORY/shard_1 $TEMPORARY_DIRECTORY/shard_2 > /dev/null
+MERGE_EXIT_CODE=$?
+if [ $SHARD_EXIT_CODE -eq 0 ] && [ $MERGE_EXIT_CODE -eq 0 ] \
+    && [ -f "$(pwd)/$TEMPORARY_DIRECTORY/shard_1/checkpoint.json" ] \
+    && [ -f "$(pwd)/$TEMPORARY_DIRECTORY/shard_2/checkpoint.json" ] \
+    && [ -f "$(pwd)/$TEMPORARY_DIRECTORY/changement_climatique_merged.pdf" ]; then
+    success "passed"
+else
+    error "ocr --shard exited with $SHARD_EXIT_CODE and merge with $MERGE_EXIT_CODE, expected 0 with a merged document"
+    EXIT_STATUS=1
+fi
+
+info "Test #06: Run ocr with --save-mode incremental twice onto the same output"
+docker run --rm $PLATFORM -v $(pwd):/data -w /data $DOCKER_IMAGE ocr -i example/climate_change.pdf -o $TEMPORARY_DIRECTORY/climate_change_incremental.pdf --save-mode incremental > /dev/null
+FIRST_SIZE=$(stat -c %s $TEMPORARY_DIRECTORY/climate_change_incremental.pdf 2> /dev/null || echo 0)
+docker run --rm $PLATFORM -v $(pwd):/data -w /data $DOCKER_IMAGE ocr -i example/climate_change.pdf -o $TEMPORARY_DIRECTORY/climate_change_incremental.pdf --save-mode incremental > /dev/null
+SECOND_SIZE=$(stat -c %s $TEMPORARY_DIRECTORY/climate_change_incremental.pdf 2> /dev/null || echo 0)
+# The output is replaced, appending to it would double its size
+if [ $FIRST_SIZE -gt 0 ] && [ $SECOND_SIZE -gt 0 ] && [ $SECOND_SIZE -lt $((FIRST_SIZE * 3 / 2)) ]; then
+    success "passed"
+else
+    error "incremental output was $FIRST_SIZE bytes after the first run and $SECOND_SIZE bytes after the second"
+    EXIT_STATUS=1
+fi
+
 info "Cleaning up temporary files from tests"
 rm -f $TEMPORARY_DIRECTORY/config.json
 rm -f $TEMPORARY_DIRECTORY/changement_climatique_ocr.pdf
+rm -f $TEMPORARY_DIRECTORY/batch.jsonl $TEMPORARY_DIRECTORY/batch_report.jsonl $TEMPORARY_DIRECTORY/climate_change_batch.pdf
+rm -rf $TEMPORARY_DIRECTORY/shard_1 $TEMPORARY_DIRECTORY/shard_2
+rm -f $TEMPORARY_DIRECTORY/changement_climatique_merged.pdf
+rm -f $TEMPORARY_DIRECTORY/climate_change_incremental.pdf
 rmdir $(pwd)/$TEMPORARY_DIRECTORY
 
 info "Removing testing docker image"